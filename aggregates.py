@@ -0,0 +1,94 @@
+import argparse
+import sys
+
+from connection import DB_PATH, connect
+from parallel_reports import ParallelReports
+from schema import (DESTINATION_COUNTS_FROM_FLIGHTS_SQL, PILOT_COUNTS_FROM_FLIGHTS_SQL, SUMMARY_TRIGGERS,
+                    fill_summaries, migrate)
+
+# Rebuild and verify the trigger-maintained summary tables behind Q9/Q12 and
+# Q11. Their DDL and triggers are part of the schema (schema.py).
+
+
+def create_triggers(conn):
+    """Creates the triggers that keep the summary tables current."""
+    for name, body in SUMMARY_TRIGGERS.items():
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+    conn.commit()
+
+
+def drop_triggers(conn):
+    """Drops the summary triggers (e.g. for a bulk load followed by rebuild_aggregates)."""
+    for name in SUMMARY_TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    conn.commit()
+
+
+def rebuild_aggregates(conn):
+    """Recomputes both summary tables from the Flight table in one transaction."""
+    with conn:
+        fill_summaries(conn)
+
+
+def verify_aggregates(conn, recounts=None):
+    """Compares the summary tables with a full recount.
+
+    recounts, if given, maps each summary table name to its recounted {key: count}
+    (e.g. from parallel_recounts); otherwise each is recounted with one statement.
+    Returns a list of (table, key, stored count, actual count) for every entry that
+    has drifted; an empty list means the summaries are correct.
+    """
+    checks = [
+        ("DestinationFlightCount", "SELECT City, FlightCount FROM DestinationFlightCount",
+         DESTINATION_COUNTS_FROM_FLIGHTS_SQL),
+        ("PilotFlightCount", "SELECT PilotID, FlightCount FROM PilotFlightCount",
+         PILOT_COUNTS_FROM_FLIGHTS_SQL),
+    ]
+    drift = []
+    for table, stored_sql, actual_sql in checks:
+        stored = dict(conn.execute(stored_sql).fetchall())
+        if recounts is not None:
+            actual = recounts[table]
+        else:
+            actual = dict(conn.execute(actual_sql).fetchall())
+        for key in sorted(stored.keys() | actual.keys(), key=str):
+            if stored.get(key, 0) != actual.get(key, 0):
+                drift.append((table, key, stored.get(key, 0), actual.get(key, 0)))
+    return drift
+
+
+def parallel_recounts(db_path, workers):
+    """The recounts verify_aggregates needs, computed by parallel_reports worker processes."""
+    with ParallelReports(db_path, workers) as reports:
+        return {
+            "DestinationFlightCount": {row.city: row.flight_count for row in reports.destination_counts()},
+            "PilotFlightCount": {row.pilot_id or 0: row.flight_count for row in reports.flights_per_pilot()},
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Verify or rebuild the flight summary tables.")
+    parser.add_argument("command", choices=("verify", "rebuild"))
+    parser.add_argument("--db", default=DB_PATH, help="SQLite database file")
+    parser.add_argument("--workers", type=int, default=1, help="recount Flight with this many worker processes")
+    args = parser.parse_args(argv)
+
+    conn = connect(args.db)
+    migrate(conn)
+    drift = verify_aggregates(conn, parallel_recounts(args.db, args.workers) if args.workers > 1 else None)
+    if drift:
+        print(f"{len(drift)} summary entries have drifted:")
+        for table, key, stored, actual in drift:
+            print(f"  {table} {key!r}: stored {stored}, actual {actual}")
+    else:
+        print("Summary tables match the Flight table.")
+
+    if args.command == "rebuild":
+        rebuild_aggregates(conn)
+        print("Summary tables rebuilt.")
+        return 0
+    return 1 if drift else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,260 @@
+import argparse
+import os
+import sys
+import time
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from datetime import date
+from itertools import compress, groupby
+
+from columnar import MISSING, ColumnarSnapshot, default_path, export
+from connection import DB_PATH, connect
+from models import FLIGHT_STATUSES, BlockTimeSpread, CityCount, DayStatusMix, PilotCount, RouteOnTime
+from parallel_reports import PILOT_NAMES_SQL
+from render import FORMATS, Column, open_output, render
+from schema import DESTINATION_COUNTS_FROM_FLIGHTS_SQL, PILOT_COUNTS_FROM_FLIGHTS_SQL, migrate
+
+# Schedule analytics over a columnar snapshot (columnar.py).
+#
+# Each report is a group-by over whole columns that runs inside C loops, with
+# no Python code per flight:
+#   - Counter() over a column, or over zip() of two, counts each key;
+#   - a route's flights are one contiguous slice of every column (the snapshot
+#     is sorted by route), so per-route figures come from bytes.count() on its
+#     slice of the status column, or sorted() of its slice of block_minutes
+#     filtered through itertools.compress().
+# Dictionary codes become airport codes, cities and pilot names only in the
+# result rows.
+#
+# SQL_REPORTS holds the same reports computed from Flight with GROUP BY (or, for
+# the percentiles, ordered rows grouped in Python), as Q9/Q11/Q12 and ad-hoc
+# analysis do; `check` compares the two.
+
+BLOCK_PERCENTILES = (0.5, 0.9)
+
+ON_TIME_SQL = """
+    SELECT DepartureAirport, ArrivalAirport,
+           SUM(FlightStatus <> 'Cancelled'), SUM(FlightStatus = 'Delayed'), SUM(FlightStatus = 'Cancelled')
+    FROM Flight
+    GROUP BY DepartureAirport, ArrivalAirport
+"""
+
+STATUS_MIX_SQL = """
+    SELECT DepartureUTC / 86400, FlightStatus, COUNT(*)
+    FROM Flight
+    WHERE DepartureUTC IS NOT NULL
+    GROUP BY DepartureUTC / 86400, FlightStatus
+"""
+
+BLOCK_MINUTES_SQL = """
+    SELECT DepartureAirport, ArrivalAirport, (ArrivalUTC - DepartureUTC) / 60 AS Minutes
+    FROM Flight
+    WHERE DepartureUTC IS NOT NULL AND ArrivalUTC IS NOT NULL AND FlightStatus <> 'Cancelled'
+    ORDER BY DepartureAirport, ArrivalAirport, Minutes
+"""
+
+
+def _busiest(rows, count, *keys):
+    """Sorts report rows by a count, largest first, then by their keys."""
+    return sorted(rows, key=lambda row: (-getattr(row, count), *(getattr(row, key) for key in keys)))
+
+
+def _percentile(ordered, fraction):
+    """Nearest-rank percentile of a sorted, non-empty sequence."""
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def _spread(origin, destination, minutes):
+    return BlockTimeSpread(origin, destination, len(minutes), minutes[0],
+                           *(_percentile(minutes, fraction) for fraction in BLOCK_PERCENTILES),
+                           minutes[-1], round(sum(minutes) / len(minutes), 1))
+
+
+def _day(day):
+    return date.fromordinal(date(1970, 1, 1).toordinal() + day).isoformat()
+
+
+# Reports over a ColumnarSnapshot
+def destination_counts(snapshot):
+    """Flights per arrival city (Q9/Q12), busiest first; flights to airports without an Airport row are skipped."""
+    per_city = Counter()
+    for code, count in Counter(snapshot.column("arrival_airport")).items():
+        if snapshot.cities[code] is not None:
+            per_city[snapshot.cities[code]] += count
+    return _busiest([CityCount(city, count) for city, count in per_city.items()], "flight_count", "city")
+
+
+def flights_per_pilot(snapshot):
+    """Flights per pilot (Q11), busiest first; unassigned flights have pilot_id None."""
+    return _busiest([PilotCount(snapshot.pilots[code], snapshot.pilot_names[code], count)
+                     for code, count in Counter(snapshot.column("pilot")).items()], "flight_count", "pilot", "pilot_id")
+
+
+def on_time_by_route(snapshot):
+    """Delayed and cancelled flights per route and the on-time rate of the rest, busiest route first."""
+    statuses = snapshot.column("status")
+    delayed = bytes([FLIGHT_STATUSES.index("Delayed")])
+    cancelled = bytes([FLIGHT_STATUSES.index("Cancelled")])
+    rows = []
+    for route, (origin, destination) in enumerate(snapshot.routes):
+        codes = statuses[snapshot.route_slice(route)].tobytes()
+        late, dropped = codes.count(delayed), codes.count(cancelled)
+        flights = len(codes) - dropped
+        rows.append(RouteOnTime(snapshot.airports[origin], snapshot.airports[destination], flights, late, dropped,
+                                round(1 - late / flights, 4) if flights else None))
+    return _busiest(rows, "flights", "origin", "destination")
+
+
+def status_mix_by_day(snapshot):
+    """Flights in each status per UTC departure day, in day order (flights with unknown times left out)."""
+    counts = Counter(zip(snapshot.column("departure_day"), snapshot.column("status")))
+    days = {}
+    for (day, status), count in counts.items():
+        if day != MISSING:
+            days.setdefault(day, [0] * len(FLIGHT_STATUSES))[status] = count
+    return [DayStatusMix(_day(day), *days[day]) for day in sorted(days)]
+
+
+def block_time_distribution(snapshot, min_flights=1):
+    """Block-time spread per route (min, p50, p90, max, mean minutes) over its non-cancelled
+    flights with known times; busiest route first."""
+    minutes, statuses = snapshot.column("block_minutes"), snapshot.column("status")
+    # status code -> 1 to keep the flight, 0 to drop it, as a bytes.translate table
+    keep = bytes(int(status != "Cancelled") for status in FLIGHT_STATUSES).ljust(256, b"\0")
+    rows = []
+    for route, (origin, destination) in enumerate(snapshot.routes):
+        span = snapshot.route_slice(route)
+        values = sorted(compress(minutes[span], statuses[span].tobytes().translate(keep)))
+        del values[bisect_left(values, MISSING):bisect_right(values, MISSING)]
+        if len(values) >= max(min_flights, 1):
+            rows.append(_spread(snapshot.airports[origin], snapshot.airports[destination], values))
+    return _busiest(rows, "flights", "origin", "destination")
+
+
+REPORTS = {
+    "destinations": destination_counts,
+    "pilots": flights_per_pilot,
+    "on-time": on_time_by_route,
+    "status-mix": status_mix_by_day,
+    "block-times": block_time_distribution,
+}
+
+
+# The same reports from Flight in SQL
+def sql_destination_counts(conn):
+    return _busiest([CityCount(*row) for row in conn.execute(DESTINATION_COUNTS_FROM_FLIGHTS_SQL)],
+                    "flight_count", "city")
+
+
+def sql_flights_per_pilot(conn):
+    names = dict(conn.execute(PILOT_NAMES_SQL))
+    return _busiest([PilotCount(pilot_id or None, names.get(pilot_id) if pilot_id else "Unassigned", count)
+                     for pilot_id, count in conn.execute(PILOT_COUNTS_FROM_FLIGHTS_SQL)], "flight_count", "pilot", "pilot_id")
+
+
+def sql_on_time_by_route(conn):
+    return _busiest([RouteOnTime(origin, destination, flights, late, dropped,
+                                 round(1 - late / flights, 4) if flights else None)
+                     for origin, destination, flights, late, dropped in conn.execute(ON_TIME_SQL)],
+                    "flights", "origin", "destination")
+
+
+def sql_status_mix_by_day(conn):
+    days = {}
+    for day, status, count in conn.execute(STATUS_MIX_SQL):
+        days.setdefault(day, [0] * len(FLIGHT_STATUSES))[FLIGHT_STATUSES.index(status)] = count
+    return [DayStatusMix(_day(day), *days[day]) for day in sorted(days)]
+
+
+def sql_block_time_distribution(conn, min_flights=1):
+    rows = []
+    for (origin, destination), group in groupby(conn.execute(BLOCK_MINUTES_SQL), key=lambda row: row[:2]):
+        values = [row[2] for row in group]
+        if len(values) >= max(min_flights, 1):
+            rows.append(_spread(origin, destination, values))
+    return _busiest(rows, "flights", "origin", "destination")
+
+
+SQL_REPORTS = {
+    "destinations": sql_destination_counts,
+    "pilots": sql_flights_per_pilot,
+    "on-time": sql_on_time_by_route,
+    "status-mix": sql_status_mix_by_day,
+    "block-times": sql_block_time_distribution,
+}
+
+REPORT_COLUMNS = {
+    "destinations": [Column("City", "city"), Column("Flight Count", "flight_count", align=">")],
+    "pilots": [Column("PilotID", "pilot_id"), Column("Pilot", "pilot"),
+               Column("Flights Assigned", "flight_count", align=">")],
+    "on-time": [Column("From", "origin"), Column("To", "destination"), Column("Flights", "flights", align=">"),
+                Column("Delayed", "delayed", align=">"), Column("Cancelled", "cancelled", align=">"),
+                Column("On Time", "on_time_rate", align=">",
+                       format=lambda rate: "" if rate is None else f"{rate:.1%}")],
+    "status-mix": [Column("Day (UTC)", "day"), *(Column(status, status.lower(), align=">")
+                                                 for status in FLIGHT_STATUSES)],
+    "block-times": [Column("From", "origin"), Column("To", "destination"), Column("Flights", "flights", align=">"),
+                    Column("Min", "min_minutes", align=">"), Column("p50", "p50_minutes", align=">"),
+                    Column("p90", "p90_minutes", align=">"), Column("Max", "max_minutes", align=">"),
+                    Column("Mean", "mean_minutes", align=">")],
+}
+
+
+def check(snapshot, conn):
+    """Runs every report both ways; returns the names of those whose results differ."""
+    return [name for name, report in REPORTS.items() if report(snapshot) != SQL_REPORTS[name](conn)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Schedule analytics over a columnar snapshot of Flight.")
+    parser.add_argument("report", choices=(*REPORTS, "check"))
+    parser.add_argument("--db", default=DB_PATH, help="SQLite database file")
+    parser.add_argument("--snapshot", help="snapshot directory (default: next to the database, *.columns)")
+    parser.add_argument("--refresh", action="store_true", help="re-export the snapshot first if it is stale")
+    parser.add_argument("--sql", action="store_true", help="compute the report from Flight in SQL instead")
+    parser.add_argument("--format", choices=FORMATS, default="table")
+    parser.add_argument("--output", help="output file (default: stdout)")
+    args = parser.parse_args(argv)
+    path = args.snapshot or default_path(args.db)
+
+    conn = connect(args.db)
+    migrate(conn)
+    if not os.path.exists(path) or args.refresh:
+        stale = not os.path.exists(path)
+        if not stale:
+            try:
+                with ColumnarSnapshot(path) as snapshot:
+                    stale = not snapshot.is_current(conn)
+            except ValueError:  # an older snapshot format
+                stale = True
+        if stale:
+            print(f"Exporting {export(conn, path)['rows']} flights to {path}.", file=sys.stderr)
+    with ColumnarSnapshot(path) as snapshot:
+        if not snapshot.is_current(conn):
+            print(f"Note: {path} is older than the database; use --refresh to re-export.", file=sys.stderr)
+        start = time.perf_counter()
+        if args.report == "check":
+            differing = check(snapshot, conn)
+            for name in differing:
+                print(f"{name}: the snapshot and the SQL disagree.")
+            if not differing:
+                print(f"All {len(REPORTS)} reports match the SQL ({time.perf_counter() - start:.2f}s).")
+            return 1 if differing else 0
+        rows = SQL_REPORTS[args.report](conn) if args.sql else REPORTS[args.report](snapshot)
+        elapsed = time.perf_counter() - start
+        try:
+            with open_output(args.output) as out:
+                render(rows, REPORT_COLUMNS[args.report], args.format, out)
+        except BrokenPipeError:
+            # The reader (e.g. `head`) went away; point stdout at devnull so the final flush is quiet.
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            return 1
+        except OSError as e:
+            print(f"Error writing {args.output}: {e}", file=sys.stderr)
+            return 1
+    print(f"{len(rows)} row(s) in {elapsed * 1000:.1f} ms ({'SQL' if args.sql else 'snapshot'}).", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,607 @@
+import json
+from contextlib import contextmanager
+
+from cache import DimensionCache
+from changelog import DEFAULT_BATCH_SIZE as DEFAULT_CHANGE_BATCH, changes_since, latest_seq
+from itinerary import DEFAULT_MAX_LEGS, Timetable
+from listing import DEFAULT_BATCH_SIZE, DEFAULT_PAGE_SIZE, flight_page, iter_flights
+from models import (FLIGHT_STATUSES, STATUS_TRANSITIONS, BlockTime, CityCount, Flight, FlightListing, PilotCount,
+                    ScheduleEntry, TimedFlight)
+from roster import DEFAULT_MIN_REST_MINUTES, auto_roster
+from scheduling import ScheduleConflictError, find_assignment_conflicts, find_conflicts, find_pilot_conflict
+from schema import AIRPORT_FLIGHTS_UTC_SQL, FLIGHT_UTC_SQL
+from search import DEFAULT_LIMIT as DEFAULT_SEARCH_LIMIT, SearchIndex
+from timezones import check_time_zone, parse_utc
+
+FLIGHT_COLUMNS = """
+    FlightID, FlightNumber, PilotID, DepartureAirport, ArrivalAirport,
+    DepartureDate, DepartureTime, ArrivalDate, ArrivalTime, FlightStatus
+"""
+
+INSERT_FLIGHT_SQL = """
+    INSERT INTO Flight (
+        FlightNumber, PilotID, DepartureAirport, ArrivalAirport,
+        DepartureDate, DepartureTime, ArrivalDate, ArrivalTime,
+        FlightStatus
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+FLIGHT_BY_ID_SQL = f"SELECT {FLIGHT_COLUMNS} FROM Flight WHERE FlightID = ?"
+
+UPDATE_STATUS_SQL = "UPDATE Flight SET FlightStatus = ? WHERE FlightID = ?"
+
+UPDATE_STATUSES_SQL = "UPDATE Flight SET FlightStatus = ? WHERE FlightID IN (SELECT value FROM json_each(?))"
+
+ASSIGN_PILOT_SQL = "UPDATE Flight SET PilotID = ? WHERE FlightID = ?"
+ASSIGN_PILOTS_SQL = "UPDATE Flight SET PilotID = ? WHERE FlightID IN (SELECT value FROM json_each(?))"
+
+REMOVE_PILOT_SQL = "UPDATE Flight SET PilotID = NULL WHERE FlightID = ?"
+
+INSERT_PILOT_SQL = "INSERT INTO Pilot (FirstName, LastName, Email, PhoneNumber) VALUES (?, ?, ?, ?)"
+
+# Airport codes, not cities: FlightAPI resolves them through its DimensionCache.
+PILOT_SCHEDULE_SQL = """
+    SELECT
+        FlightID,
+        FlightNumber,
+        DepartureDate,
+        DepartureTime,
+        ArrivalDate,
+        ArrivalTime,
+        DepartureAirport,
+        ArrivalAirport,
+        FlightStatus
+    FROM Flight
+    WHERE PilotID = ?
+    ORDER BY DepartureDate, DepartureTime
+"""
+
+INSERT_AIRPORT_SQL = """
+    INSERT INTO Airport (AirportCode, AirportName, City, Country, TimeZone)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+# Changing a time zone clears the UTC times of the airport's flights (trigger);
+# FlightAPI then recomputes them with schema.AIRPORT_FLIGHTS_UTC_SQL.
+UPDATE_TIME_ZONE_SQL = "UPDATE Airport SET TimeZone = ? WHERE AirportCode = ?"
+
+FIND_FLIGHT_BY_NUMBER_SQL = f"""
+    SELECT {FLIGHT_COLUMNS}
+    FROM Flight
+    WHERE FlightNumber = ? AND DepartureDate = ?
+"""
+
+DELETE_FLIGHT_SQL = "DELETE FROM Flight WHERE FlightID = ?"
+
+# Half-open UTC windows [start, end) on the epoch columns (see timezones.py):
+# each is one range scan of idx_flight_departure_utc or idx_flight_arrival_utc,
+# already in time order.
+TIMED_FLIGHT_COLUMNS = """
+    FlightID, FlightNumber, PilotID, DepartureAirport, ArrivalAirport,
+    DepartureUTC, ArrivalUTC, FlightStatus
+"""
+
+DEPARTING_BETWEEN_SQL = f"""
+    SELECT {TIMED_FLIGHT_COLUMNS}
+    FROM Flight
+    WHERE DepartureUTC >= ? AND DepartureUTC < ?
+    ORDER BY DepartureUTC, FlightID
+"""
+
+ARRIVING_BETWEEN_SQL = f"""
+    SELECT {TIMED_FLIGHT_COLUMNS}
+    FROM Flight
+    WHERE ArrivalUTC >= ? AND ArrivalUTC < ?
+    ORDER BY ArrivalUTC, FlightID
+"""
+
+# Block time (departure to arrival) of the flights departing in a window, per
+# route or per pilot. Cancelled flights and flights whose arrival time is
+# unknown are left out.
+_BLOCK_TIMES_SQL = """
+    SELECT
+        {key},
+        COUNT(*),
+        SUM(ArrivalUTC - DepartureUTC) / 60,
+        MIN(ArrivalUTC - DepartureUTC) / 60,
+        ROUND(AVG(ArrivalUTC - DepartureUTC) / 60.0, 1),
+        MAX(ArrivalUTC - DepartureUTC) / 60
+    FROM Flight
+    WHERE DepartureUTC >= ? AND DepartureUTC < ?
+      AND ArrivalUTC IS NOT NULL AND FlightStatus <> 'Cancelled'
+    GROUP BY {key}
+    ORDER BY SUM(ArrivalUTC - DepartureUTC) DESC
+"""
+
+BLOCK_TIMES_SQL = {
+    "route": _BLOCK_TIMES_SQL.format(key="DepartureAirport, ArrivalAirport"),
+    "pilot": _BLOCK_TIMES_SQL.format(key="PilotID"),
+}
+
+# Q9, Q11 and Q12 read the trigger-maintained summary tables (see aggregates.py)
+# instead of re-aggregating Flight on every call.
+FLIGHTS_PER_PILOT_SQL = """
+    SELECT
+        p.PilotID,
+        IFNULL(p.FirstName || ' ' || p.LastName, 'Unassigned') AS Pilot,
+        c.FlightCount
+    FROM PilotFlightCount c
+    LEFT JOIN Pilot p ON c.PilotID = p.PilotID
+    ORDER BY c.FlightCount DESC
+"""
+
+FLIGHT_COUNT_BY_DESTINATION_SQL = """
+    SELECT City, FlightCount
+    FROM DestinationFlightCount
+    ORDER BY FlightCount DESC
+"""
+
+
+def _check_status(status):
+    if status not in FLIGHT_STATUSES:
+        raise ValueError(f"Invalid flight status '{status}'. Choose from: {', '.join(FLIGHT_STATUSES)}")
+
+
+def _ids(flight_ids):
+    """Accepts a single FlightID or an iterable of them.
+
+    A string is not taken as an iterable ("12" is not [1, 2]), nor a bool as an ID.
+    """
+    if isinstance(flight_ids, (str, bytes, bool)):
+        raise ValueError(f"Expected a FlightID or a list of them, not {flight_ids!r}.")
+    if isinstance(flight_ids, int):
+        return [flight_ids]
+    ids = []
+    for flight_id in flight_ids:
+        if isinstance(flight_id, bool):
+            raise ValueError(f"Expected a FlightID, not {flight_id!r}.")
+        ids.append(int(flight_id))
+    return ids
+
+
+def _date_time(value, end_of_day=False):
+    """Splits 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM' into (date, time) for row-value comparison."""
+    date, _, time = value.strip().partition(" ")
+    return date, time.strip() or ("23:59" if end_of_day else "00:00")
+
+
+def flight_filter(flight_ids=None, flight_number=None, departure_airport=None, arrival_airport=None,
+                  airport=None, departs_from=None, departs_until=None, arrived_before=None,
+                  status=None, pilot_id=None, unassigned=False):
+    """Builds a WHERE clause (without the keyword) and its parameters selecting flights.
+
+    flight_ids        - a FlightID or a list of them (passed as one JSON parameter)
+    airport           - departing from or arriving at this airport
+    departs_from/until - inclusive departure window, 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM'
+    arrived_before    - arrival strictly before 'YYYY-MM-DD HH:MM'
+    status            - current status (a status or a list of them)
+    pilot_id / unassigned - current pilot, or flights with no pilot
+    """
+    conditions = []
+    params = []
+    if flight_ids is not None:
+        conditions.append("FlightID IN (SELECT value FROM json_each(?))")
+        params.append(json.dumps(_ids(flight_ids)))
+    if flight_number:
+        conditions.append("FlightNumber = ?")
+        params.append(flight_number)
+    if departure_airport:
+        conditions.append("DepartureAirport = ?")
+        params.append(departure_airport)
+    if arrival_airport:
+        conditions.append("ArrivalAirport = ?")
+        params.append(arrival_airport)
+    if airport:
+        conditions.append("(DepartureAirport = ? OR ArrivalAirport = ?)")
+        params.extend((airport, airport))
+    if departs_from:
+        conditions.append("(DepartureDate, DepartureTime) >= (?, ?)")
+        params.extend(_date_time(departs_from))
+    if departs_until:
+        conditions.append("(DepartureDate, DepartureTime) <= (?, ?)")
+        params.extend(_date_time(departs_until, end_of_day=True))
+    if arrived_before:
+        conditions.append("(ArrivalDate, ArrivalTime) < (?, ?)")
+        params.extend(_date_time(arrived_before))
+    if status:
+        statuses = [status] if isinstance(status, str) else list(status)
+        for s in statuses:
+            _check_status(s)
+        conditions.append(f"FlightStatus IN ({', '.join('?' for _ in statuses)})")
+        params.extend(statuses)
+    if pilot_id is not None:
+        conditions.append("PilotID = ?")
+        params.append(pilot_id)
+    if unassigned:
+        conditions.append("PilotID IS NULL")
+    if not conditions:
+        raise ValueError("A bulk operation needs at least one filter; refusing to touch every flight.")
+    return " AND ".join(conditions), params
+
+
+class FlightAPI:
+    """Data API over a flight database connection: no input(), no print().
+
+    Reads return row objects from models.py; writes return the new ID or the number
+    of rows changed and raise ValueError or sqlite3.Error on bad input. Each write
+    commits on its own unless made inside `with api.transaction():`, which commits
+    once at the end (or rolls back if the block raises).
+
+    Airport and pilot lookups, and the cities and pilot names in listings, come from
+    `dimensions`, a cache.DimensionCache; pass one in to share it between APIs.
+    Itinerary searches use `timetable`, an itinerary.Timetable, shared the same way,
+    and airport and pilot searches `search`, a search.SearchIndex.
+    """
+
+    def __init__(self, conn, autocommit=True, dimensions=None, timetable=None, search=None):
+        self.conn = conn
+        self.autocommit = autocommit
+        self.dimensions = dimensions if dimensions is not None else DimensionCache()
+        self.timetable = timetable if timetable is not None else Timetable()
+        self.search = search if search is not None else SearchIndex()
+        self._stale = []  # (invalidate, key) to repeat once the open transaction commits
+
+    def _commit(self):
+        if self.autocommit:
+            self.conn.commit()
+
+    def _invalidate(self, invalidate, key):
+        """Drops a dimension row this API has just written (and committed, with autocommit).
+
+        Without autocommit the write is not visible to other connections yet, so one
+        of them may load the old row and cache it again before the commit; the entry
+        is dropped again by after_commit().
+        """
+        invalidate(key)
+        if not self.autocommit:
+            self._stale.append((invalidate, key))
+
+    def after_commit(self):
+        """Call after committing writes made with autocommit=False (transaction() and
+        writer.GroupCommitWriter do): drops the dimension rows they changed again."""
+        stale, self._stale = self._stale, []
+        for invalidate, key in stale:
+            invalidate(key)
+
+    @contextmanager
+    def transaction(self):
+        """Groups several writes into one transaction."""
+        if not self.autocommit:  # already inside a transaction
+            yield self
+            return
+        self.autocommit = False
+        try:
+            yield self
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            self._stale.clear()
+            self.dimensions.invalidate_all()  # may hold rows read from the rolled-back writes
+            raise
+        finally:
+            self.autocommit = True
+        self.after_commit()
+
+# Flights
+    def add_flight(self, flight_number, departure_airport, arrival_airport, departure_date,
+                   departure_time, arrival_date, arrival_time, status="Scheduled", pilot_id=None,
+                   check_conflicts=True):
+        """Adds a flight and returns its FlightID.
+
+        With a pilot_id, raises ScheduleConflictError (and adds nothing) if the pilot
+        already flies a flight overlapping this one, unless check_conflicts is False.
+        """
+        _check_status(status)
+        params = (flight_number, pilot_id, departure_airport, arrival_airport,
+                  departure_date, departure_time, arrival_date, arrival_time, status)
+        if pilot_id is None or not check_conflicts:
+            flight_id = self._insert_flight(params)
+            self._commit()
+            return flight_id
+        # The flight's UTC times are only known once it is stored, so insert it under a
+        # savepoint, check, and undo the insert on a clash.
+        began = not self.conn.in_transaction
+        if began:
+            self.conn.execute("BEGIN")
+        self.conn.execute("SAVEPOINT add_flight")
+        try:
+            flight_id = self._insert_flight(params)
+            conflict = find_pilot_conflict(self.conn, pilot_id, flight_id)
+            if conflict is not None:
+                raise ScheduleConflictError(
+                    f"Pilot {pilot_id} is already flying flight {conflict.flight_id} at that time.", [conflict])
+        except BaseException:
+            self.conn.execute("ROLLBACK TO add_flight")
+            self.conn.execute("RELEASE add_flight")
+            if began and self.autocommit:
+                self.conn.rollback()
+            raise
+        self.conn.execute("RELEASE add_flight")
+        self._commit()
+        return flight_id
+
+    def _insert_flight(self, params):
+        flight_id = self.conn.execute(INSERT_FLIGHT_SQL, params).lastrowid
+        self.conn.execute(FLIGHT_UTC_SQL, (flight_id,))
+        return flight_id
+
+    def flight(self, flight_id):
+        """Returns the Flight with this ID, or None."""
+        row = self.conn.execute(FLIGHT_BY_ID_SQL, (flight_id,)).fetchone()
+        return Flight(*row) if row else None
+
+    def find_flight(self, flight_number, departure_date):
+        """Returns the flight with this number on this date, or None."""
+        row = self.conn.execute(FIND_FLIGHT_BY_NUMBER_SQL, (flight_number, departure_date)).fetchone()
+        return Flight(*row) if row else None
+
+    def delete_flight(self, flight_id):
+        """Deletes a flight by ID; returns the number of flights deleted (0 or 1)."""
+        count = self.conn.execute(DELETE_FLIGHT_SQL, (flight_id,)).rowcount
+        self._commit()
+        return count
+
+    def flights_by_status(self, status):
+        """Returns every flight with this status in departure order."""
+        _check_status(status)
+        return list(self.iter_flights(status))
+
+    def _listings(self, rows):
+        """Builds FlightListings from Flight rows, resolving names from the cache.
+
+        Names are memoised for the call, so the shared LRU (and its lock) is used
+        once per distinct airport or pilot rather than three times per row.
+        """
+        dimensions, conn = self.dimensions, self.conn
+        cities, pilots = {}, {}
+        for flight_id, number, pilot_id, origin, destination, dep_date, dep_time, arr_date, arr_time, status in rows:
+            origin_city = cities.get(origin)
+            if origin_city is None:
+                origin_city = cities[origin] = dimensions.city(conn, origin)
+            destination_city = cities.get(destination)
+            if destination_city is None:
+                destination_city = cities[destination] = dimensions.city(conn, destination)
+            pilot = pilots.get(pilot_id)
+            if pilot is None:
+                pilot = pilots[pilot_id] = dimensions.pilot_name(conn, pilot_id)
+            yield FlightListing(flight_id, number, pilot_id, pilot, origin_city, destination_city,
+                                dep_date, dep_time, arr_date, arr_time, status)
+
+    def iter_flights(self, status=None, batch_size=DEFAULT_BATCH_SIZE):
+        """Yields flights (optionally of one status) in departure order, fetching lazily."""
+        return self._listings(iter_flights(self.conn, status, batch_size, joins=False))
+
+    def flight_page(self, status=None, after=None, before=None, page_size=DEFAULT_PAGE_SIZE):
+        """Returns one keyset page of flights; see listing.flight_page for after/before."""
+        rows = flight_page(self.conn, status, after=after, before=before, page_size=page_size, joins=False)
+        return list(self._listings(rows))
+
+    def set_status(self, flight_ids, status):
+        """Sets the status of one or more flights; returns the number of flights updated."""
+        _check_status(status)
+        ids = _ids(flight_ids)
+        if len(ids) == 1:
+            count = self.conn.execute(UPDATE_STATUS_SQL, (status, ids[0])).rowcount
+        else:
+            count = self.conn.execute(UPDATE_STATUSES_SQL, (status, json.dumps(ids))).rowcount
+        self._commit()
+        return count
+
+    def assign_pilot(self, flight_id, pilot_id, check_conflicts=True):
+        """Assigns a pilot to a flight; returns the number of flights updated.
+
+        Raises ScheduleConflictError if the pilot already flies a flight overlapping
+        this one, unless check_conflicts is False.
+        """
+        if check_conflicts:
+            conflict = find_pilot_conflict(self.conn, pilot_id, flight_id)
+            if conflict is not None:
+                raise ScheduleConflictError(
+                    f"Pilot {pilot_id} is already flying flight {conflict.flight_id} at that time.", [conflict])
+        count = self.conn.execute(ASSIGN_PILOT_SQL, (pilot_id, flight_id)).rowcount
+        self._commit()
+        return count
+
+    def remove_pilot(self, flight_id):
+        """Unassigns the pilot of a flight; returns the number of flights updated."""
+        count = self.conn.execute(REMOVE_PILOT_SQL, (flight_id,)).rowcount
+        self._commit()
+        return count
+
+# Bulk operations: one set-based statement in one transaction
+    def bulk_set_status(self, new_status, **criteria):
+        """Moves every flight matching flight_filter(**criteria) to new_status.
+
+        Only flights whose current status may change to new_status (STATUS_TRANSITIONS)
+        are updated; the others are left alone. Returns the number of flights updated.
+        Raises ValueError if a current status given in the filter can never make that change.
+        """
+        _check_status(new_status)
+        sources = STATUS_TRANSITIONS[new_status]
+        requested = criteria.get("status")
+        if requested:
+            requested = [requested] if isinstance(requested, str) else list(requested)
+            invalid = [s for s in requested if s not in sources]
+            if invalid:
+                raise ValueError(f"Flights cannot go from {', '.join(invalid)} to {new_status}.")
+        where, params = flight_filter(**criteria)
+        sql = (f"UPDATE Flight SET FlightStatus = ? WHERE {where}"
+               f" AND FlightStatus IN ({', '.join('?' for _ in sources)})")
+        count = self.conn.execute(sql, (new_status, *params, *sources)).rowcount
+        self._commit()
+        return count
+
+    def bulk_assign_pilot(self, pilot_id, check_conflicts=True, **criteria):
+        """Assigns pilot_id to every flight matching flight_filter(**criteria); returns the count.
+
+        Pass current_pilot_id=... to select flights by their present pilot, e.g. to hand
+        one pilot's flights in a departure window over to another. Nothing is updated,
+        and ScheduleConflictError is raised, if the flights would overlap each other or
+        the pilot's other flights (unless check_conflicts is False).
+        """
+        if "current_pilot_id" in criteria:
+            criteria["pilot_id"] = criteria.pop("current_pilot_id")
+        where, params = flight_filter(**criteria)
+        if not check_conflicts:
+            count = self.conn.execute(f"UPDATE Flight SET PilotID = ? WHERE {where}", (pilot_id, *params)).rowcount
+            self._commit()
+            return count
+        flight_ids = [row[0] for row in self.conn.execute(f"SELECT FlightID FROM Flight WHERE {where}", params)]
+        conflicts = find_assignment_conflicts(self.conn, pilot_id, flight_ids)
+        if conflicts:
+            raise ScheduleConflictError(
+                f"Pilot {pilot_id} would be on {len(conflicts)} overlapping flight pair(s).", conflicts)
+        count = self.conn.execute(ASSIGN_PILOTS_SQL, (pilot_id, json.dumps(flight_ids))).rowcount
+        self._commit()
+        return count
+
+    def bulk_remove_pilot(self, **criteria):
+        """Unassigns the pilot of every flight matching flight_filter(**criteria); returns the count."""
+        where, params = flight_filter(**criteria)
+        count = self.conn.execute(f"UPDATE Flight SET PilotID = NULL WHERE {where}", params).rowcount
+        self._commit()
+        return count
+
+    def auto_roster(self, start, end, min_rest_minutes=DEFAULT_MIN_REST_MINUTES, dry_run=False):
+        """Assigns pilots to the unassigned flights departing in a UTC window; see roster.auto_roster.
+
+        Returns {"assigned", "assignments", "unstaffed"}; with dry_run nothing is written.
+        """
+        return auto_roster(self.conn, start, end, min_rest_minutes, dry_run, commit=self.autocommit)
+
+# Pilots
+    def pilot(self, pilot_id):
+        """Returns the Pilot with this ID, or None."""
+        return self.dimensions.pilot(self.conn, pilot_id)
+
+    def add_pilot(self, first_name, last_name, email=None, phone_number=None):
+        """Adds a pilot and returns their PilotID."""
+        cursor = self.conn.execute(INSERT_PILOT_SQL, (first_name, last_name, email, phone_number))
+        self._commit()
+        self._invalidate(self.dimensions.invalidate_pilot, cursor.lastrowid)  # may be cached as unknown
+        return cursor.lastrowid
+
+    def search_pilots(self, text, limit=DEFAULT_SEARCH_LIMIT):
+        """Pilots with a name or e-mail word starting with each word of text, best first (see search.py)."""
+        return self.search.pilots(self.conn, text, limit)
+
+    def pilot_schedule(self, pilot_id):
+        """Returns a pilot's flights in departure order."""
+        cities = {}
+        entries = []
+        for row in self.conn.execute(PILOT_SCHEDULE_SQL, (pilot_id,)):
+            for code in (row[6], row[7]):
+                if code not in cities:
+                    cities[code] = self.dimensions.city(self.conn, code)
+            entries.append(ScheduleEntry(*row[:6], cities[row[6]], cities[row[7]], row[8]))
+        return entries
+
+# Airports
+    def airport(self, code):
+        """Returns the Airport with this code, or None."""
+        return self.dimensions.airport(self.conn, code)
+
+    def search_airports(self, text, limit=DEFAULT_SEARCH_LIMIT):
+        """Airports with a code, name, city or country word starting with each word of text, best first."""
+        return self.search.airports(self.conn, text, limit)
+
+    def add_airport(self, code, name, city, country, time_zone=None):
+        """Adds an airport; time_zone is an IANA name such as 'Europe/London'.
+
+        Flights at an airport without a time zone have no UTC times until one is set.
+        """
+        if time_zone is not None:
+            check_time_zone(time_zone)
+        self.conn.execute(INSERT_AIRPORT_SQL, (code, name, city, country, time_zone))
+        if time_zone is not None:  # flights may already name the airport
+            self._set_flight_times(code, time_zone)
+        self._commit()
+        self._invalidate(self.dimensions.invalidate_airport, code)
+
+    def set_time_zone(self, code, time_zone):
+        """Sets an airport's time zone and recomputes its flights' UTC times; returns the airports updated."""
+        check_time_zone(time_zone)
+        count = self.conn.execute(UPDATE_TIME_ZONE_SQL, (time_zone, code)).rowcount
+        if count:
+            self._set_flight_times(code, time_zone)
+        self._commit()
+        self._invalidate(self.dimensions.invalidate_airport, code)
+        return count
+
+    def _set_flight_times(self, code, time_zone):
+        for sql in AIRPORT_FLIGHTS_UTC_SQL:
+            self.conn.execute(sql, (time_zone, code))
+
+# Reports
+    def destination_counts(self):
+        """Number of flights per arrival city, busiest first (Q9/Q12)."""
+        return [CityCount(*row) for row in self.conn.execute(FLIGHT_COUNT_BY_DESTINATION_SQL)]
+
+    def flights_per_pilot(self):
+        """Number of flights per pilot, busiest first (Q11)."""
+        return [PilotCount(*row) for row in self.conn.execute(FLIGHTS_PER_PILOT_SQL)]
+
+    def flights_departing_between(self, start, end):
+        """Flights departing in [start, end) in UTC, in departure order, as TimedFlight rows.
+
+        start and end are epoch seconds, datetimes (naive means UTC) or 'YYYY-MM-DD[ HH:MM]'
+        strings in UTC; a bare end date includes that whole day.
+        """
+        params = (parse_utc(start), parse_utc(end, end_of_day=True))
+        return [TimedFlight(*row) for row in self.conn.execute(DEPARTING_BETWEEN_SQL, params)]
+
+    def flights_arriving_between(self, start, end):
+        """Flights arriving in [start, end) in UTC, in arrival order; see flights_departing_between."""
+        params = (parse_utc(start), parse_utc(end, end_of_day=True))
+        return [TimedFlight(*row) for row in self.conn.execute(ARRIVING_BETWEEN_SQL, params)]
+
+    def block_times(self, start, end, by="route"):
+        """Block-time statistics of the flights departing in [start, end), per route or per pilot.
+
+        Returns BlockTime rows, most total block time first. A route's key is
+        'ORIGIN-DEST' and its label the two cities; a pilot's key is the PilotID.
+        """
+        if by not in BLOCK_TIMES_SQL:
+            raise ValueError(f"Cannot group block times by '{by}'. Choose from: {', '.join(BLOCK_TIMES_SQL)}")
+        params = (parse_utc(start), parse_utc(end, end_of_day=True))
+        rows = []
+        for row in self.conn.execute(BLOCK_TIMES_SQL[by], params):
+            if by == "route":
+                origin, destination, *stats = row
+                key = f"{origin}-{destination}"
+                label = (f"{self.dimensions.city(self.conn, origin)} → "
+                         f"{self.dimensions.city(self.conn, destination)}")
+            else:
+                key, *stats = row
+                label = self.dimensions.pilot_name(self.conn, key)
+            rows.append(BlockTime(key, label, *stats))
+        return rows
+
+    def itineraries(self, origin, destination, depart_after, arrive_by=None, max_legs=DEFAULT_MAX_LEGS):
+        """Connecting-flight itineraries from origin to destination, as Itinerary rows.
+
+        The Pareto-optimal options within max_legs flights: fewest legs first, each
+        later one arriving earlier. Times are UTC, as for flights_departing_between;
+        the timetable is refreshed first, re-reading only the days that changed.
+        """
+        for code in (origin, destination):
+            if self.dimensions.airport(self.conn, code) is None:
+                raise ValueError(f"Unknown airport '{code}'.")
+        self.timetable.refresh(self.conn)
+        return self.timetable.options(self.conn, origin, destination, depart_after, arrive_by, max_legs)
+
+    def pilot_conflicts(self, pilot_id=None):
+        """Overlapping flight pairs of one pilot, or of every pilot, as PilotConflict rows."""
+        return find_conflicts(self.conn, pilot_id)
+
+# Change log
+    def changes(self, since=0, limit=DEFAULT_CHANGE_BATCH):
+        """Up to limit ChangeEvents after sequence number since, oldest first (see changelog.py).
+
+        Raises changelog.ChangeLogGapError if they have been compacted away.
+        """
+        return changes_since(self.conn, since, limit)
+
+    def latest_change(self):
+        """The sequence number of the newest change; a consumer's starting point after reading the tables."""
+        return latest_seq(self.conn)
@@ -0,0 +1,253 @@
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from connection import DB_PATH, connect
+from models import CityCount, PilotCount
+from schema import migrate
+
+# Hot/archive split. Finished (Completed or Cancelled) flights that departed
+# before a cutoff are moved out of Flight into the same table in a separate
+# SQLite file, so the hot table - and every listing, sweep and index over it -
+# only holds flights that can still change.
+#
+# archive_flights() moves them in batches with the archive ATTACHed to the main
+# connection. In WAL mode a transaction across two files is atomic in each file
+# but not across them, so each batch is two transactions: copy into the archive
+# (INSERT OR IGNORE, committed with synchronous=FULL), then delete from Flight
+# only the rows the archive now holds. A run stopped between the two leaves
+# copies that the next run skips before finishing the delete; no flight is ever
+# in neither table. Archived flights are final, so the copies never go stale.
+#
+# The summary tables (Q9/Q11/Q12) and triggers only see the hot table. Reports
+# over all flights ever flown read AllFlight, a TEMP UNION ALL view over both
+# tables created by attached(); history_destination_counts() and
+# history_flights_per_pilot() are the all-time versions of those reports.
+
+ARCHIVE_SCHEMA = "archive"
+DEFAULT_AGE_DAYS = 90
+DEFAULT_BATCH_SIZE = 5000
+ARCHIVED_STATUSES = ('Completed', 'Cancelled')
+
+FLIGHT_COLUMNS = """
+    FlightID, FlightNumber, PilotID, DepartureAirport, ArrivalAirport,
+    DepartureDate, DepartureTime, ArrivalDate, ArrivalTime, FlightStatus,
+    DepartureUTC, ArrivalUTC
+"""
+
+# No foreign keys: they cannot reach the Airport and Pilot tables in the main file.
+ARCHIVE_TABLE_SQL = f"""
+    CREATE TABLE IF NOT EXISTS {ARCHIVE_SCHEMA}.Flight (
+        FlightID INTEGER PRIMARY KEY,
+        FlightNumber TEXT NOT NULL,
+        PilotID INTEGER,
+        DepartureAirport TEXT NOT NULL,
+        ArrivalAirport TEXT NOT NULL,
+        DepartureDate DATE NOT NULL,
+        DepartureTime TIME NOT NULL,
+        ArrivalDate DATE NOT NULL,
+        ArrivalTime TIME NOT NULL,
+        FlightStatus TEXT NOT NULL CHECK (FlightStatus IN ('Completed', 'Cancelled')),
+        DepartureUTC INTEGER,
+        ArrivalUTC INTEGER
+    )
+"""
+
+ARCHIVE_INDEX_SQL = (f"CREATE INDEX IF NOT EXISTS {ARCHIVE_SCHEMA}.idx_archive_departure"
+                     " ON Flight (DepartureDate, DepartureTime)")
+
+# A flight copied by an interrupted run is in both tables until the next run
+# deletes it; the rowid probe keeps it from being counted twice meanwhile.
+ALL_FLIGHTS_VIEW_SQL = f"""
+    CREATE TEMP VIEW IF NOT EXISTS AllFlight AS
+    SELECT {FLIGHT_COLUMNS} FROM main.Flight
+    UNION ALL
+    SELECT {FLIGHT_COLUMNS} FROM {ARCHIVE_SCHEMA}.Flight a
+    WHERE NOT EXISTS (SELECT 1 FROM main.Flight m WHERE m.FlightID = a.FlightID)
+"""
+
+# One batch: a range of idx_flight_status_departure per archived status.
+ARCHIVABLE_FLIGHTS_SQL = f"""
+    SELECT FlightID FROM main.Flight
+    WHERE FlightStatus IN ({', '.join('?' for _ in ARCHIVED_STATUSES)}) AND DepartureDate < ?
+    LIMIT ?
+"""
+
+COPY_FLIGHTS_SQL = f"""
+    INSERT OR IGNORE INTO {ARCHIVE_SCHEMA}.Flight ({FLIGHT_COLUMNS})
+    SELECT {FLIGHT_COLUMNS} FROM main.Flight
+    WHERE FlightID IN (SELECT value FROM json_each(?))
+"""
+
+DELETE_ARCHIVED_SQL = f"""
+    DELETE FROM main.Flight WHERE FlightID IN (
+        SELECT FlightID FROM {ARCHIVE_SCHEMA}.Flight WHERE FlightID IN (SELECT value FROM json_each(?))
+    )
+"""
+
+HISTORY_DESTINATION_COUNTS_SQL = """
+    SELECT d.City, COUNT(*)
+    FROM AllFlight f
+    JOIN Airport d ON f.ArrivalAirport = d.AirportCode
+    GROUP BY d.City
+    ORDER BY COUNT(*) DESC
+"""
+
+HISTORY_FLIGHTS_PER_PILOT_SQL = """
+    SELECT
+        f.PilotID,
+        IFNULL(p.FirstName || ' ' || p.LastName, 'Unassigned'),
+        COUNT(*)
+    FROM AllFlight f
+    LEFT JOIN Pilot p ON f.PilotID = p.PilotID
+    GROUP BY f.PilotID
+    ORDER BY COUNT(*) DESC
+"""
+
+
+def archive_path(db_path):
+    """The default archive file for a database: FlightManagement.db -> FlightManagement-archive.db."""
+    root, ext = os.path.splitext(db_path)
+    return f"{root}-archive{ext or '.db'}"
+
+
+@contextmanager
+def attached(conn, path):
+    """ATTACHes the archive at path (creating it if needed) and the AllFlight view, for a block.
+
+    The connection must not be inside a transaction on entry or exit.
+    """
+    conn.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (path,))
+    try:
+        conn.execute(f"PRAGMA {ARCHIVE_SCHEMA}.journal_mode = WAL")
+        conn.execute(f"PRAGMA {ARCHIVE_SCHEMA}.synchronous = FULL")  # a copy is durable before its delete
+        conn.execute(ARCHIVE_TABLE_SQL)
+        conn.execute(ARCHIVE_INDEX_SQL)
+        conn.execute(ALL_FLIGHTS_VIEW_SQL)
+        conn.commit()
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        conn.execute("DROP VIEW IF EXISTS temp.AllFlight")
+        conn.execute(f"DETACH DATABASE {ARCHIVE_SCHEMA}")
+
+
+def cutoff_date(older_than_days=DEFAULT_AGE_DAYS, today=None):
+    """'YYYY-MM-DD' of the first departure date that is kept hot."""
+    return ((today or date.today()) - timedelta(days=older_than_days)).isoformat()
+
+
+def archive_flights(conn, before, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """Moves finished flights departing before the date `before` into the attached archive.
+
+    Each batch of up to batch_size flights is copied, then deleted, in two
+    transactions (see the top of this module); progress, if given, is called with
+    the running total after each batch. Returns the number of flights moved.
+    """
+    date.fromisoformat(before)  # ValueError on a malformed cutoff
+    moved = 0
+    while True:
+        ids = [row[0] for row in conn.execute(ARCHIVABLE_FLIGHTS_SQL, (*ARCHIVED_STATUSES, before, batch_size))]
+        if not ids:
+            return moved
+        batch = json.dumps(ids)
+        for sql in (COPY_FLIGHTS_SQL, DELETE_ARCHIVED_SQL):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                count = conn.execute(sql, (batch,)).rowcount
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        moved += count
+        if progress:
+            progress(moved)
+
+
+def history_destination_counts(conn):
+    """Flights per arrival city over hot and archived flights (the all-time Q9/Q12)."""
+    return [CityCount(*row) for row in conn.execute(HISTORY_DESTINATION_COUNTS_SQL)]
+
+
+def history_flights_per_pilot(conn):
+    """Flights per pilot over hot and archived flights (the all-time Q11)."""
+    return [PilotCount(*row) for row in conn.execute(HISTORY_FLIGHTS_PER_PILOT_SQL)]
+
+
+def table_sizes(conn, schema="main"):
+    """Rows and bytes in use (table plus its indexes, from dbstat) of a schema's Flight table.
+
+    Deleted rows free space inside pages at once, but the file only shrinks on
+    VACUUM. Bytes are None if this SQLite was built without the dbstat table.
+    """
+    rows = conn.execute(f"SELECT COUNT(*) FROM {schema}.Flight").fetchone()[0]
+    try:
+        size = conn.execute(
+            f"SELECT SUM(pgsize - unused) FROM dbstat(?) WHERE name IN"
+            f" (SELECT name FROM {schema}.sqlite_master WHERE tbl_name = 'Flight')", (schema,)).fetchone()[0]
+    except sqlite3.OperationalError:
+        size = None
+    return {"rows": rows, "bytes": size}
+
+
+def _describe(sizes):
+    if sizes["bytes"] is None:
+        return f"{sizes['rows']} flights"
+    return f"{sizes['rows']} flights, {(sizes['bytes'] or 0) / 1024 / 1024:.1f} MB in use with indexes"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Move finished flights into an archive database.")
+    parser.add_argument("command", choices=("run", "status", "report"),
+                        help="run: archive old flights; status: table sizes; report: all-time counts")
+    parser.add_argument("--db", default=DB_PATH, help="SQLite database file")
+    parser.add_argument("--archive", help="archive database file (default: <db>-archive.db)")
+    parser.add_argument("--older-than", type=int, default=DEFAULT_AGE_DAYS, metavar="DAYS",
+                        help="archive flights that departed more than this many days ago")
+    parser.add_argument("--before", metavar="YYYY-MM-DD", help="archive flights departing before this date instead")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM the main database afterwards to shrink the file")
+    args = parser.parse_args(argv)
+
+    conn = connect(args.db)
+    migrate(conn)
+    with attached(conn, args.archive or archive_path(args.db)):
+        if args.command == "report":
+            print(f"{'City':<25} | {'All-time flights':>16}")
+            print("-" * 45)
+            for row in history_destination_counts(conn):
+                print(f"{row.city:<25} | {row.flight_count:>16}")
+            print(f"\n{'Pilot':<25} | {'All-time flights':>16}")
+            print("-" * 45)
+            for row in history_flights_per_pilot(conn):
+                print(f"{row.pilot:<25} | {row.flight_count:>16}")
+            return 0
+
+        before = table_sizes(conn)
+        print(f"Hot:     {_describe(before)}")
+        print(f"Archive: {_describe(table_sizes(conn, ARCHIVE_SCHEMA))}")
+        if args.command == "status":
+            return 0
+
+        cutoff = args.before or cutoff_date(args.older_than)
+        print(f"\nArchiving {' and '.join(ARCHIVED_STATUSES)} flights departing before {cutoff} ...")
+        start = time.perf_counter()
+        moved = archive_flights(conn, cutoff, args.batch_size,
+                                progress=lambda total: print(f"  {total} moved", end="\r", flush=True))
+        print(f"\rMoved {moved} flights in {time.perf_counter() - start:.1f}s.")
+        print(f"Hot:     {_describe(table_sizes(conn))}")
+        print(f"Archive: {_describe(table_sizes(conn, ARCHIVE_SCHEMA))}")
+    if args.vacuum and moved:
+        conn.execute("VACUUM")
+        print(f"Vacuumed {args.db}: {os.path.getsize(args.db) / 1024 / 1024:.1f} MB.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,300 @@
+import argparse
+import errno
+import fcntl
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+import datagen
+from connection import DB_PATH, connect
+from schema import SCHEMA_VERSION, migrate
+
+# Online backup, restore and fast clones of a flight database.
+#
+# backup() uses the SQLite online backup API (Connection.backup), which copies
+# a consistent image of the database page by page. Copying the file instead can
+# tear: a commit or checkpoint may land half-way through the copy. The copy
+# runs `pages` pages per step with `sleep` seconds between steps. In WAL mode
+# the source connection holds one read transaction for the whole copy: writers
+# never wait on it, and the backup copies that snapshot without restarting
+# when they commit. With a rollback journal that read lock would block every
+# commit, so the lock is only held during each step. Another connection's
+# commit then restarts the copy, and after max_restarts the rest is copied in
+# a single step. The image is written to DEST.part and renamed over DEST once
+# complete, so DEST is always a whole backup.
+#
+# With incremental=True, a backup whose source files (database and -wal) are
+# unchanged since the last backup to DEST is skipped. DEST.state records that
+# fingerprint.
+#
+# restore() copies a backup over a live database through the same API, in one
+# step, so other connections see either the old or the restored database. It
+# then moves the change log sequence and the timetable day versions past the
+# values the live database had, so change log consumers read RESYNC entries
+# (and re-read the tables) and itinerary timetables reload. Long-running processes should
+# still be restarted: their dimension caches hold the pre-restore rows.
+#
+# clone() and fixture_database() are for tests and benchmarks. A template
+# database is generated once per (flights, seed, schema version) and then
+# copied. The copy is a copy-on-write reflink where the filesystem supports it,
+# else a plain file copy.
+
+DEFAULT_PAGES = 1024  # per step: 4 MiB at the default 4 KiB page size
+DEFAULT_SLEEP = 0.005  # seconds between steps
+DEFAULT_MAX_RESTARTS = 3
+DEFAULT_TEMPLATE_DIR = os.path.join(tempfile.gettempdir(), "flight-templates")
+
+FICLONE = 0x40049409  # Linux ioctl: share the source file's extents (btrfs, XFS, ...)
+
+
+class _Restarted(Exception):
+    pass
+
+
+def fingerprint(path):
+    """(size, mtime_ns) of the database file and its -wal file; any commit or checkpoint changes it.
+
+    An empty -wal file (a reader opened the database) counts as absent.
+    """
+    parts = []
+    for name in (path, path + "-wal"):
+        try:
+            stat = os.stat(name)
+        except FileNotFoundError:
+            stat = None
+        parts.append([stat.st_size, stat.st_mtime_ns] if stat and (stat.st_size or name == path) else None)
+    return parts
+
+
+def _state_path(dest):
+    return dest + ".state"
+
+
+def _remove_database(path):
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def _quick_check(path):
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        result = conn.execute("PRAGMA quick_check").fetchone()[0]
+    finally:
+        conn.close()
+    if result != "ok":
+        raise ValueError(f"{path} failed its integrity check: {result}")
+
+
+def backup(source=DB_PATH, dest=None, pages=DEFAULT_PAGES, sleep=DEFAULT_SLEEP, incremental=False,
+           max_restarts=DEFAULT_MAX_RESTARTS, verify=False, progress=None):
+    """Copies the live database at source to dest without stalling writers; returns a summary dict.
+
+    progress, if given, is called as progress(remaining, total) after each step.
+    With verify, the copy must pass PRAGMA quick_check before it replaces dest.
+    """
+    if dest is None:
+        raise ValueError("A backup needs a destination file.")
+    if os.path.abspath(source) == os.path.abspath(dest):
+        raise ValueError("The backup destination must differ from the source.")
+    before = fingerprint(source)
+    if incremental and os.path.exists(dest) and os.path.exists(_state_path(dest)):
+        with open(_state_path(dest), encoding="utf-8") as handle:
+            if json.load(handle).get("fingerprint") == before:
+                return {"copied": False, "pages": 0, "restarts": 0, "seconds": 0.0, "bytes": os.path.getsize(dest)}
+
+    start = time.perf_counter()
+    part = dest + ".part"
+    _remove_database(part)
+    src = connect(source, "reporting")
+    target = sqlite3.connect(part)
+    copied = {"pages": 0, "restarts": 0}
+    try:
+        pinned = src.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        if pinned:
+            src.execute("BEGIN")
+            src.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()  # starts the read transaction
+
+        def step(status, remaining, total):
+            if copied["pages"] and total - remaining < copied["pages"]:
+                copied["restarts"] += 1
+                if copied["restarts"] > max_restarts:
+                    raise _Restarted()
+            copied["pages"] = total - remaining
+            if progress:
+                progress(remaining, total)
+
+        try:
+            src.backup(target, pages=pages, progress=step, sleep=sleep)
+        except _Restarted:
+            src.backup(target, pages=-1, progress=step)
+        if pinned:
+            src.commit()
+    finally:
+        src.close()
+        target.close()
+    if verify:
+        _quick_check(part)
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(dest + suffix):
+            os.remove(dest + suffix)
+    os.replace(part, dest)
+    result = {"copied": True, "pages": copied["pages"], "restarts": copied["restarts"],
+              "seconds": round(time.perf_counter() - start, 3), "bytes": os.path.getsize(dest)}
+    with open(_state_path(dest), "w", encoding="utf-8") as handle:
+        json.dump({"source": os.path.abspath(source), "fingerprint": before, "finished": time.time(), **result},
+                  handle)
+    return result
+
+
+def restore(backup_path, dest=DB_PATH):
+    """Replaces the database at dest with a backup, atomically for other connections; returns a summary dict.
+
+    The backup is checked (PRAGMA quick_check) first and migrated afterwards if
+    it predates the current schema.
+    """
+    _quick_check(backup_path)
+    start = time.perf_counter()
+    conn = connect(dest)
+    try:
+        migrate(conn)
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'ChangeLog'").fetchone()
+        last_change = row[0] if row else 0
+        last_version = conn.execute("SELECT IFNULL(MAX(Version), 0) FROM ScheduleDay").fetchone()[0]
+        src = sqlite3.connect(f"file:{backup_path}?mode=ro", uri=True)
+        try:
+            src.backup(conn)
+        finally:
+            src.close()
+        migrate(conn)
+        with conn:
+            if last_change:
+                # sqlite_sequence has no key on name: update the row, or add it if the backup never logged
+                if not conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'ChangeLog'",
+                                    (last_change,)).rowcount:
+                    conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('ChangeLog', ?)", (last_change,))
+                conn.executemany("INSERT INTO ChangeLog (TableName, Operation, ChangedAt)"
+                                 " VALUES (?, 'RESYNC', CAST(strftime('%s', 'now') AS INTEGER))",
+                                 [("Airport",), ("Pilot",), ("Flight",)])
+            conn.execute("UPDATE ScheduleDay SET Version = Version + ?", (last_version,))
+        flights = conn.execute("SELECT COUNT(*) FROM Flight").fetchone()[0]
+    finally:
+        conn.close()
+    return {"flights": flights, "seconds": round(time.perf_counter() - start, 3)}
+
+
+def _reflink(source, dest):
+    """Clones source into a new file dest sharing its extents; False if the filesystem cannot."""
+    with open(source, "rb") as src, open(dest, "wb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            return True
+        except OSError as e:
+            if e.errno in (errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.EBADF):
+                return False
+            raise
+
+
+def clone(source, dest):
+    """Copies a database that is not being written (e.g. a template) to a new file dest; returns the method.
+
+    A database whose -wal file is empty or absent is fully contained in its main
+    file, which is reflinked or copied; otherwise the backup API is used.
+    """
+    if os.path.exists(dest):
+        raise FileExistsError(f"{dest} already exists; clone into a new file.")
+    wal = source + "-wal"
+    if os.path.exists(wal) and os.path.getsize(wal) > 0:
+        backup(source, dest, pages=-1)
+        os.remove(_state_path(dest))
+        return "backup"
+    if _reflink(source, dest):
+        return "reflink"
+    shutil.copyfile(source, dest)
+    return "copy"
+
+
+def template(flights, seed=42, template_dir=DEFAULT_TEMPLATE_DIR):
+    """Path of a generated database with this many flights, creating it on first use.
+
+    Templates are keyed by schema version too, so a migration never serves a stale one.
+    """
+    os.makedirs(template_dir, exist_ok=True)
+    path = os.path.join(template_dir, f"flights-{flights}-seed{seed}-v{SCHEMA_VERSION}.db")
+    if not os.path.exists(path):
+        building = f"{path}.{os.getpid()}.building"
+        _remove_database(building)
+        datagen.create_database(building, flights, seed)
+        conn = sqlite3.connect(building)
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.close()
+        _remove_database(building + "-wal")
+        os.replace(building, path)  # concurrent builders: the last one wins, every one is complete
+    return path
+
+
+def fixture_database(path, flights, seed=42, template_dir=DEFAULT_TEMPLATE_DIR):
+    """Creates path as a copy of the template for (flights, seed); returns the clone method used."""
+    return clone(template(flights, seed, template_dir), path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Back up, restore or clone the flight database.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    backing = sub.add_parser("backup", help="online backup that does not stall writers")
+    backing.add_argument("dest")
+    backing.add_argument("--pages", type=int, default=DEFAULT_PAGES, help="pages copied per step (-1: all at once)")
+    backing.add_argument("--sleep", type=float, default=DEFAULT_SLEEP, help="seconds between steps")
+    backing.add_argument("--incremental", action="store_true", help="skip if the database has not changed since")
+    backing.add_argument("--verify", action="store_true", help="integrity-check the copy before keeping it")
+
+    restoring = sub.add_parser("restore", help="replace the database with a backup")
+    restoring.add_argument("backup")
+
+    cloning = sub.add_parser("clone", help="copy a database that is not in use to a new file")
+    cloning.add_argument("dest")
+
+    fixture = sub.add_parser("fixture", help="create a generated database from a cached template")
+    fixture.add_argument("dest")
+    fixture.add_argument("--flights", type=int, required=True)
+    fixture.add_argument("--seed", type=int, default=42)
+    fixture.add_argument("--template-dir", default=DEFAULT_TEMPLATE_DIR)
+
+    for command in sub.choices.values():
+        command.add_argument("--db", default=DB_PATH, help="SQLite database file")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "backup":
+            result = backup(args.db, args.dest, args.pages, args.sleep, args.incremental, verify=args.verify)
+            if not result["copied"]:
+                print(f"{args.db} is unchanged since the last backup to {args.dest}; nothing copied.")
+            else:
+                print(f"Backed up {args.db} to {args.dest}: {result['bytes'] / 2**20:.1f} MB, "
+                      f"{result['pages']} pages in {result['seconds']:.2f}s ({result['restarts']} restart(s)).")
+        elif args.command == "restore":
+            result = restore(args.backup, args.db)
+            print(f"Restored {args.db} from {args.backup}: {result['flights']} flights in {result['seconds']:.2f}s. "
+                  "Restart any running server or menu.")
+        elif args.command == "clone":
+            start = time.perf_counter()
+            method = clone(args.db, args.dest)
+            print(f"Cloned {args.db} to {args.dest} ({method}) in {(time.perf_counter() - start) * 1000:.1f} ms.")
+        else:
+            start = time.perf_counter()
+            method = fixture_database(args.dest, args.flights, args.seed, args.template_dir)
+            print(f"Created {args.dest} with {args.flights} flights ({method}) in "
+                  f"{(time.perf_counter() - start) * 1000:.1f} ms.")
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"Error: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
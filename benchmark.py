@@ -0,0 +1,1373 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+
+import analytics
+import api
+import archive
+import backup
+import cache
+import changelog
+import columnar
+import datagen
+import instrumentation
+import itinerary
+import listing
+import parallel_reports
+import render
+import roster
+import schema
+import search
+from api import FlightAPI
+from models import FlightListing, Pilot, ScheduleEntry
+from connection import PROFILES, READ_ONLY_PROFILES, connect
+from scheduling import find_conflicts, find_pilot_conflict
+from services import FlightService
+from writer import GroupCommitWriter
+
+DEFAULT_SCALES = [1000, 10000, 100000]
+
+
+def time_call(fn, repeat):
+    """Runs fn repeat times and returns timing stats in milliseconds plus fn's last result."""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "min_ms": round(min(timings), 4),
+        "median_ms": round(statistics.median(timings), 4),
+        "max_ms": round(max(timings), 4),
+    }, result
+
+
+def _rolled_back(conn, fn):
+    """Wraps a write so it can be timed repeatedly without changing the data."""
+    def run():
+        try:
+            return fn()
+        finally:
+            conn.rollback()
+    return run
+
+
+def query_operations(service):
+    """Returns (name, callable) pairs covering every FlightService operation (Q1-Q12).
+
+    The operations go through FlightAPI. Writes are rolled back after each run.
+    Each callable returns the number of rows it read or wrote.
+    """
+    conn = service.conn
+    flights = FlightAPI(conn, autocommit=False)
+    if service.instrumentation is not None:
+        service.instrumentation.wrap(flights)
+    busiest_pilot = conn.execute(
+        "SELECT PilotID FROM Flight WHERE PilotID IS NOT NULL GROUP BY PilotID ORDER BY COUNT(*) DESC LIMIT 1"
+    ).fetchone()[0]
+    flight_id, flight_number, departure_date = conn.execute(
+        "SELECT FlightID, FlightNumber, DepartureDate FROM Flight ORDER BY FlightID LIMIT 1 OFFSET "
+        "(SELECT COUNT(*) / 2 FROM Flight)"
+    ).fetchone()
+    middle_key = flights.flight_page(after=(departure_date, "00:00", 0), page_size=1)[0].key
+    # Synthetic schedules double-book pilots, so Q4 needs a flight the busiest pilot is free for.
+    free_flight_id = next(
+        (fid for (fid,) in conn.execute("SELECT FlightID FROM Flight WHERE FlightID >= ? ORDER BY FlightID", (flight_id,))
+         if find_pilot_conflict(conn, busiest_pilot, fid) is None), flight_id)
+
+    def count(fn, *args, **kwargs):
+        return lambda: len(fn(*args, **kwargs))
+
+    def write(fn, *args, **kwargs):
+        return _rolled_back(conn, lambda: int(bool(fn(*args, **kwargs))))
+
+    def stream(status=None):
+        return lambda: sum(1 for _ in flights.iter_flights(status))
+
+    def delete_by_number():
+        return flights.delete_flight(flights.find_flight(flight_number, departure_date).flight_id)
+
+    return [
+        ("Q1 add flight", write(flights.add_flight, 'BA9999', 'LHR', 'JFK', '2025-10-10', '08:00',
+                                '2025-10-10', '11:30', 'Scheduled', busiest_pilot)),
+        ("Q2 flights by status", stream("Delayed")),
+        ("Q3 update status", write(flights.set_status, flight_id, "Delayed")),
+        ("Q4 assign pilot", write(flights.assign_pilot, free_flight_id, busiest_pilot)),
+        ("Q5 remove pilot", write(flights.remove_pilot, flight_id)),
+        ("Q6 pilot schedule", count(flights.pilot_schedule, busiest_pilot)),
+        ("Q7 add airport", _rolled_back(conn, lambda: flights.add_airport("ZZZZ", "Bench Airport", "Bench City", "Nowhere") or 1)),
+        ("Q8 flight details", stream()),
+        ("Q8 first page", count(flights.flight_page)),
+        ("Q8 middle page", count(flights.flight_page, after=middle_key)),
+        ("Q9 flight summary", count(flights.destination_counts)),
+        ("Q10 delete by number", _rolled_back(conn, delete_by_number)),
+        ("Q11 flights per pilot", count(flights.flights_per_pilot)),
+        ("Q12 count by destination", count(flights.destination_counts)),
+    ]
+
+
+def run_query_benchmark(scales, seed=42, repeat=5, workdir=None):
+    """Generates a database per scale and times every FlightService operation against it."""
+    results = {}
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        for flights in scales:
+            path = os.path.join(tmp, f"bench_{flights}.db")
+            start = time.perf_counter()
+            datagen.create_database(path, flights, seed)
+            generate_s = time.perf_counter() - start
+
+            service = FlightService(path)
+            operations = {}
+            for name, fn in query_operations(service):
+                stats, rows = time_call(fn, repeat)
+                stats["rows"] = rows
+                operations[name] = stats
+                print(f"  {flights:>10} flights | {name:<26} | median {stats['median_ms']:>10.3f} ms | rows {rows}")
+            service.conn.close()
+            results[str(flights)] = {
+                "generate_s": round(generate_s, 3),
+                "db_bytes": os.path.getsize(path),
+                "operations": operations,
+            }
+    return results
+
+
+def _concurrent_load(path, profile, write_conn, seconds):
+    """Runs pilot-schedule reads on a second connection while write_conn commits single updates.
+
+    Returns per-second rates for reads and writes, and how many reads failed with
+    'database is locked'.
+    """
+    reader_profile = "reporting" if profile == "interactive" else profile
+    stop = threading.Event()
+    counts = {"reads": 0, "locked": 0}
+
+    def reader():
+        conn = connect(path, reader_profile, check_same_thread=False)
+        while not stop.is_set():
+            try:
+                conn.execute(api.PILOT_SCHEDULE_SQL, (counts["reads"] % 50 + 1,)).fetchall()
+                counts["reads"] += 1
+            except sqlite3.OperationalError:
+                counts["locked"] += 1
+        conn.close()
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    writes = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        write_conn.execute(api.UPDATE_STATUS_SQL, ("Delayed" if writes % 2 else "Scheduled", writes % 1000 + 1))
+        write_conn.commit()
+        writes += 1
+    stop.set()
+    thread.join()
+    elapsed = time.perf_counter() - start
+    return {
+        "concurrent_reads_per_s": round(counts["reads"] / elapsed, 1),
+        "concurrent_writes_per_s": round(writes / elapsed, 1),
+        "concurrent_reads_locked": counts["locked"],
+    }
+
+
+def run_profile_benchmark(flights, seed=42, writes=500, seconds=2.0, repeat=3, workdir=None):
+    """Compares the connection profiles on one generated database.
+
+    For each profile: single-statement commits per second (the update methods'
+    pattern), report query latency, and read/write throughput when a reader and a
+    writer run at the same time for the given number of seconds.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        base = os.path.join(tmp, "base.db")
+        datagen.create_database(base, flights, seed)
+        for profile in PROFILES:
+            path = os.path.join(tmp, f"{profile}.db")
+            shutil.copyfile(base, path)
+            if profile in READ_ONLY_PROFILES:
+                connect(path, "interactive").close()  # read-only connections can't switch to WAL
+            conn = connect(path, profile)
+            entry = {"settings": PROFILES[profile]}
+
+            for name, sql in (("Q8 flight details", listing.listing_sql()),
+                              ("Q9 flight summary", api.FLIGHT_COUNT_BY_DESTINATION_SQL)):
+                entry[name], _ = time_call(lambda: conn.execute(sql).fetchall(), repeat)
+
+            if profile not in READ_ONLY_PROFILES:
+                start = time.perf_counter()
+                for i in range(writes):
+                    conn.execute(api.UPDATE_STATUS_SQL, ("Delayed", i + 1))
+                    conn.commit()
+                entry["commits_per_s"] = round(writes / (time.perf_counter() - start), 1)
+
+                entry.update(_concurrent_load(path, profile, conn, seconds))
+            conn.close()
+
+            results[profile] = entry
+            summary = ", ".join(f"{k}={v}" for k, v in entry.items() if k != "settings" and not isinstance(v, dict))
+            print(f"  {profile:<12} | Q8 median {entry['Q8 flight details']['median_ms']:>9.2f} ms | "
+                  f"Q9 median {entry['Q9 flight summary']['median_ms']:>7.2f} ms | {summary}")
+    return results
+
+
+def _latency_stats(latencies_ms, elapsed_s):
+    cuts = statistics.quantiles(latencies_ms, n=100)
+    return {
+        "writes_per_s": round(len(latencies_ms) / elapsed_s, 1),
+        "p50_ms": round(cuts[49], 3),
+        "p99_ms": round(cuts[98], 3),
+    }
+
+
+def _run_writers(threads, writes, write):
+    """Runs write(thread_index, i) writes times on each of threads threads; returns latency stats."""
+    latencies = []
+    errors = []
+
+    def worker(index):
+        for i in range(writes):
+            start = time.perf_counter()
+            try:
+                write(index, i)
+            except sqlite3.OperationalError as e:
+                errors.append(str(e))
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    pool = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+    start = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    stats = _latency_stats(latencies, time.perf_counter() - start)
+    stats["errors"] = len(errors)
+    return stats
+
+
+def run_write_benchmark(flights, seed=42, threads=8, writes=300, profiles=("interactive", "legacy"), workdir=None):
+    """Compares per-statement commits with the group-commit writer for concurrent status updates.
+
+    per-statement - every thread has its own connection and commits each update
+    group commit  - every thread submits to one GroupCommitWriter and waits for its future
+    """
+    results = {}
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        base = os.path.join(tmp, "base.db")
+        datagen.create_database(base, flights, seed)
+        flight_count = flights
+
+        def flight_id(index, i):
+            return (index * writes + i) % flight_count + 1
+
+        def status(i):
+            return "Delayed" if i % 2 else "Scheduled"
+
+        for profile in profiles:
+            path = os.path.join(tmp, f"writes_{profile}.db")
+            shutil.copyfile(base, path)
+            entry = {}
+
+            connections = [connect(path, profile, check_same_thread=False) for _ in range(threads)]
+
+            def commit_each(index, i):
+                conn = connections[index]
+                conn.execute(api.UPDATE_STATUS_SQL, (status(i), flight_id(index, i)))
+                conn.commit()
+
+            entry["per-statement"] = _run_writers(threads, writes, commit_each)
+            for conn in connections:
+                conn.close()
+
+            writer = GroupCommitWriter(path, profile)
+            entry["group commit"] = _run_writers(
+                threads, writes, lambda index, i: writer.submit("set_status", flight_id(index, i), status(i)).result())
+            entry["group commit"].update(writer.stats())
+            writer.close()
+
+            results[profile] = entry
+            for mode, stats in entry.items():
+                print(f"  {profile:<12} | {mode:<14} | {stats['writes_per_s']:>9.1f} writes/s | "
+                      f"p50 {stats['p50_ms']:>7.3f} ms | p99 {stats['p99_ms']:>8.3f} ms | errors {stats['errors']}"
+                      + (f" | mean batch {stats['mean_batch']}" if "mean_batch" in stats else ""))
+    return results
+
+
+# Q6 as it was before the dimension cache: the schedule joins Airport twice.
+_JOINED_PILOT_SCHEDULE_SQL = """
+    SELECT f.FlightID, f.FlightNumber, f.DepartureDate, f.DepartureTime, f.ArrivalDate, f.ArrivalTime,
+           o.City, d.City, f.FlightStatus
+    FROM Flight f
+    JOIN Airport o ON f.DepartureAirport = o.AirportCode
+    JOIN Airport d ON f.ArrivalAirport = d.AirportCode
+    WHERE f.PilotID = ?
+    ORDER BY f.DepartureDate, f.DepartureTime
+"""
+
+
+def cache_operations(conn, flights):
+    """Returns (name, joined, cached) triples: each listing done with SQL joins and
+    through FlightAPI's dimension cache. Both callables return the rows they built."""
+    busiest_pilot = conn.execute("SELECT PilotID FROM PilotFlightCount WHERE PilotID > 0"
+                                 " ORDER BY FlightCount DESC LIMIT 1").fetchone()[0]
+    count = conn.execute("SELECT COUNT(*) FROM Flight").fetchone()[0]
+    middle_key = next(islice(flights.iter_flights(), count // 2, None)).key
+
+    def joined_schedule():
+        pilot = Pilot(*conn.execute(cache.PILOT_BY_ID_SQL, (busiest_pilot,)).fetchone())
+        return [pilot] + [ScheduleEntry(*row) for row in conn.execute(_JOINED_PILOT_SCHEDULE_SQL, (busiest_pilot,))]
+
+    def cached_schedule():
+        return [flights.pilot(busiest_pilot)] + flights.pilot_schedule(busiest_pilot)
+
+    return [
+        ("Q8 first page",
+         lambda: [FlightListing(*row) for row in listing.flight_page(conn)],
+         lambda: flights.flight_page()),
+        ("Q8 middle page",
+         lambda: [FlightListing(*row) for row in listing.flight_page(conn, after=middle_key)],
+         lambda: flights.flight_page(after=middle_key)),
+        ("Q8 stream all",
+         lambda: [FlightListing(*row) for row in listing.iter_flights(conn)],
+         lambda: list(flights.iter_flights())),
+        ("Q2 stream Scheduled",
+         lambda: [FlightListing(*row) for row in listing.iter_flights(conn, "Scheduled")],
+         lambda: list(flights.iter_flights("Scheduled"))),
+        ("Q6 pilot + schedule", joined_schedule, cached_schedule),
+    ]
+
+
+def run_cache_benchmark(flights, seed=42, repeat=5, workdir=None):
+    """Times each listing with SQL joins and with the (warm) dimension cache.
+
+    The results must be identical; the cache's hit/miss counters are reported too.
+    """
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        path = os.path.join(tmp, "cache.db")
+        datagen.create_database(path, flights, seed)
+        conn = connect(path)
+        flight_api = FlightAPI(conn)
+        results = {"operations": {}}
+        for name, joined, cached in cache_operations(conn, flight_api):
+            if joined() != cached():
+                raise AssertionError(f"{name}: cached listing differs from the joined query")
+            joined_stats, _ = time_call(joined, repeat)
+            cached_stats, rows = time_call(cached, repeat)
+            results["operations"][name] = {"joined": joined_stats, "cached": cached_stats, "rows": len(rows)}
+            print(f"  {name:<22} | joined median {joined_stats['median_ms']:>9.3f} ms | "
+                  f"cached median {cached_stats['median_ms']:>9.3f} ms | rows {len(rows)}")
+        results["cache"] = flight_api.dimensions.stats()
+        print(f"  cache: {results['cache']}")
+        conn.close()
+    return results
+
+
+def hot_operations(conn, flights):
+    """Returns (name, callable) pairs for the FlightService reads whose cost grows with the hot table."""
+    busiest_pilot = conn.execute("SELECT PilotID FROM PilotFlightCount WHERE PilotID > 0"
+                                 " ORDER BY FlightCount DESC LIMIT 1").fetchone()[0]
+    return [
+        ("Q8 stream all", lambda: sum(1 for _ in flights.iter_flights())),
+        ("Q2 stream Scheduled", lambda: sum(1 for _ in flights.iter_flights("Scheduled"))),
+        ("Q6 busiest pilot schedule", lambda: len(flights.pilot_schedule(busiest_pilot))),
+        ("Q14 double-booking sweep", lambda: len(find_conflicts(conn))),
+        ("Q8 first page", lambda: len(flights.flight_page())),
+    ]
+
+
+def run_archive_benchmark(flights, seed=42, repeat=5, workdir=None):
+    """Times the hot-table reads before and after archiving every finished flight.
+
+    The cutoff is the day after the last departure, so all Completed and Cancelled
+    flights move; all-time counts over the AllFlight view must not change.
+    """
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        path = os.path.join(tmp, "archive.db")
+        datagen.create_database(path, flights, seed)
+        conn = connect(path)
+        flight_api = FlightAPI(conn)
+        results = {"operations": {}}
+        with archive.attached(conn, os.path.join(tmp, "archive-archive.db")):
+            history = (archive.history_destination_counts(conn), archive.history_flights_per_pilot(conn))
+            results["hot_before"] = archive.table_sizes(conn)
+            before = {name: time_call(fn, repeat) for name, fn in hot_operations(conn, flight_api)}
+
+            last_departure = conn.execute("SELECT MAX(DepartureDate) FROM Flight").fetchone()[0]
+            cutoff = (datetime.fromisoformat(last_departure) + timedelta(days=1)).date().isoformat()
+            start = time.perf_counter()
+            results["moved"] = archive.archive_flights(conn, cutoff)
+            results["archive_seconds"] = round(time.perf_counter() - start, 3)
+            results["hot_after"] = archive.table_sizes(conn)
+            results["archive"] = archive.table_sizes(conn, archive.ARCHIVE_SCHEMA)
+            if (archive.history_destination_counts(conn), archive.history_flights_per_pilot(conn)) != history:
+                raise AssertionError("all-time counts changed after archiving")
+
+            print(f"  moved {results['moved']} flights in {results['archive_seconds']} s; hot table "
+                  f"{results['hot_before']['rows']} -> {results['hot_after']['rows']} rows, "
+                  f"{(results['hot_before']['bytes'] or 0) / 2**20:.1f} -> "
+                  f"{(results['hot_after']['bytes'] or 0) / 2**20:.1f} MB in use")
+            for name, fn in hot_operations(conn, flight_api):
+                (before_stats, before_rows), (after_stats, after_rows) = before[name], time_call(fn, repeat)
+                results["operations"][name] = {"before": before_stats, "after": after_stats,
+                                               "rows_before": before_rows, "rows_after": after_rows}
+                print(f"  {name:<26} | before {before_stats['median_ms']:>9.3f} ms ({before_rows:>6} rows) | "
+                      f"after {after_stats['median_ms']:>9.3f} ms ({after_rows:>6} rows)")
+        conn.close()
+    return results
+
+
+def run_parallel_benchmark(flights, seed=42, workers=(1, 2, 4, 8), repeat=3, workdir=None):
+    """Times the destination and pilot recounts as one SQL statement each and with
+    parallel_reports at each worker count (pool already started), checking the results match."""
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        path = os.path.join(tmp, "parallel.db")
+        datagen.create_database(path, flights, seed)
+        conn = connect(path, "reporting")
+
+        def single_statement():
+            return (dict(conn.execute(schema.DESTINATION_COUNTS_FROM_FLIGHTS_SQL)),
+                    dict(conn.execute(schema.PILOT_COUNTS_FROM_FLIGHTS_SQL)))
+
+        baseline, expected = time_call(single_statement, repeat)
+        results = {"cpu_count": os.cpu_count(), "single_statement": baseline, "workers": {}}
+        print(f"  {'single statement':<18} | median {baseline['median_ms']:>9.1f} ms")
+        for count in workers:
+            with parallel_reports.ParallelReports(path, count) as reports:
+                if parallel_reports.check(reports):
+                    raise AssertionError(f"parallel counts with {count} workers differ from the SQL")
+
+                def parallel():
+                    return (reports.destination_counts(), reports.flights_per_pilot())
+
+                stats, _ = time_call(parallel, repeat)
+            stats["speedup"] = round(baseline["median_ms"] / stats["median_ms"], 2)
+            results["workers"][count] = stats
+            print(f"  {f'{count} worker(s)':<18} | median {stats['median_ms']:>9.1f} ms | "
+                  f"speedup x{stats['speedup']}")
+        results["rows"] = sum(expected[1].values())
+        conn.close()
+    return results
+
+
+def run_instrumentation_benchmark(flights, seed=42, repeat=5, workdir=None):
+    """Times every FlightService operation with and without query instrumentation.
+
+    The instrumented run also reports what the instrumentation itself recorded,
+    so its per-operation totals can be checked against the outside timings.
+    """
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        path = os.path.join(tmp, "instrumented.db")
+        datagen.create_database(path, flights, seed)
+        timings = {}
+        collector = instrumentation.Instrumentation()
+        for mode, tracker in (("off", None), ("on", collector)):
+            service = FlightService(path, instrumentation=tracker)
+            timings[mode] = {name: time_call(fn, repeat)[0] for name, fn in query_operations(service)}
+            service.conn.close()
+        results = {"operations": {}, "recorded": collector.snapshot()}
+        for name, off in timings["off"].items():
+            on = timings["on"][name]
+            overhead = round(on["median_ms"] / off["median_ms"] - 1, 3) if off["median_ms"] else None
+            results["operations"][name] = {"off": off, "on": on, "overhead": overhead}
+            print(f"  {name:<26} | off {off['median_ms']:>9.3f} ms | on {on['median_ms']:>9.3f} ms | "
+                  f"{on['median_ms'] - off['median_ms']:+.3f} ms")
+        recorded = results["recorded"]
+        print(f"  recorded {len(recorded['operations'])} operations, {len(recorded['statements'])} statements, "
+              f"{recorded['slow_queries']} slow")
+    return results
+
+
+def _flight_snapshot(conn):
+    """The downstream consumer's fallback: every flight as shown by view_flight_details, keyed by FlightID."""
+    return {row[0]: row for row in listing.iter_flights(conn)}
+
+
+def run_changelog_benchmark(flights, seed=42, changes=1000, repeat=3, workdir=None):
+    """Times what the change log costs writers and saves consumers.
+
+    Writers: `changes` single-flight status updates (each committed) and one bulk
+    status update, with the change log triggers in place and dropped. Consumers:
+    after `changes` updates, finding the changed flights by re-reading and
+    diffing the whole listing vs reading the change log since the last position.
+    Both must find the same flights.
+    """
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        path = os.path.join(tmp, "changelog.db")
+        datagen.create_database(path, flights, seed)
+        conn = connect(path)
+        flight_api = FlightAPI(conn)
+        ids = [row[0] for row in conn.execute("SELECT FlightID FROM Flight WHERE FlightStatus IN ('Scheduled', 'Delayed')")]
+        sample = rng.sample(ids, min(changes, len(ids)))
+        results = {"writes": {}, "consumer": {}}
+
+        def single_updates():
+            for flight_id in sample:
+                flight_api.set_status(flight_id, "Cancelled")
+            conn.execute("UPDATE Flight SET FlightStatus = 'Scheduled' WHERE FlightID IN (SELECT value FROM json_each(?))",
+                         (json.dumps(sample),))
+            conn.commit()
+            return len(sample)
+
+        def bulk_update():
+            return flight_api.bulk_set_status("Delayed", status="Scheduled")
+
+        for mode in ("logged", "not logged"):
+            if mode == "not logged":
+                schema.drop_change_log_triggers(conn)
+            for name, fn in (("single updates", single_updates), ("bulk update", _rolled_back(conn, bulk_update))):
+                flight_api.autocommit = name == "single updates"
+                stats, rows = time_call(fn, repeat)
+                results["writes"].setdefault(name, {"rows": rows})[mode] = stats
+                print(f"  {name:<16} | {mode:<10} | median {stats['median_ms']:>9.1f} ms ({rows} rows)")
+        flight_api.autocommit = True
+        schema.create_change_log_triggers(conn)
+
+        reader = connect(path, "reporting")
+        before = _flight_snapshot(reader)
+        position = changelog.latest_seq(reader)
+        for flight_id in sample:
+            flight_api.set_status(flight_id, "Delayed")
+
+        def diff_tables():
+            after = _flight_snapshot(reader)
+            return {flight_id for flight_id, row in after.items() if before.get(flight_id) != row}
+
+        def read_log():
+            changed, since = set(), position
+            while True:
+                events = changelog.changes_since(reader, since)
+                if not events:
+                    return changed
+                changed.update(event.key for event in events if event.table == "Flight")
+                since = events[-1].seq
+
+        for name, fn in (("diff whole table", diff_tables), ("read change log", read_log)):
+            stats, changed = time_call(fn, repeat)
+            if changed != set(sample):
+                raise AssertionError(f"{name} found {len(changed)} changed flights, expected {len(sample)}")
+            results["consumer"][name] = stats
+            print(f"  {name:<16} | median {stats['median_ms']:>9.1f} ms ({len(changed)} flights changed)")
+        results["log_entries"] = changelog.status(reader)["entries"]
+        reader.close()
+        conn.close()
+    return results
+
+
+def _print_rows(rows, out):
+    """The pre-render Q2 output: one f-string and one print() per row."""
+    print("=" * 110, file=out)
+    for f in rows:
+        print(f"{f.flight_id:<8} | {f.flight_number:<10} | {f.pilot:<20} | {f.departure_city:<15} | "
+              f"{f.arrival_city:<15} | {f.departure_date:<10} | {f.departure_time:<8} | {f.arrival_date:<10} | "
+              f"{f.arrival_time:<8}", file=out)
+    print("=" * 110, file=out)
+    return len(rows)
+
+
+def run_render_benchmark(flights, seed=42, repeat=3, workdir=None):
+    """Times writing every flight as a table (per-row print vs render) and as each export format.
+
+    Tables go line-buffered into a pipe (read by `cat` into the null device), as
+    they would to a terminal or `| less`, so the cost of one write per row shows;
+    exports go to a file through render.export_flights (joined cursor tuples, no
+    row objects).
+    """
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        path = os.path.join(tmp, "render.db")
+        datagen.create_database(path, flights, seed)
+        conn = connect(path, "reporting")
+        flight_api = FlightAPI(conn)
+        rows = list(flight_api.iter_flights())
+        results = {"rows": len(rows), "table": {}, "export": {}}
+        reader = subprocess.Popen(["cat"], stdin=subprocess.PIPE, stdout=subprocess.DEVNULL)
+        with open(reader.stdin.fileno(), "w", buffering=1, closefd=False) as terminal:
+            cases = (
+                ("print per row", lambda: _print_rows(rows, terminal)),
+                ("render", lambda: render.render(rows, render.FLIGHT_COLUMNS, out=terminal)),
+                ("render streamed", lambda: render.render(flight_api.iter_flights(), render.FLIGHT_COLUMNS,
+                                                          out=terminal)),
+            )
+            for name, fn in cases:
+                stats, count = time_call(fn, repeat)
+                if count != len(rows):
+                    raise AssertionError(f"{name} wrote {count} rows, expected {len(rows)}")
+                results["table"][name] = stats
+                print(f"  table {name:<16} | median {stats['median_ms']:>9.1f} ms")
+        reader.stdin.close()
+        reader.wait()
+        for fmt in ("csv", "tsv", "jsonl"):
+            target = os.path.join(tmp, f"flights.{fmt}")
+
+            def export():
+                with render.open_output(target) as out:
+                    return render.export_flights(conn, out, fmt)
+
+            stats, count = time_call(export, repeat)
+            if count != len(rows):
+                raise AssertionError(f"{fmt} export wrote {count} rows, expected {len(rows)}")
+            size = os.path.getsize(target)
+            stats["bytes"] = size
+            stats["mb_per_s"] = round(size / 2**20 / (stats["median_ms"] / 1000), 1)
+            results["export"][fmt] = stats
+            print(f"  export {fmt:<15} | median {stats['median_ms']:>9.1f} ms | {size / 2**20:6.1f} MB | "
+                  f"{stats['mb_per_s']:>6.1f} MB/s")
+        conn.close()
+    return results
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run_itinerary_benchmark(flights, seed=42, searches=50, changes=100, workdir=None):
+    """Times the itinerary Timetable: the first full load, refreshes after changes, and searches.
+
+    Refreshes are timed with nothing changed, after `changes` flights on one day
+    are delayed, and after `changes` flights spread over the schedule are; each is
+    compared with loading a fresh Timetable. Searches are random airport pairs
+    among the busiest airports, departing at random times within the schedule.
+    """
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        path = os.path.join(tmp, "itinerary.db")
+        datagen.create_database(path, flights, seed)
+        conn = connect(path)
+        schema.migrate(conn)
+        timetable = itinerary.Timetable()
+        start = time.perf_counter()
+        timetable.refresh(conn)
+        results = {"full_load_s": round(time.perf_counter() - start, 3), "snapshot": timetable.stats(), "refresh": {}}
+        print(f"  {'full load':<36} | {results['full_load_s'] * 1000:>9.2f} ms | {results['snapshot']['connections']} flights,"
+              f" {results['snapshot']['days']} days, {results['snapshot']['bytes'] / 2**20:.1f} MB of arrays")
+
+        first, last = conn.execute("SELECT MIN(FlightID), MAX(FlightID) FROM Flight").fetchone()
+        one_day = [row[0] for row in conn.execute(
+            "SELECT FlightID FROM Flight WHERE DepartureUTC / 86400 = (SELECT DepartureUTC / 86400 FROM Flight"
+            " WHERE FlightID = ?) AND FlightStatus = 'Scheduled' LIMIT ?", (first, changes))]
+        spread = rng.sample(range(first, last + 1), changes)
+        cases = (("nothing changed", []), (f"{changes} flights, one day", one_day),
+                 (f"{changes} flights, spread", spread))
+        for name, ids in cases:
+            with conn:
+                conn.execute("UPDATE Flight SET FlightStatus = 'Delayed' WHERE FlightID IN (SELECT value FROM json_each(?))"
+                             " AND FlightStatus = 'Scheduled'", (json.dumps(ids),))
+            start = time.perf_counter()
+            days = timetable.refresh(conn)
+            entry = {"days_reloaded": days, "ms": round((time.perf_counter() - start) * 1000, 3)}
+            results["refresh"][name] = entry
+            print(f"  {'refresh, ' + name:<36} | {entry['ms']:>9.2f} ms | {days} day(s) reloaded")
+        start = time.perf_counter()
+        itinerary.Timetable().refresh(conn)
+        results["rebuild_s"] = round(time.perf_counter() - start, 3)
+        print(f"  {'full load, new Timetable':<36} | {results['rebuild_s'] * 1000:>9.2f} ms")
+
+        codes = [row[0] for row in conn.execute(
+            "SELECT ArrivalAirport FROM Flight GROUP BY ArrivalAirport ORDER BY COUNT(*) DESC LIMIT 50")]
+        low, high = conn.execute("SELECT MIN(DepartureUTC), MAX(DepartureUTC) - 3 * 86400 FROM Flight").fetchone()
+        queries = [(*rng.sample(codes, 2), rng.randrange(low, high)) for _ in range(searches)]
+        for name, find in (("options", timetable.options), ("earliest_arrival", timetable.earliest_arrival)):
+            timings, found = [], 0
+            for origin, destination, departs in queries:
+                start = time.perf_counter()
+                answer = find(conn, origin, destination, departs)
+                timings.append((time.perf_counter() - start) * 1000)
+                found += bool(answer)
+            entry = {"median_ms": round(statistics.median(timings), 3), "p95_ms": round(_percentile(timings, 0.95), 3),
+                     "found": found, "searches": searches}
+            results[name] = entry
+            print(f"  {name:<36} | {entry['median_ms']:>9.2f} ms median | p95 {entry['p95_ms']:>8.2f} ms |"
+                  f" {found}/{searches} found")
+        conn.close()
+    return results
+
+
+def _writer_latencies(path, ids, stop):
+    """Commits single-flight status updates on its own connection until stop is set; returns latencies (ms)."""
+    conn = connect(path)
+    flight_api = FlightAPI(conn)
+    latencies = []
+    for i, flight_id in enumerate(ids):
+        if stop.is_set():
+            break
+        start = time.perf_counter()
+        flight_api.set_status(flight_id, "Delayed" if i % 2 else "Scheduled")
+        latencies.append((time.perf_counter() - start) * 1000)
+        time.sleep(0.002)
+    conn.close()
+    return latencies
+
+
+def run_backup_benchmark(flights, seed=42, seconds=1.0, repeat=3, workdir=None):
+    """Times online backups against a committing writer, incremental no-ops, and fixture clones.
+
+    A writer thread commits single-flight updates while nothing else runs
+    (idle), during a stepwise backup (backup.DEFAULT_PAGES per step) and during
+    a backup copied in one step; its commit latencies show whether the backup
+    stalls it. An incremental backup of the unchanged database should copy
+    nothing. Fixtures compare generating a database with cloning a template.
+    """
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        path = os.path.join(tmp, "backup.db")
+        start = time.perf_counter()
+        datagen.create_database(path, flights, seed)
+        generate_s = time.perf_counter() - start
+        conn = connect(path)
+        schema.migrate(conn)
+        ids = [row[0] for row in conn.execute("SELECT FlightID FROM Flight WHERE FlightStatus IN ('Scheduled', 'Delayed')")]
+        conn.close()
+        dest = os.path.join(tmp, "copy.db")
+        results = {"bytes": os.path.getsize(path), "writer": {}, "backup": {}}
+
+        cases = (
+            ("idle", lambda: time.sleep(seconds)),
+            ("stepwise backup", lambda: backup.backup(path, dest)),
+            ("one-step backup", lambda: backup.backup(path, dest, pages=-1)),
+        )
+        for name, fn in cases:
+            runs, latencies = [], []
+            for _ in range(repeat):
+                stop = threading.Event()
+                done = []
+                thread = threading.Thread(target=lambda: done.append(_writer_latencies(path, ids, stop)))
+                thread.start()
+                time.sleep(0.05)
+                runs.append(fn())
+                stop.set()
+                thread.join()
+                latencies.extend(done[0])
+            entry = {"writes": len(latencies), "p50_ms": round(_percentile(latencies, 0.5), 3),
+                     "p99_ms": round(_percentile(latencies, 0.99), 3), "max_ms": round(max(latencies), 3)}
+            results["writer"][name] = entry
+            line = f"  {name:<16} | writer p50 {entry['p50_ms']:>7.2f} ms | p99 {entry['p99_ms']:>7.2f} ms |" \
+                   f" max {entry['max_ms']:>7.2f} ms"
+            if runs[0]:
+                backup_entry = {"median_s": round(statistics.median(run["seconds"] for run in runs), 3),
+                                "restarts": max(run["restarts"] for run in runs)}
+                results["backup"][name] = backup_entry
+                line += f" | backup {backup_entry['median_s']:.2f}s, {backup_entry['restarts']} restart(s)"
+            print(line)
+
+        backup.backup(path, dest, incremental=True)
+        stats, run = time_call(lambda: backup.backup(path, dest, incremental=True), repeat)
+        if run["copied"]:
+            raise AssertionError("the incremental backup of an unchanged database copied it")
+        results["backup"]["incremental, unchanged"] = stats
+        print(f"  {'incremental, unchanged':<24} | median {stats['median_ms']:>9.3f} ms")
+
+        template_dir = os.path.join(tmp, "templates")
+        start = time.perf_counter()
+        backup.template(flights, seed, template_dir)
+        template_s = time.perf_counter() - start
+        clones = iter(range(repeat))
+        stats, method = time_call(lambda: backup.fixture_database(os.path.join(tmp, f"fixture{next(clones)}.db"),
+                                                                  flights, seed, template_dir), repeat)
+        results["fixture"] = {"generate_s": round(generate_s, 3), "template_s": round(template_s, 3),
+                              "clone": stats, "method": method}
+        print(f"  {'generate':<24} | {generate_s * 1000:>9.1f} ms")
+        print(f"  {'fixture clone (' + method + ')':<24} | median {stats['median_ms']:>9.1f} ms")
+    return results
+
+
+# Consecutive flights of a pilot (in UTC, as scheduling.find_conflicts compares
+# them) where one of the two was just rostered and the second departs before the
+# first lands.
+_ROSTER_OVERLAPS_SQL = """
+    SELECT COUNT(*) FROM (
+        SELECT FlightID, DepartureUTC,
+               LAG(FlightID) OVER pilot AS PreviousID, LAG(ArrivalUTC) OVER pilot AS PreviousArrival
+        FROM Flight
+        WHERE PilotID IS NOT NULL AND FlightStatus != 'Cancelled'
+        WINDOW pilot AS (PARTITION BY PilotID ORDER BY DepartureUTC)
+    )
+    WHERE DepartureUTC < PreviousArrival
+      AND (FlightID IN (SELECT value FROM json_each(?1)) OR PreviousID IN (SELECT value FROM json_each(?1)))
+"""
+
+def _scan_roster(conn, start, end, rest):
+    """roster.plan_roster's rules for [start, end) in epoch seconds, choosing each flight's pilot by
+    scanning every pilot (the baseline)."""
+    flights = conn.execute(roster.UNASSIGNED_FLIGHTS_SQL, (start, end, *roster.ROSTER_STATUSES)).fetchall()
+    horizon = max(row[6] or row[5] for row in flights) + rest + 1
+    pilots = {pilot_id: [None, start, []] for (pilot_id,) in conn.execute("SELECT PilotID FROM Pilot")}
+    for pilot_id, airport, arrival, _ in conn.execute(roster.LAST_POSITIONS_SQL, (start,)):
+        pilots[pilot_id][:2] = [airport, (arrival or start) + rest]
+    events = []
+    for pilot_id, origin, destination, departure, arrival in conn.execute(roster.ASSIGNED_FLIGHTS_SQL,
+                                                                          (start, horizon)):
+        pilots[pilot_id][2].append((origin, departure))
+        events.append((departure, 0, pilot_id, destination, arrival))
+    events.extend((row[5], 1, i) for i, row in enumerate(flights))
+    events.sort()
+    assignments = []
+    for event in events:
+        if event[1] == 0:
+            departure, _, pilot_id, destination, arrival = event
+            pilots[pilot_id][2].pop(0)
+            pilots[pilot_id][:2] = [destination, (arrival or departure) + rest]
+            continue
+        flight_id, _, _, origin, destination, departure, arrival, _ = flights[event[2]]
+        if arrival is None:
+            continue
+        best = None
+        for pilot_id, (airport, free_from, upcoming) in pilots.items():
+            if airport not in (origin, None) or (airport == origin and free_from > departure):
+                continue
+            if upcoming and (upcoming[0][0] != destination or arrival + rest > upcoming[0][1]):
+                continue
+            key = (airport is None, free_from if airport else 0, pilot_id)
+            if best is None or key < best[0]:
+                best = (key, pilot_id)
+        if best:
+            pilots[best[1]][:2] = [destination, arrival + rest]
+            assignments.append((flight_id, best[1]))
+    return assignments
+
+
+def run_roster_benchmark(flights, seed=42, days=7, min_rest=roster.DEFAULT_MIN_REST_MINUTES, repeat=3, workdir=None):
+    """Times rostering every open flight in a window of `days` days, heap sweep vs a scan of all pilots.
+
+    The open flights in the window first lose their pilots, so the run staffs a
+    whole stretch of the schedule; both planners must pick the same pilots. The
+    heap plan is then written (one transaction) and checked for overlaps.
+    """
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        path = os.path.join(tmp, "roster.db")
+        datagen.create_database(path, flights, seed)
+        conn = connect(path)
+        first = conn.execute("SELECT MIN(DepartureUTC) FROM Flight").fetchone()[0]
+        start = first + 7 * 86400
+        end = start + days * 86400
+        with conn:
+            conn.execute("UPDATE Flight SET PilotID = NULL WHERE DepartureUTC >= ? AND DepartureUTC < ?"
+                         " AND FlightStatus IN ('Scheduled', 'Delayed')", (start, end))
+        open_flights = conn.execute(roster.UNASSIGNED_FLIGHTS_SQL, (start, end, *roster.ROSTER_STATUSES)).fetchall()
+        results = {"open_flights": len(open_flights), "pilots": conn.execute("SELECT COUNT(*) FROM Pilot").fetchone()[0]}
+
+        stats, (plan, unstaffed) = time_call(lambda: roster.plan_roster(conn, start, end, min_rest), repeat)
+        results["heap"] = stats
+        print(f"  {'heap sweep':<14} | median {stats['median_ms']:>9.1f} ms | {len(plan)} assigned,"
+              f" {len(unstaffed)} unstaffed of {len(open_flights)}")
+        stats, scanned = time_call(lambda: _scan_roster(conn, start, end, min_rest * 60), 1)
+        if scanned != plan:
+            raise AssertionError("the scan and the heap sweep chose different pilots")
+        results["scan"] = stats
+        print(f"  {'scan pilots':<14} | median {stats['median_ms']:>9.1f} ms ({results['pilots']} pilots)")
+
+        started = time.perf_counter()
+        written = roster.auto_roster(conn, start, end, min_rest)
+        results["write_s"] = round(time.perf_counter() - started, 3)
+        results["assigned"] = written["assigned"]
+        results["unstaffed"] = len(written["unstaffed"])
+        results["overlaps"] = conn.execute(_ROSTER_OVERLAPS_SQL, (json.dumps([f for f, _ in plan]),)).fetchone()[0]
+        print(f"  {'auto_roster':<14} | {results['write_s'] * 1000:>16.1f} ms | {written['assigned']} written,"
+              f" {results['overlaps']} overlap(s) with a rostered flight")
+        conn.close()
+    return results
+
+
+def run_analytics_benchmark(flights, seed=42, repeat=5, workdir=None):
+    """Times each analytics report over a columnar snapshot vs the same report from Flight in SQL.
+
+    Also times the export and opening the snapshot. The SQL side runs on a
+    reporting connection (large mmap), warmed by one untimed run; both sides
+    must return the same rows.
+    """
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        path = os.path.join(tmp, "analytics.db")
+        datagen.create_database(path, flights, seed)
+        conn = connect(path, "reporting")
+        snapshot_path = os.path.join(tmp, "analytics.columns")
+        stats, manifest = time_call(lambda: columnar.export(conn, snapshot_path), 1)
+        size = sum(os.path.getsize(os.path.join(snapshot_path, name)) for name in os.listdir(snapshot_path))
+        results = {"export": stats, "bytes": size, "routes": len(manifest["routes"]), "reports": {}}
+        print(f"  {'export':<14} | {stats['median_ms']:>9.1f} ms | {size / 2**20:.1f} MB, {manifest['rows']} flights,"
+              f" {len(manifest['routes'])} routes")
+        db_size = os.path.getsize(path)
+        results["db_bytes"] = db_size
+
+        def open_snapshot():
+            with columnar.ColumnarSnapshot(snapshot_path) as snapshot:
+                return snapshot.rows
+
+        stats, _ = time_call(open_snapshot, repeat)
+        results["open"] = stats
+        print(f"  {'open':<14} | {stats['median_ms']:>9.2f} ms")
+        with columnar.ColumnarSnapshot(snapshot_path) as snapshot:
+            for name, report in analytics.REPORTS.items():
+                expected = analytics.SQL_REPORTS[name](conn)
+                sql_stats, _ = time_call(lambda: analytics.SQL_REPORTS[name](conn), repeat)
+                snapshot_stats, rows = time_call(lambda: report(snapshot), repeat)
+                if rows != expected:
+                    raise AssertionError(f"{name}: the snapshot and the SQL disagree")
+                speedup = round(sql_stats["median_ms"] / snapshot_stats["median_ms"], 1)
+                results["reports"][name] = {"rows": len(rows), "sql": sql_stats, "snapshot": snapshot_stats,
+                                            "speedup": speedup}
+                print(f"  {name:<14} | SQL {sql_stats['median_ms']:>8.1f} ms | snapshot"
+                      f" {snapshot_stats['median_ms']:>8.1f} ms | {speedup:>5.1f}x | {len(rows)} rows")
+        conn.close()
+    return results
+
+
+_SEARCH_CITY_SUFFIXES = ("ton", "ville", "bury", "ford", "field", " Falls", " Harbour", " Springs", "mouth", " Heights")
+_SEARCH_AIRPORT_KINDS = ("International", "Regional", "Municipal", "County", "Field")
+_SEARCH_COUNTRIES = ("UK", "USA", "France", "Germany", "Spain", "Italy", "Japan", "Brazil", "Canada", "Australia",
+                     "India", "Mexico", "Norway", "Kenya", "Chile", "Egypt", "Poland", "Peru", "Vietnam", "Ireland")
+LIKE_AIRPORTS_SQL = """
+    SELECT AirportCode, AirportName, City, Country, TimeZone FROM Airport
+    WHERE AirportCode LIKE ?1 OR AirportName LIKE ?1 OR City LIKE ?1 OR Country LIKE ?1
+    LIMIT ?2
+"""
+LIKE_PILOTS_SQL = """
+    SELECT PilotID, FirstName, LastName, Email, PhoneNumber FROM Pilot
+    WHERE FirstName LIKE ?1 OR LastName LIKE ?1 OR Email LIKE ?1
+    LIMIT ?2
+"""
+
+
+def _search_rows(rows, rng):
+    """rows synthetic airports (5-letter codes) and rows pilots, with varied cities and names."""
+    letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    airports, pilots = [], []
+    for i in range(rows):
+        code = "".join(letters[i // 26 ** power % 26] for power in range(4, -1, -1))
+        city = rng.choice(datagen.LAST_NAMES) + rng.choice(_SEARCH_CITY_SUFFIXES)
+        airports.append((code, f"{city} {rng.choice(_SEARCH_AIRPORT_KINDS)} Airport", city,
+                         rng.choice(_SEARCH_COUNTRIES)))
+        first, last = rng.choice(datagen.FIRST_NAMES), rng.choice(datagen.LAST_NAMES)
+        pilots.append((first, last, f"{first.lower()}.{last.lower()}{i}@example.com", f"+4479{i:08d}"))
+    return airports, pilots
+
+
+def run_search_benchmark(rows, seed=42, searches=200, changes=1000, limit=10, workdir=None):
+    """Times type-ahead searches over rows airports and rows pilots: FTS5, the in-memory index, and LIKE scans.
+
+    Queries are one or two word prefixes (1-5 characters) taken from random
+    rows, as a user types them. Every query must find the same rows in the same
+    order through FTS5 and the in-memory index (without a limit); LIKE '%text%' is the
+    substring scan users resort to without an index, timed for comparison.
+    Also times loading the rows with the index triggers on, the in-memory
+    index's first load, and its refresh after `changes` pilots are renamed.
+    """
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        path = os.path.join(tmp, "search.db")
+        conn = connect(path, "bulk-load")
+        schema.migrate(conn)
+        if not schema.has_search_tables(conn):
+            print("  This SQLite has no FTS5; only the in-memory index can be measured.")
+        airports, pilots = _search_rows(rows, rng)
+        start = time.perf_counter()
+        schema.drop_search_triggers(conn)  # as datagen.py and bulk_import.py load
+        with conn:
+            conn.executemany("INSERT INTO Airport (AirportCode, AirportName, City, Country) VALUES (?, ?, ?, ?)",
+                             airports)
+            conn.executemany("INSERT INTO Pilot (FirstName, LastName, Email, PhoneNumber) VALUES (?, ?, ?, ?)", pilots)
+        loaded = time.perf_counter()
+        schema.create_search_triggers(conn)
+        results = {"load_s": round(loaded - start, 3), "reindex_s": round(time.perf_counter() - loaded, 3)}
+        print(f"  {'insert, then reindex':<30} | {results['load_s'] * 1000:>9.1f} ms | reindex"
+              f" {results['reindex_s'] * 1000:.1f} ms | {rows} airports, {rows} pilots")
+        conn.close()
+        conn = connect(path)
+
+        fts = search.SearchIndex()
+        memory = search.SearchIndex("memory")
+        start = time.perf_counter()
+        memory.refresh(conn)
+        results["memory_load_s"] = round(time.perf_counter() - start, 3)
+        results["memory"] = memory.stats()
+        print(f"  {'in-memory index, first load':<30} | {results['memory_load_s'] * 1000:>9.1f} ms |"
+              f" {results['memory']['words']} distinct words")
+
+        queries = {"airports": [], "pilots": []}
+        for kind, source in (("airports", airports), ("pilots", pilots)):
+            for _ in range(searches):
+                picked = search.words(" ".join(filter(None, rng.choice(source)[:3])))
+                terms = rng.sample(picked, min(len(picked), rng.choice((1, 1, 2))))
+                queries[kind].append(" ".join(term[:rng.randint(1, 5)] for term in terms))
+        for kind, like_sql in (("airports", LIKE_AIRPORTS_SQL), ("pilots", LIKE_PILOTS_SQL)):
+            for text in queries[kind]:
+                found = [tuple(row) for row in getattr(memory, kind)(conn, text, None)]
+                if fts.backend is None:
+                    fts.refresh(conn)
+                if fts.backend == "fts5" and [tuple(row) for row in getattr(fts, kind)(conn, text, None)] != found:
+                    raise AssertionError(f"{kind} '{text}': FTS5 and the in-memory index disagree")
+            methods = [("memory", lambda text: getattr(memory, kind)(conn, text, limit)),
+                       ("LIKE scan", lambda text: conn.execute(like_sql, (f"%{text}%", limit)).fetchall())]
+            if fts.backend == "fts5":
+                methods.insert(0, ("FTS5", lambda text: getattr(fts, kind)(conn, text, limit)))
+            results[kind] = {}
+            for name, run in methods:
+                timings = []
+                for text in queries[kind]:
+                    start = time.perf_counter()
+                    run(text)
+                    timings.append((time.perf_counter() - start) * 1000)
+                entry = {"median_ms": round(statistics.median(timings), 3),
+                         "p95_ms": round(_percentile(timings, 0.95), 3), "max_ms": round(max(timings), 3)}
+                results[kind][name] = entry
+                print(f"  {kind + ', ' + name:<30} | {entry['median_ms']:>9.2f} ms median | p95 {entry['p95_ms']:>8.2f} ms"
+                      f" | max {entry['max_ms']:>8.2f} ms")
+
+        renamed = rng.sample(range(1, rows + 1), changes)
+        start = time.perf_counter()
+        with conn:
+            conn.executemany("UPDATE Pilot SET LastName = LastName || 'son' WHERE PilotID = ?",
+                             [(pilot_id,) for pilot_id in renamed])
+        results["rename_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        start = time.perf_counter()
+        memory.refresh(conn)
+        results["memory_refresh_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        print(f"  {f'rename {changes} pilots':<30} | {results['rename_ms']:>9.2f} ms (index triggers on) |"
+              f" in-memory refresh {results['memory_refresh_ms']:.2f} ms")
+        conn.close()
+    return results
+
+
+# Runs in a fresh interpreter: import, open (connect + migrate) and first query,
+# each timed from inside the process.
+_STARTUP_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+from services import FlightService
+imported = time.perf_counter()
+service = FlightService(sys.argv[1])
+opened = time.perf_counter()
+service.api.flight_page(page_size=1)
+queried = time.perf_counter()
+print(imported - start, opened - imported, queried - opened)
+"""
+
+
+def _remove_database(path):
+    """Deletes a database file and its WAL/shared-memory files, if present."""
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def _startup_run(path):
+    """Launches one cold process against path; returns its phase timings in milliseconds."""
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, "-c", _STARTUP_SCRIPT, path], check=True, capture_output=True,
+                            text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+    process_ms = (time.perf_counter() - start) * 1000
+    import_s, open_s, query_s = (float(value) for value in output.split())
+    return {"process_ms": process_ms, "import_ms": import_s * 1000, "open_ms": open_s * 1000,
+            "first_query_ms": query_s * 1000}
+
+
+def run_startup_benchmark(flights, seed=42, repeat=10, workdir=None):
+    """Times a short-lived process (import + connect + first query) in three situations.
+
+    current     - the database is already at schema.SCHEMA_VERSION (the normal case)
+    unversioned - user_version is reset to 0 before each run, so every migration
+                  re-runs as it does when upgrading a pre-versioning database
+    new file    - the database does not exist and is created from scratch
+    """
+    results = {}
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        path = os.path.join(tmp, "startup.db")
+        datagen.create_database(path, flights, seed)
+        conn = connect(path)
+        schema.migrate(conn)
+
+        new_path = os.path.join(tmp, "new.db")
+        cases = (
+            ("current", path, lambda: None),
+            ("unversioned", path, lambda: conn.execute("PRAGMA user_version = 0")),
+            ("new file", new_path, lambda: _remove_database(new_path)),
+        )
+        for case, target, prepare in cases:
+            runs = []
+            for _ in range(repeat):
+                prepare()
+                runs.append(_startup_run(target))
+            entry = {key: round(statistics.median(run[key] for run in runs), 3) for key in runs[0]}
+            results[case] = entry
+            print(f"  {case:<12} | process {entry['process_ms']:>8.2f} ms | import {entry['import_ms']:>7.2f} ms | "
+                  f"open {entry['open_ms']:>7.2f} ms | first query {entry['first_query_ms']:>6.2f} ms")
+        conn.close()
+    return results
+
+
+def report_metadata(**extra):
+    """Environment details stored with every report so runs can be compared."""
+    meta = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+    }
+    meta.update(extra)
+    return meta
+
+
+def write_report(path, name, meta, results):
+    """Writes a benchmark report as indented, key-sorted JSON so releases diff cleanly."""
+    report = {"benchmark": name, "meta": meta, "results": results}
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2, sort_keys=True)
+        handle.write("\n")
+    print(f"\nReport written to {path}")
+
+
+def cmd_queries(args):
+    results = run_query_benchmark(args.scales, seed=args.seed, repeat=args.repeat, workdir=args.workdir)
+    if args.output:
+        write_report(args.output, "queries", report_metadata(seed=args.seed, repeat=args.repeat), results)
+
+
+def cmd_profiles(args):
+    results = run_profile_benchmark(args.flights, seed=args.seed, writes=args.writes, seconds=args.seconds,
+                                    repeat=args.repeat, workdir=args.workdir)
+    if args.output:
+        meta = report_metadata(seed=args.seed, flights=args.flights, writes=args.writes)
+        write_report(args.output, "profiles", meta, results)
+
+
+def cmd_writes(args):
+    results = run_write_benchmark(args.flights, seed=args.seed, threads=args.threads, writes=args.writes,
+                                  profiles=args.profiles, workdir=args.workdir)
+    if args.output:
+        meta = report_metadata(seed=args.seed, flights=args.flights, threads=args.threads, writes=args.writes)
+        write_report(args.output, "writes", meta, results)
+
+
+def cmd_cache(args):
+    results = run_cache_benchmark(args.flights, seed=args.seed, repeat=args.repeat, workdir=args.workdir)
+    if args.output:
+        write_report(args.output, "cache", report_metadata(seed=args.seed, flights=args.flights), results)
+
+
+def cmd_archive(args):
+    results = run_archive_benchmark(args.flights, seed=args.seed, repeat=args.repeat, workdir=args.workdir)
+    if args.output:
+        write_report(args.output, "archive", report_metadata(seed=args.seed, flights=args.flights), results)
+
+
+def cmd_parallel(args):
+    results = run_parallel_benchmark(args.flights, seed=args.seed, workers=args.workers, repeat=args.repeat,
+                                     workdir=args.workdir)
+    if args.output:
+        write_report(args.output, "parallel", report_metadata(seed=args.seed, flights=args.flights), results)
+
+
+def cmd_itinerary(args):
+    results = run_itinerary_benchmark(args.flights, seed=args.seed, searches=args.searches, changes=args.changes,
+                                      workdir=args.workdir)
+    if args.output:
+        write_report(args.output, "itinerary", report_metadata(seed=args.seed, flights=args.flights), results)
+
+
+def cmd_instrumentation(args):
+    results = run_instrumentation_benchmark(args.flights, seed=args.seed, repeat=args.repeat, workdir=args.workdir)
+    if args.output:
+        write_report(args.output, "instrumentation", report_metadata(seed=args.seed, flights=args.flights), results)
+
+
+def cmd_changelog(args):
+    results = run_changelog_benchmark(args.flights, seed=args.seed, changes=args.changes, repeat=args.repeat,
+                                      workdir=args.workdir)
+    if args.output:
+        meta = report_metadata(seed=args.seed, flights=args.flights, changes=args.changes)
+        write_report(args.output, "changelog", meta, results)
+
+
+def cmd_render(args):
+    results = run_render_benchmark(args.flights, seed=args.seed, repeat=args.repeat, workdir=args.workdir)
+    if args.output:
+        write_report(args.output, "render", report_metadata(seed=args.seed, flights=args.flights), results)
+
+
+def cmd_backup(args):
+    results = run_backup_benchmark(args.flights, seed=args.seed, seconds=args.seconds, repeat=args.repeat,
+                                   workdir=args.workdir)
+    if args.output:
+        write_report(args.output, "backup", report_metadata(seed=args.seed, flights=args.flights), results)
+
+
+def cmd_roster(args):
+    results = run_roster_benchmark(args.flights, seed=args.seed, days=args.days, min_rest=args.min_rest,
+                                   repeat=args.repeat, workdir=args.workdir)
+    if args.output:
+        meta = report_metadata(seed=args.seed, flights=args.flights, days=args.days, min_rest=args.min_rest)
+        write_report(args.output, "roster", meta, results)
+
+
+def cmd_analytics(args):
+    results = run_analytics_benchmark(args.flights, seed=args.seed, repeat=args.repeat, workdir=args.workdir)
+    if args.output:
+        write_report(args.output, "analytics", report_metadata(seed=args.seed, flights=args.flights), results)
+
+
+def cmd_search(args):
+    results = run_search_benchmark(args.rows, seed=args.seed, searches=args.searches, changes=args.changes,
+                                   workdir=args.workdir)
+    if args.output:
+        write_report(args.output, "search", report_metadata(seed=args.seed, rows=args.rows), results)
+
+
+def cmd_startup(args):
+    results = run_startup_benchmark(args.flights, seed=args.seed, repeat=args.repeat, workdir=args.workdir)
+    if args.output:
+        meta = report_metadata(seed=args.seed, flights=args.flights, schema_version=schema.SCHEMA_VERSION)
+        write_report(args.output, "startup", meta, results)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Flight Management benchmarks.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    queries = sub.add_parser("queries", help="time every FlightService operation at several data scales")
+    queries.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES, help="numbers of flights")
+    queries.add_argument("--seed", type=int, default=42)
+    queries.add_argument("--repeat", type=int, default=5)
+    queries.add_argument("--workdir", help="directory for the generated databases (default: system temp)")
+    queries.add_argument("--output", help="write a JSON report to this file")
+    queries.set_defaults(func=cmd_queries)
+
+    profiles = sub.add_parser("profiles", help="compare the connection profiles (journal mode, sync, cache, mmap)")
+    profiles.add_argument("--flights", type=int, default=100000)
+    profiles.add_argument("--writes", type=int, default=500, help="single-statement commits per profile")
+    profiles.add_argument("--seconds", type=float, default=2.0, help="duration of the concurrent read/write phase")
+    profiles.add_argument("--seed", type=int, default=42)
+    profiles.add_argument("--repeat", type=int, default=3)
+    profiles.add_argument("--workdir", help="directory for the generated databases (default: system temp)")
+    profiles.add_argument("--output", help="write a JSON report to this file")
+    profiles.set_defaults(func=cmd_profiles)
+
+    writes = sub.add_parser("writes", help="per-statement commits vs the group-commit writer")
+    writes.add_argument("--flights", type=int, default=20000)
+    writes.add_argument("--threads", type=int, default=8, help="concurrent writer threads")
+    writes.add_argument("--writes", type=int, default=300, help="status updates per thread")
+    writes.add_argument("--profiles", nargs="+", default=["interactive", "legacy"], choices=sorted(PROFILES))
+    writes.add_argument("--seed", type=int, default=42)
+    writes.add_argument("--workdir", help="directory for the generated database (default: system temp)")
+    writes.add_argument("--output", help="write a JSON report to this file")
+    writes.set_defaults(func=cmd_writes)
+
+    cached = sub.add_parser("cache", help="compare join-based listings with the dimension cache")
+    cached.add_argument("--flights", type=int, default=100000)
+    cached.add_argument("--seed", type=int, default=42)
+    cached.add_argument("--repeat", type=int, default=5)
+    cached.add_argument("--workdir", help="directory for the generated database (default: system temp)")
+    cached.add_argument("--output", help="write a JSON report to this file")
+    cached.set_defaults(func=cmd_cache)
+
+    startup = sub.add_parser("startup", help="time a short-lived process: import + connect + first query")
+    startup.add_argument("--flights", type=int, default=100000)
+    startup.add_argument("--seed", type=int, default=42)
+    startup.add_argument("--repeat", type=int, default=10, help="processes launched per case")
+    startup.add_argument("--workdir", help="directory for the generated databases (default: system temp)")
+    startup.add_argument("--output", help="write a JSON report to this file")
+    startup.set_defaults(func=cmd_startup)
+
+    archived = sub.add_parser("archive", help="hot-table reads before and after archiving finished flights")
+    archived.add_argument("--flights", type=int, default=100000)
+    archived.add_argument("--seed", type=int, default=42)
+    archived.add_argument("--repeat", type=int, default=5)
+    archived.add_argument("--workdir", help="directory for the generated databases (default: system temp)")
+    archived.add_argument("--output", help="write a JSON report to this file")
+    archived.set_defaults(func=cmd_archive)
+
+    parallel = sub.add_parser("parallel", help="single-statement recounts vs parallel_reports at 1-8 workers")
+    parallel.add_argument("--flights", type=int, default=500000)
+    parallel.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parallel.add_argument("--seed", type=int, default=42)
+    parallel.add_argument("--repeat", type=int, default=3)
+    parallel.add_argument("--workdir", help="directory for the generated database (default: system temp)")
+    parallel.add_argument("--output", help="write a JSON report to this file")
+    parallel.set_defaults(func=cmd_parallel)
+
+    routes = sub.add_parser("itinerary", help="itinerary timetable load, incremental refresh and searches")
+    routes.add_argument("--flights", type=int, default=1000000)
+    routes.add_argument("--searches", type=int, default=50)
+    routes.add_argument("--changes", type=int, default=100, help="flights changed before each refresh")
+    routes.add_argument("--seed", type=int, default=42)
+    routes.add_argument("--workdir", help="directory for the generated database (default: system temp)")
+    routes.add_argument("--output", help="write a JSON report to this file")
+    routes.set_defaults(func=cmd_itinerary)
+
+    instrumented = sub.add_parser("instrumentation", help="every operation with and without query instrumentation")
+    instrumented.add_argument("--flights", type=int, default=100000)
+    instrumented.add_argument("--seed", type=int, default=42)
+    instrumented.add_argument("--repeat", type=int, default=5)
+    instrumented.add_argument("--workdir", help="directory for the generated database (default: system temp)")
+    instrumented.add_argument("--output", help="write a JSON report to this file")
+    instrumented.set_defaults(func=cmd_instrumentation)
+
+    rendered = sub.add_parser("render", help="per-row print vs the buffered renderer, and CSV/TSV/JSONL exports")
+    rendered.add_argument("--flights", type=int, default=200000)
+    rendered.add_argument("--seed", type=int, default=42)
+    rendered.add_argument("--repeat", type=int, default=3)
+    rendered.add_argument("--workdir", help="directory for the generated database (default: system temp)")
+    rendered.add_argument("--output", help="write a JSON report to this file")
+    rendered.set_defaults(func=cmd_render)
+
+    logged = sub.add_parser("changelog", help="change log trigger cost for writers; log vs table diff for consumers")
+    logged.add_argument("--flights", type=int, default=100000)
+    logged.add_argument("--changes", type=int, default=1000, help="flights updated between consumer reads")
+    logged.add_argument("--seed", type=int, default=42)
+    logged.add_argument("--repeat", type=int, default=3)
+    logged.add_argument("--workdir", help="directory for the generated database (default: system temp)")
+    logged.add_argument("--output", help="write a JSON report to this file")
+    logged.set_defaults(func=cmd_changelog)
+
+    backed = sub.add_parser("backup", help="writer latency during online backups, incremental no-ops, fixture clones")
+    backed.add_argument("--flights", type=int, default=200000)
+    backed.add_argument("--seconds", type=float, default=1.0, help="length of the idle writer run")
+    backed.add_argument("--seed", type=int, default=42)
+    backed.add_argument("--repeat", type=int, default=3)
+    backed.add_argument("--workdir", help="directory for the generated databases (default: system temp)")
+    backed.add_argument("--output", help="write a JSON report to this file")
+    backed.set_defaults(func=cmd_backup)
+
+    rostered = sub.add_parser("roster", help="auto-roster a window of open flights: heap sweep vs scanning pilots")
+    rostered.add_argument("--flights", type=int, default=200000)
+    rostered.add_argument("--days", type=int, default=7, help="length of the rostered window")
+    rostered.add_argument("--min-rest", type=int, default=roster.DEFAULT_MIN_REST_MINUTES)
+    rostered.add_argument("--seed", type=int, default=42)
+    rostered.add_argument("--repeat", type=int, default=3)
+    rostered.add_argument("--workdir", help="directory for the generated database (default: system temp)")
+    rostered.add_argument("--output", help="write a JSON report to this file")
+    rostered.set_defaults(func=cmd_roster)
+
+    analysed = sub.add_parser("analytics", help="columnar snapshot reports vs the same GROUP BY queries in SQL")
+    analysed.add_argument("--flights", type=int, default=200000)
+    analysed.add_argument("--seed", type=int, default=42)
+    analysed.add_argument("--repeat", type=int, default=5)
+    analysed.add_argument("--workdir", help="directory for the generated database (default: system temp)")
+    analysed.add_argument("--output", help="write a JSON report to this file")
+    analysed.set_defaults(func=cmd_analytics)
+
+    searching = sub.add_parser("search", help="type-ahead airport and pilot search: FTS5, in-memory index, LIKE")
+    searching.add_argument("--rows", type=int, default=100000, help="airports, and pilots, to generate")
+    searching.add_argument("--searches", type=int, default=200)
+    searching.add_argument("--changes", type=int, default=1000, help="pilots renamed before the refresh")
+    searching.add_argument("--seed", type=int, default=42)
+    searching.add_argument("--workdir", help="directory for the generated database (default: system temp)")
+    searching.add_argument("--output", help="write a JSON report to this file")
+    searching.set_defaults(func=cmd_search)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,303 @@
+import argparse
+import csv
+import json
+import re
+import sqlite3
+import sys
+import time
+from datetime import date
+from itertools import islice
+
+from aggregates import create_triggers, drop_triggers, rebuild_aggregates
+from connection import DB_PATH, connect
+from models import FLIGHT_STATUSES
+from schema import (create_change_log_triggers, create_flight_time_triggers, create_indexes, create_schedule_triggers,
+                    create_search_triggers, drop_change_log_triggers, drop_flight_time_triggers, drop_indexes,
+                    drop_schedule_triggers, drop_search_triggers, fill_missing_flight_times, migrate)
+from timezones import check_time_zone
+
+
+def _text(value):
+    value = str(value).strip()
+    if not value:
+        raise ValueError("must not be empty")
+    return value
+
+
+def _optional_text(value):
+    value = str(value).strip()
+    return value or None
+
+
+def _optional_int(value):
+    if value is None or str(value).strip() == "":
+        return None
+    return int(value)
+
+
+def _airport_code(value):
+    return _text(value).upper()
+
+
+_TIME = re.compile(r"(?:[01]\d|2[0-3]):[0-5]\d")
+
+
+# date.fromisoformat and a regex rather than strptime, which dominates the
+# profile of a large import.
+def _date(value):
+    value = _text(value)
+    if len(value) != 10:
+        raise ValueError("expected YYYY-MM-DD")
+    date.fromisoformat(value)
+    return value
+
+
+def _time(value):
+    value = _text(value)
+    if not _TIME.fullmatch(value):
+        raise ValueError("expected HH:MM (24-hour)")
+    return value
+
+
+def _time_zone(value):
+    value = _text(value)
+    check_time_zone(value)
+    return value
+
+
+def _status(value):
+    value = _text(value).capitalize()
+    if value not in FLIGHT_STATUSES:
+        raise ValueError(f"must be one of {', '.join(FLIGHT_STATUSES)}")
+    return value
+
+
+# Column order, whether the column is required, and its validator.
+TABLE_COLUMNS = {
+    "Airport": [
+        ("AirportCode", True, _airport_code),
+        ("AirportName", True, _text),
+        ("City", True, _text),
+        ("Country", True, _text),
+        ("TimeZone", False, _time_zone),
+    ],
+    "Pilot": [
+        ("PilotID", False, _optional_int),
+        ("FirstName", True, _text),
+        ("LastName", True, _text),
+        ("Email", False, _optional_text),
+        ("PhoneNumber", False, _optional_text),
+    ],
+    "Flight": [
+        ("FlightID", False, _optional_int),
+        ("FlightNumber", True, _text),
+        ("PilotID", False, _optional_int),
+        ("DepartureAirport", True, _airport_code),
+        ("ArrivalAirport", True, _airport_code),
+        ("DepartureDate", True, _date),
+        ("DepartureTime", True, _time),
+        ("ArrivalDate", True, _date),
+        ("ArrivalTime", True, _time),
+        ("FlightStatus", True, _status),
+    ],
+}
+
+MAX_REPORTED_ERRORS = 20
+
+
+class ImportReport:
+    """Outcome of one bulk import: counts, throughput and a sample of rejected rows."""
+
+    def __init__(self, table, path):
+        self.table = table
+        self.path = path
+        self.read = 0
+        self.inserted = 0
+        self.rejected = 0
+        self.errors = []  # (line number, reason), capped at MAX_REPORTED_ERRORS
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.inserted / self.seconds if self.seconds else 0.0
+
+    def reject(self, line_no, reason):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line_no, reason))
+
+    def summary(self):
+        lines = [
+            f"Imported {self.inserted} of {self.read} {self.table} rows from {self.path} "
+            f"in {self.seconds:.2f}s ({self.rows_per_second:,.0f} rows/s).",
+            f"Rejected rows: {self.rejected}",
+        ]
+        for line_no, reason in self.errors:
+            lines.append(f"  line {line_no}: {reason}")
+        if self.rejected > len(self.errors):
+            lines.append(f"  ... and {self.rejected - len(self.errors)} more")
+        return "\n".join(lines)
+
+
+def _read_records(path, file_format):
+    """Yields (line number, raw record) pairs from a CSV or JSON Lines file without loading it whole.
+
+    CSV records come out as dicts; JSON Lines records are left as text so that a
+    malformed line is rejected by _validate instead of aborting the import.
+    """
+    with open(path, newline="", encoding="utf-8") as handle:
+        if file_format == "csv":
+            reader = csv.DictReader(handle)
+            for record in reader:
+                yield reader.line_num, record
+        else:
+            for line_no, line in enumerate(handle, start=1):
+                if line.strip():
+                    yield line_no, line
+
+
+def _validate(records, columns, report):
+    """Turns raw records into parameter tuples, rejecting any that fail validation."""
+    for line_no, record in records:
+        report.read += 1
+        try:
+            if isinstance(record, str):
+                record = json.loads(record)
+            row = []
+            for name, required, convert in columns:
+                value = record.get(name)
+                if value is None or str(value).strip() == "":
+                    if required:
+                        raise ValueError(f"{name} is required")
+                    row.append(None)
+                else:
+                    try:
+                        row.append(convert(value))
+                    except ValueError as e:
+                        raise ValueError(f"{name}={value!r}: {e}")
+            yield line_no, tuple(row)
+        except (ValueError, AttributeError) as e:
+            report.reject(line_no, str(e))
+
+
+def _insert_chunk(conn, sql, chunk, report):
+    """Inserts one chunk in a single transaction, isolating bad rows if the batch fails."""
+    try:
+        with conn:
+            conn.executemany(sql, [row for _, row in chunk])
+        report.inserted += len(chunk)
+    except sqlite3.IntegrityError:
+        # Fall back to row-by-row inside one transaction to find the offenders.
+        with conn:
+            for line_no, row in chunk:
+                try:
+                    conn.execute(sql, row)
+                    report.inserted += 1
+                except sqlite3.IntegrityError as e:
+                    report.reject(line_no, str(e))
+
+
+def _reject_foreign_key_violations(conn, table, first_rowid, report):
+    """Deletes imported rows that reference missing parents and counts them as rejected."""
+    violations = conn.execute(f"PRAGMA foreign_key_check({table})").fetchall()
+    bad_rowids = sorted({rowid for _, rowid, _, _ in violations if rowid >= first_rowid})
+    with conn:
+        conn.executemany(f"DELETE FROM {table} WHERE rowid = ?", [(rowid,) for rowid in bad_rowids])
+    for rowid in bad_rowids:
+        report.reject(f"rowid {rowid}", "foreign key references a missing Pilot/Airport")
+    report.inserted -= len(bad_rowids)
+
+
+def import_file(path, table, db_path=DB_PATH, chunk_size=10000,
+                file_format=None, defer_indexes=False, check_foreign_keys=True, conn=None):
+    """Streams a CSV or JSON Lines file into table using chunked executemany transactions.
+
+    With defer_indexes the Flight indexes and the summary, UTC time, timetable
+    version, change log and search triggers are dropped before loading; once the
+    load ends, even if it fails, they are recreated, the summary tables, UTC
+    times, timetable versions and search index are rebuilt, and the change log
+    gets one RESYNC entry for the table instead of one entry per row.
+    With check_foreign_keys, rows whose Pilot/Airport references do not exist
+    are removed after the load and reported as rejected.
+    """
+    if table not in TABLE_COLUMNS:
+        raise ValueError(f"Unknown table '{table}'. Choose from: {', '.join(TABLE_COLUMNS)}")
+    if file_format is None:
+        file_format = "jsonl" if path.endswith((".jsonl", ".json", ".ndjson")) else "csv"
+
+    own_conn = conn is None
+    if own_conn:
+        conn = connect(db_path, "bulk-load")
+    migrate(conn)
+
+    columns = TABLE_COLUMNS[table]
+    names = ", ".join(name for name, _, _ in columns)
+    placeholders = ", ".join("?" for _ in columns)
+    sql = f"INSERT INTO {table} ({names}) VALUES ({placeholders})"
+
+    report = ImportReport(table, path)
+    first_rowid = conn.execute(f"SELECT IFNULL(MAX(rowid), 0) + 1 FROM {table}").fetchone()[0]
+    start = time.perf_counter()
+    try:
+        if defer_indexes:
+            drop_indexes(conn)
+            drop_triggers(conn)
+            drop_flight_time_triggers(conn)
+            drop_schedule_triggers(conn)
+            drop_change_log_triggers(conn)
+            drop_search_triggers(conn)
+        rows = _validate(_read_records(path, file_format), columns, report)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            _insert_chunk(conn, sql, chunk, report)
+        if check_foreign_keys:
+            _reject_foreign_key_violations(conn, table, first_rowid, report)
+        if not defer_indexes:  # the UTC times of the new flights, or of flights at the new airports
+            fill_missing_flight_times(conn)
+    finally:
+        try:
+            if defer_indexes:
+                # Also after a failed load: migrate() would not notice the missing indexes and triggers.
+                _restore_deferred(conn, table)
+        finally:
+            report.seconds = time.perf_counter() - start
+            if own_conn:
+                conn.close()
+    return report
+
+
+def _restore_deferred(conn, table):
+    """Recreates the indexes and triggers a defer_indexes load dropped and rebuilds what they maintain."""
+    if conn.in_transaction:
+        conn.rollback()
+    create_flight_time_triggers(conn)
+    create_schedule_triggers(conn)
+    create_change_log_triggers(conn, resync_tables=(table,))
+    create_search_triggers(conn, reindex_tables=(table,))
+    create_indexes(conn)
+    create_triggers(conn)
+    rebuild_aggregates(conn)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import Flight, Pilot or Airport rows from CSV or JSON Lines.")
+    parser.add_argument("table", choices=sorted(TABLE_COLUMNS))
+    parser.add_argument("path", help="CSV (with header row) or JSON Lines file")
+    parser.add_argument("--db", default=DB_PATH, help="SQLite database file")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="rows per transaction")
+    parser.add_argument("--format", choices=("csv", "jsonl"), help="defaults to the file extension")
+    parser.add_argument("--defer-indexes", action="store_true", help="drop Flight indexes and triggers during the load and rebuild after")
+    parser.add_argument("--no-fk-check", action="store_true", help="skip the foreign key check after loading")
+    args = parser.parse_args(argv)
+
+    report = import_file(args.path, args.table, db_path=args.db, chunk_size=args.chunk_size,
+                         file_format=args.format, defer_indexes=args.defer_indexes,
+                         check_foreign_keys=not args.no_fk_check)
+    print(report.summary())
+    return 1 if report.rejected else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+import threading
+from collections import OrderedDict
+
+from models import Airport, Pilot
+
+# In-process cache of the Airport and Pilot dimension tables. They are small and
+# rarely written compared to Flight, so the flight listings select Flight columns
+# only and resolve cities and pilot names here instead of joining on every query.
+#
+# Writes made through FlightAPI invalidate the affected entries once they are
+# committed (FlightAPI.after_commit), so no other connection can reload and keep
+# the row as it was before. Writes made by another process (bulk_import.py, raw
+# SQL) are not seen until invalidate_all() or a restart, the same as any
+# read-through cache.
+
+AIRPORT_BY_CODE_SQL = "SELECT AirportCode, AirportName, City, Country, TimeZone FROM Airport WHERE AirportCode = ?"
+
+PILOT_BY_ID_SQL = "SELECT PilotID, FirstName, LastName, Email, PhoneNumber FROM Pilot WHERE PilotID = ?"
+
+DEFAULT_MAX_AIRPORTS = 1024
+DEFAULT_MAX_PILOTS = 4096
+
+_MISSING = object()  # distinguishes "not cached" from a cached None (unknown key)
+
+
+class LRUCache:
+    """A bounded mapping that evicts the least recently used entry, with hit/miss counters.
+
+    Hits take no lock: each OrderedDict operation is atomic under the GIL, and an
+    entry evicted by another thread mid-lookup is simply counted as a miss. Inserts
+    and evictions are serialised. The counters are approximate under concurrency.
+
+    Read `generation` before loading a missed value and pass it to put(): if an
+    invalidation happened meanwhile the (possibly stale) value is not stored.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Returns the cached value (marking it recently used), or default on a miss."""
+        try:
+            value = self._entries[key]
+            self._entries.move_to_end(key)
+        except KeyError:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def put(self, key, value, generation=None):
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self.generation += 1
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+class DimensionCache:
+    """Read-through LRU caches of Airport rows (by code) and Pilot rows (by ID).
+
+    Lookups take the connection to load misses from, so one cache can be shared by
+    several connections of the same database.
+    """
+
+    def __init__(self, max_airports=DEFAULT_MAX_AIRPORTS, max_pilots=DEFAULT_MAX_PILOTS):
+        self.airports = LRUCache(max_airports)
+        self.pilots = LRUCache(max_pilots)
+
+    def airport(self, conn, code):
+        """Returns the Airport with this code, or None."""
+        airport = self.airports.get(code, _MISSING)
+        if airport is _MISSING:
+            generation = self.airports.generation
+            row = conn.execute(AIRPORT_BY_CODE_SQL, (code,)).fetchone()
+            airport = Airport(*row) if row else None
+            self.airports.put(code, airport, generation)
+        return airport
+
+    def pilot(self, conn, pilot_id):
+        """Returns the Pilot with this ID, or None. The ID must be an int: the entry is keyed by it,
+        and invalidate_pilot() is passed the int."""
+        if not isinstance(pilot_id, int) or isinstance(pilot_id, bool):
+            raise ValueError(f"Expected a PilotID, not {pilot_id!r}.")
+        pilot = self.pilots.get(pilot_id, _MISSING)
+        if pilot is _MISSING:
+            generation = self.pilots.generation
+            row = conn.execute(PILOT_BY_ID_SQL, (pilot_id,)).fetchone()
+            pilot = Pilot(*row) if row else None
+            self.pilots.put(pilot_id, pilot, generation)
+        return pilot
+
+    def city(self, conn, code):
+        """The city of an airport; the code itself if the airport is unknown."""
+        airport = self.airport(conn, code)
+        return airport.city if airport else code
+
+    def pilot_name(self, conn, pilot_id):
+        """A pilot's full name, or 'Unassigned' for no (or an unknown) pilot."""
+        pilot = self.pilot(conn, pilot_id) if pilot_id is not None else None
+        return pilot.name if pilot else 'Unassigned'
+
+    def invalidate_airport(self, code):
+        self.airports.invalidate(code)
+
+    def invalidate_pilot(self, pilot_id):
+        self.pilots.invalidate(pilot_id)
+
+    def invalidate_all(self):
+        """Drops every cached row, e.g. after another process has edited the dimensions."""
+        self.airports.clear()
+        self.pilots.clear()
+
+    def stats(self):
+        """Hit/miss counters and sizes of both caches."""
+        return {"airports": self.airports.stats(), "pilots": self.pilots.stats()}
@@ -0,0 +1,261 @@
+import argparse
+import json
+import sys
+import time
+
+from connection import DB_PATH, connect
+from models import ChangeEvent
+from schema import migrate
+
+# Change-data capture for downstream consumers (crew apps, gate displays).
+#
+# Triggers (schema.CHANGE_LOG_TRIGGERS) append every insert, update and delete
+# of a Flight, Pilot or Airport row to ChangeLog under a sequence number that
+# only grows. A consumer remembers the last Seq it has handled and asks for
+# what came after it, so keeping up costs O(changes) instead of re-reading and
+# diffing the tables. To start, it reads the tables and latest_seq() in one read
+# transaction and tails from there. Flights moved out by archive.py appear as
+# deletes. A RESYNC entry means a table was bulk-loaded with the triggers off
+# (datagen.py, bulk_import.py --defer-indexes) and must be re-read.
+#
+# tail() polls: it checks PRAGMA data_version, which changes only when another
+# connection commits, before querying, and backs off from poll_interval to
+# max_interval while nothing arrives. Writers are serialised, so entries become
+# visible in Seq order and a consumer never skips one that commits late.
+#
+# compact() deletes the entries every registered consumer (ChangeConsumer,
+# see acknowledge()) has read, and anything older than the retention period
+# regardless. A consumer that falls behind that point gets ChangeLogGapError
+# and has to re-read the tables.
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_POLL_INTERVAL = 0.05  # seconds
+DEFAULT_MAX_INTERVAL = 1.0
+DEFAULT_RETENTION_DAYS = 7
+DEFAULT_COMPACT_BATCH = 10000
+
+CHANGES_SINCE_SQL = """
+    SELECT Seq, TableName, Operation, RowKey, Data, Old, ChangedAt
+    FROM ChangeLog
+    WHERE Seq > ?
+    ORDER BY Seq
+    LIMIT ?
+"""
+
+LATEST_SEQ_SQL = "SELECT seq FROM sqlite_sequence WHERE name = 'ChangeLog'"
+
+FIRST_SEQ_SQL = "SELECT MIN(Seq) FROM ChangeLog"
+
+# Entries are appended in time order, so this stops at the first recent one.
+FIRST_RECENT_SEQ_SQL = "SELECT Seq FROM ChangeLog WHERE ChangedAt >= ? ORDER BY Seq LIMIT 1"
+
+ACKNOWLEDGE_SQL = """
+    INSERT INTO ChangeConsumer (Name, Seq, UpdatedAt) VALUES (?, ?, ?)
+    ON CONFLICT (Name) DO UPDATE SET Seq = MAX(Seq, excluded.Seq), UpdatedAt = excluded.UpdatedAt
+"""
+
+CONSUMERS_SQL = "SELECT Name, Seq, UpdatedAt FROM ChangeConsumer ORDER BY Name"
+
+DELETE_COMPACTED_SQL = "DELETE FROM ChangeLog WHERE Seq <= ?"
+
+
+class ChangeLogGapError(LookupError):
+    """Raised when the entries after `since` have been compacted away; the consumer must re-read the tables."""
+
+    def __init__(self, since, first_seq):
+        super().__init__(f"Changes after {since} are no longer in the log (it starts at {first_seq}); "
+                         "re-read the tables and continue from latest_seq().")
+        self.since = since
+        self.first_seq = first_seq
+
+
+def latest_seq(conn):
+    """The Seq of the newest entry ever logged (0 if none), even if it has been compacted."""
+    row = conn.execute(LATEST_SEQ_SQL).fetchone()
+    return row[0] if row else 0
+
+
+def _event(row):
+    seq, table, operation, key, data, old, changed_at = row
+    return ChangeEvent(seq, table, operation, key, json.loads(data) if data else None,
+                       json.loads(old) if old else None, changed_at)
+
+
+def changes_since(conn, since=0, limit=DEFAULT_BATCH_SIZE):
+    """Returns up to limit ChangeEvents after sequence number since, oldest first.
+
+    Raises ChangeLogGapError if entries after since were compacted.
+    """
+    rows = conn.execute(CHANGES_SINCE_SQL, (since, limit)).fetchall()
+    if rows and rows[0][0] != since + 1:
+        raise ChangeLogGapError(since, rows[0][0])
+    if not rows and since < latest_seq(conn):
+        raise ChangeLogGapError(since, latest_seq(conn) + 1)
+    return [_event(row) for row in rows]
+
+
+def tail(conn, since=0, tables=None, batch_size=DEFAULT_BATCH_SIZE, poll_interval=DEFAULT_POLL_INTERVAL,
+         max_interval=DEFAULT_MAX_INTERVAL, timeout=None):
+    """Yields ChangeEvents after since as they are committed, blocking between them.
+
+    tables limits the events to those tables. With timeout, returns once that
+    many seconds pass without a new entry; otherwise runs until the caller
+    stops iterating. Use a connection of its own: commits made on it do not
+    change PRAGMA data_version and are only seen on the next backoff poll.
+    """
+    tables = set(tables) if tables else None
+    interval = poll_interval
+    last_seen = time.monotonic()
+    data_version = None
+    while True:
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != data_version or interval >= max_interval:
+            data_version = version
+            events = changes_since(conn, since, batch_size)
+            if events:
+                since = events[-1].seq
+                for event in events:
+                    if tables is None or event.table in tables:
+                        yield event
+                interval = poll_interval
+                last_seen = time.monotonic()
+                if len(events) == batch_size:
+                    data_version = None  # more may be waiting
+                continue
+        if timeout is not None and time.monotonic() - last_seen >= timeout:
+            return
+        time.sleep(interval)
+        interval = min(interval * 2, max_interval)
+
+
+def acknowledge(conn, consumer, seq):
+    """Records that consumer has handled every change up to seq (positions never move back)."""
+    with conn:
+        conn.execute(ACKNOWLEDGE_SQL, (consumer, seq, int(time.time())))
+
+
+def consumer_position(conn, consumer):
+    """The last Seq acknowledged by consumer, or None if it is not registered."""
+    row = conn.execute("SELECT Seq FROM ChangeConsumer WHERE Name = ?", (consumer,)).fetchone()
+    return row[0] if row else None
+
+
+def remove_consumer(conn, consumer):
+    """Forgets a consumer so it no longer holds back compaction; returns True if it existed."""
+    with conn:
+        return conn.execute("DELETE FROM ChangeConsumer WHERE Name = ?", (consumer,)).rowcount > 0
+
+
+def compact(conn, retention_days=DEFAULT_RETENTION_DAYS, batch_size=DEFAULT_COMPACT_BATCH, now=None):
+    """Deletes the entries every consumer has acknowledged and those older than retention_days.
+
+    With no registered consumers only the retention period applies. Deletes in
+    Seq ranges of batch_size, one transaction each; returns the number deleted.
+    """
+    first = conn.execute(FIRST_SEQ_SQL).fetchone()[0]
+    if first is None:
+        return 0
+    cutoff = (time.time() if now is None else now) - retention_days * 86400
+    recent = conn.execute(FIRST_RECENT_SEQ_SQL, (cutoff,)).fetchone()
+    through = recent[0] - 1 if recent else latest_seq(conn)
+    acknowledged = conn.execute("SELECT MIN(Seq) FROM ChangeConsumer").fetchone()[0]
+    if acknowledged is not None:
+        through = max(through, acknowledged)
+    deleted = 0
+    for upper in range(first + batch_size - 1, through + batch_size, batch_size):
+        with conn:
+            deleted += conn.execute(DELETE_COMPACTED_SQL, (min(upper, through),)).rowcount
+    return deleted
+
+
+def status(conn):
+    """First and latest Seq, entries held, and each consumer's position and lag."""
+    latest = latest_seq(conn)
+    first, count = conn.execute("SELECT MIN(Seq), COUNT(*) FROM ChangeLog").fetchone()
+    consumers = [{"name": name, "seq": seq, "lag": latest - seq, "updated_at": updated}
+                 for name, seq, updated in conn.execute(CONSUMERS_SQL)]
+    return {"first_seq": first, "latest_seq": latest, "entries": count, "consumers": consumers}
+
+
+def _print_event(event):
+    print(json.dumps(event.as_dict(), ensure_ascii=False), flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tail or compact the Flight/Pilot/Airport change log.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    tailing = sub.add_parser("tail", help="print changes as JSON Lines")
+    tailing.add_argument("--since", type=int, help="last sequence number already handled (default: the consumer's, "
+                                                   "else the latest)")
+    tailing.add_argument("--consumer", help="read from and acknowledge this consumer's position")
+    tailing.add_argument("--table", action="append", choices=("Flight", "Pilot", "Airport"), dest="tables")
+    tailing.add_argument("--follow", action="store_true", help="keep waiting for new changes")
+    tailing.add_argument("--timeout", type=float, help="with --follow, stop after this many idle seconds")
+
+    compacting = sub.add_parser("compact", help="delete entries every consumer has read or older than --retention-days")
+    compacting.add_argument("--retention-days", type=float, default=DEFAULT_RETENTION_DAYS)
+    compacting.add_argument("--batch-size", type=int, default=DEFAULT_COMPACT_BATCH)
+
+    sub.add_parser("status", help="log size and consumer positions")
+
+    forget = sub.add_parser("forget", help="remove a consumer")
+    forget.add_argument("consumer")
+
+    for command in sub.choices.values():
+        command.add_argument("--db", default=DB_PATH, help="SQLite database file")
+    args = parser.parse_args(argv)
+
+    conn = connect(args.db)
+    migrate(conn)
+    if args.command == "status":
+        print(json.dumps(status(conn), indent=2))
+    elif args.command == "forget":
+        if not remove_consumer(conn, args.consumer):
+            print(f"No consumer named '{args.consumer}'.")
+            return 1
+        print(f"Consumer '{args.consumer}' removed.")
+    elif args.command == "compact":
+        start = time.perf_counter()
+        deleted = compact(conn, args.retention_days, args.batch_size)
+        print(f"Deleted {deleted} change log entries in {time.perf_counter() - start:.2f}s.")
+    else:
+        since = args.since
+        if since is None and args.consumer:
+            since = consumer_position(conn, args.consumer)
+        if since is None:
+            since = latest_seq(conn)
+        try:
+            if args.follow:
+                acknowledged, last = since, time.monotonic()
+                try:
+                    for event in tail(conn, since, args.tables, timeout=args.timeout):
+                        _print_event(event)
+                        since = event.seq
+                        if args.consumer and time.monotonic() - last >= 1.0:
+                            acknowledge(conn, args.consumer, since)
+                            acknowledged, last = since, time.monotonic()
+                finally:
+                    if args.consumer and since != acknowledged:
+                        acknowledge(conn, args.consumer, since)
+            else:
+                while True:
+                    events = changes_since(conn, since)
+                    if not events:
+                        break
+                    for event in events:
+                        if not args.tables or event.table in args.tables:
+                            _print_event(event)
+                    since = events[-1].seq
+                    if args.consumer:
+                        acknowledge(conn, args.consumer, since)
+        except ChangeLogGapError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 2
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,287 @@
+import argparse
+import ast
+import json
+import mmap
+import os
+import shutil
+import sys
+import time
+from array import array
+
+from changelog import latest_seq
+from connection import DB_PATH, connect
+from models import FLIGHT_STATUSES
+from schema import SCHEMA_VERSION, migrate
+
+# Columnar snapshot of the Flight table for analytics (see analytics.py).
+#
+# export() writes one file per column into a directory, each a NumPy .npy file
+# (a short header, then the values as one flat array of integers), written and
+# read with the standard library alone. Airports, pilots and statuses are
+# dictionary-encoded as small integer codes; the dictionaries, the routes and
+# the snapshot's provenance are in manifest.json. Rows are sorted by route
+# (departure airport, arrival airport), then departure time, so every route is
+# one contiguous slice [route_offsets[r], route_offsets[r + 1]) of each column.
+#
+# ColumnarSnapshot maps the files read-only (mmap) and hands out memoryviews of
+# them: opening a snapshot reads only the manifest, and the page cache is shared
+# by every process reading it. numpy.load(path, mmap_mode="r") opens the same
+# files.
+#
+# A snapshot is a copy as of one read transaction; the manifest records the
+# change log position (changelog.latest_seq) it was taken at, and is_current()
+# compares that with the database.
+
+MANIFEST = "manifest.json"
+FORMAT_VERSION = 2
+MISSING = -1  # DepartureUTC/ArrivalUTC unknown (airport without a time zone)
+EXPORT_BATCH_SIZE = 10000
+
+# name -> array typecode; codes index the manifest's dictionaries.
+COLUMNS = {
+    "flight_id": "q",
+    "route": "i",              # index into manifest["routes"]
+    "departure_airport": "i",  # index into manifest["airports"]
+    "arrival_airport": "i",
+    "pilot": "i",              # index into manifest["pilots"]; 0 = unassigned
+    "status": "b",             # index into models.FLIGHT_STATUSES
+    "departure_day": "i",      # DepartureUTC // 86400, or MISSING
+    "departure_utc": "q",      # or MISSING
+    "block_minutes": "i",      # (ArrivalUTC - DepartureUTC) / 60, or MISSING
+}
+
+EXPORT_FLIGHTS_SQL = """
+    SELECT FlightID, DepartureAirport, ArrivalAirport, PilotID, FlightStatus, DepartureUTC, ArrivalUTC
+    FROM Flight
+    ORDER BY DepartureAirport, ArrivalAirport, DepartureUTC, FlightID
+"""
+
+AIRPORTS_SQL = "SELECT AirportCode, City FROM Airport ORDER BY AirportCode"
+
+PILOTS_SQL = "SELECT PilotID, FirstName || ' ' || LastName FROM Pilot ORDER BY PilotID"
+
+
+def default_path(db_path=DB_PATH):
+    """The snapshot directory next to a database: FlightManagement.db -> FlightManagement.columns."""
+    return os.path.splitext(db_path)[0] + ".columns"
+
+
+def _descr(typecode):
+    return f"{'<' if sys.byteorder == 'little' else '>'}i{array(typecode).itemsize}"
+
+
+def _check_codes(name, count):
+    """Raises ValueError if count dictionary codes do not fit the column's typecode."""
+    limit = 2 ** (8 * array(COLUMNS[name]).itemsize - 1)
+    if count > limit:
+        raise ValueError(f"{count} distinct {name} values do not fit a {_descr(COLUMNS[name])} column "
+                         f"(at most {limit}).")
+
+
+def _write_npy(path, values):
+    """Writes an array as a version 1.0 .npy file (header padded to 64 bytes, then the raw values)."""
+    header = f"{{'descr': '{_descr(values.typecode)}', 'fortran_order': False, 'shape': ({len(values)},), }}"
+    header += " " * (63 - (10 + len(header)) % 64) + "\n"
+    with open(path, "wb") as handle:
+        handle.write(b"\x93NUMPY\x01\x00" + len(header).to_bytes(2, "little") + header.encode("latin1"))
+        values.tofile(handle)
+
+
+def _map_npy(path, typecode):
+    """Maps a .npy file written by _write_npy; returns (mmap, memoryview of the values)."""
+    with open(path, "rb") as handle:
+        prefix = handle.read(10)
+        if prefix[:6] != b"\x93NUMPY":
+            raise ValueError(f"{path} is not a .npy file.")
+        header_length = int.from_bytes(prefix[8:10], "little")
+        header = ast.literal_eval(handle.read(header_length).decode("latin1"))
+        if header["descr"] != _descr(typecode) or header["fortran_order"]:
+            raise ValueError(f"{path} holds {header['descr']} values; expected {_descr(typecode)}.")
+        size = os.fstat(handle.fileno()).st_size
+        if size == 10 + header_length:  # no rows: mmap cannot map an empty range
+            return None, memoryview(array(typecode))
+        mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    return mapped, memoryview(mapped)[10 + header_length:].cast(typecode)
+
+
+def export(conn, path, batch_size=EXPORT_BATCH_SIZE):
+    """Writes a columnar snapshot of Flight to the directory path (replacing any there); returns the manifest.
+
+    The flights, airports, pilots and change log position are read in one read
+    transaction. The snapshot is built in PATH.building and renamed into place.
+    Raises ValueError if a dictionary has more entries than its column's codes hold.
+    """
+    start = time.perf_counter()
+    columns = {name: array(typecode) for name, typecode in COLUMNS.items()}
+    status_codes = {status: code for code, status in enumerate(FLIGHT_STATUSES)}
+    began = not conn.in_transaction
+    if began:
+        conn.execute("BEGIN")
+    try:
+        change_seq = latest_seq(conn)
+        airports = conn.execute(AIRPORTS_SQL).fetchall()
+        pilots = [(None, "Unassigned")] + conn.execute(PILOTS_SQL).fetchall()
+        airport_codes = {code: i for i, (code, _) in enumerate(airports)}
+        pilot_codes = {pilot_id: i for i, (pilot_id, _) in enumerate(pilots)}
+        routes, route_offsets = [], []
+        last_route = None
+        cursor = conn.execute(EXPORT_FLIGHTS_SQL)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for flight_id, origin, destination, pilot_id, status, departure, arrival in rows:
+                for code in (origin, destination):
+                    if code not in airport_codes:  # no Airport row: keep the flight, city unknown
+                        airport_codes[code] = len(airports)
+                        airports.append((code, None))
+                if pilot_id not in pilot_codes:  # no Pilot row: keep the ID, name unknown
+                    pilot_codes[pilot_id] = len(pilots)
+                    pilots.append((pilot_id, None))
+                route = (airport_codes[origin], airport_codes[destination])
+                if route != last_route:
+                    routes.append(route)
+                    route_offsets.append(len(columns["flight_id"]))
+                    last_route = route
+                columns["flight_id"].append(flight_id)
+                columns["route"].append(len(routes) - 1)
+                columns["departure_airport"].append(route[0])
+                columns["arrival_airport"].append(route[1])
+                columns["pilot"].append(pilot_codes[pilot_id])
+                columns["status"].append(status_codes[status])
+                columns["departure_day"].append(MISSING if departure is None else departure // 86400)
+                columns["departure_utc"].append(MISSING if departure is None else departure)
+                # Truncated like SQLite's integer division in api.BLOCK_TIMES_SQL.
+                columns["block_minutes"].append(MISSING if departure is None or arrival is None
+                                                else int((arrival - departure) / 60))
+    finally:
+        if began:
+            conn.commit()
+    route_offsets.append(len(columns["flight_id"]))
+    for name, count in (("departure_airport", len(airports)), ("pilot", len(pilots)), ("route", len(routes))):
+        _check_codes(name, count)
+
+    manifest = {
+        "format": FORMAT_VERSION,
+        "schema_version": SCHEMA_VERSION,
+        "created": int(time.time()),
+        "change_seq": change_seq,
+        "rows": len(columns["flight_id"]),
+        "columns": {name: _descr(typecode) for name, typecode in COLUMNS.items()},
+        "statuses": list(FLIGHT_STATUSES),
+        "airports": [code for code, _ in airports],
+        "cities": [city for _, city in airports],
+        "pilots": [pilot_id for pilot_id, _ in pilots],
+        "pilot_names": [name for _, name in pilots],
+        "routes": routes,
+        "route_offsets": route_offsets,
+    }
+    building = path + ".building"
+    shutil.rmtree(building, ignore_errors=True)
+    os.makedirs(building)
+    for name, values in columns.items():
+        _write_npy(os.path.join(building, f"{name}.npy"), values)
+    manifest["export_s"] = round(time.perf_counter() - start, 3)
+    with open(os.path.join(building, MANIFEST), "w", encoding="utf-8") as handle:
+        json.dump(manifest, handle)
+    if os.path.exists(path):
+        old = path + ".old"
+        shutil.rmtree(old, ignore_errors=True)
+        os.rename(path, old)
+        os.rename(building, path)
+        shutil.rmtree(old)
+    else:
+        os.rename(building, path)
+    return manifest
+
+
+class ColumnarSnapshot:
+    """A snapshot written by export(), mapped read-only.
+
+        with ColumnarSnapshot("FlightManagement.columns") as snapshot:
+            snapshot.column("status")       # memoryview of status codes, one per flight
+            snapshot.route_slice(r)         # the rows of route r
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, MANIFEST), encoding="utf-8") as handle:
+            self.manifest = json.load(handle)
+        if self.manifest["format"] != FORMAT_VERSION:
+            raise ValueError(f"{path} is a format {self.manifest['format']} snapshot; re-export it.")
+        self.rows = self.manifest["rows"]
+        self.statuses = self.manifest["statuses"]
+        self.airports = self.manifest["airports"]
+        self.cities = self.manifest["cities"]
+        self.pilots = self.manifest["pilots"]
+        self.pilot_names = self.manifest["pilot_names"]
+        self.routes = [tuple(route) for route in self.manifest["routes"]]
+        self.route_offsets = self.manifest["route_offsets"]
+        self._maps = {}
+        self._views = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def column(self, name):
+        """The column as a memoryview of ints (mapped on first use)."""
+        view = self._views.get(name)
+        if view is None:
+            mapped, view = _map_npy(os.path.join(self.path, f"{name}.npy"), COLUMNS[name])
+            if len(view) != self.rows:
+                raise ValueError(f"{name}.npy has {len(view)} rows; the manifest says {self.rows}.")
+            self._maps[name] = mapped
+            self._views[name] = view
+        return view
+
+    def route_slice(self, route):
+        """The slice of rows holding one route's flights."""
+        return slice(self.route_offsets[route], self.route_offsets[route + 1])
+
+    def is_current(self, conn):
+        """True if no Flight, Pilot or Airport row has changed since the export (per the change log)."""
+        return latest_seq(conn) == self.manifest["change_seq"]
+
+    def close(self):
+        for view in self._views.values():
+            view.release()
+        for mapped in self._maps.values():
+            if mapped is not None:
+                mapped.close()
+        self._views.clear()
+        self._maps.clear()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the Flight table as a columnar snapshot for analytics.")
+    parser.add_argument("command", choices=("export", "info"))
+    parser.add_argument("--db", default=DB_PATH, help="SQLite database file")
+    parser.add_argument("--path", help="snapshot directory (default: next to the database, *.columns)")
+    args = parser.parse_args(argv)
+    path = args.path or default_path(args.db)
+
+    conn = connect(args.db)
+    migrate(conn)
+    if args.command == "export":
+        manifest = export(conn, path)
+        size = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+        print(f"Exported {manifest['rows']} flights ({len(manifest['routes'])} routes) to {path}: "
+              f"{size / 2**20:.1f} MB in {manifest['export_s']:.2f}s.")
+        return 0
+    try:
+        snapshot = ColumnarSnapshot(path)
+    except FileNotFoundError:
+        print(f"No snapshot at {path}; run `python columnar.py export` first.")
+        return 1
+    with snapshot:
+        current = snapshot.is_current(conn)
+        print(f"{path}: {snapshot.rows} flights, {len(snapshot.routes)} routes, change log position "
+              f"{snapshot.manifest['change_seq']} ({'current' if current else 'stale: re-export'}).")
+    return 0 if current else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
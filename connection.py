@@ -0,0 +1,82 @@
+import sqlite3
+
+from timezones import register_functions
+
+DB_PATH = "FlightManagement.db"
+
+# Named connection profiles. Values are applied as PRAGMAs in the order listed,
+# busy_timeout first so the journal_mode switch can wait for other connections.
+#   interactive - the menu and API: WAL so readers never wait on a commit,
+#                 NORMAL sync (durable at checkpoints), FK enforcement on
+#   bulk-load   - imports and generators: no fsync, big cache, FKs checked after the load
+#   reporting   - read-only (mode=ro URI, query_only) with a large mmap for scans
+#   legacy      - SQLite defaults: rollback journal, FULL sync; the old behaviour,
+#                 kept for benchmarking against
+PROFILES = {
+    "interactive": {
+        "busy_timeout": 5000,
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -16000,          # KiB, i.e. 16 MB
+        "mmap_size": 64 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "foreign_keys": "ON",
+    },
+    "bulk-load": {
+        "busy_timeout": 30000,
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "cache_size": -256000,
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "foreign_keys": "OFF",
+    },
+    "reporting": {
+        "busy_timeout": 5000,
+        "query_only": "ON",
+        "cache_size": -64000,
+        "mmap_size": 1024 * 1024 * 1024,
+        "temp_store": "MEMORY",
+    },
+    "legacy": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "foreign_keys": "OFF",
+    },
+}
+
+READ_ONLY_PROFILES = {"reporting"}
+
+PRAGMAS = {"busy_timeout", "journal_mode", "synchronous", "cache_size", "mmap_size",
+           "temp_store", "foreign_keys", "query_only"}
+
+
+def connect(path=DB_PATH, profile="interactive", check_same_thread=True, factory=sqlite3.Connection, **pragmas):
+    """Opens a connection to path configured by a named profile.
+
+    Keyword arguments override individual PRAGMAs of the profile, e.g.
+    connect(profile="interactive", cache_size=-64000, journal_mode="DELETE").
+    Read-only profiles open the file with a mode=ro URI, so it must already exist.
+    The SQL functions the application's statements call (timezones.register_functions)
+    are registered on every connection. factory is passed to sqlite3.connect
+    (instrumentation.InstrumentedConnection times every statement).
+    """
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown connection profile '{profile}'. Choose from: {', '.join(PROFILES)}")
+    settings = dict(PROFILES[profile])
+    for name, value in pragmas.items():
+        if name not in PRAGMAS:
+            raise ValueError(f"Unsupported connection setting '{name}'.")
+        settings[name] = value
+
+    if profile in READ_ONLY_PROFILES and path != ":memory:":
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=check_same_thread,
+                               factory=factory)
+    else:
+        conn = sqlite3.connect(path, check_same_thread=check_same_thread, factory=factory)
+    for name, value in settings.items():
+        if name == "journal_mode" and path == ":memory:":
+            continue
+        conn.execute(f"PRAGMA {name} = {value}")
+    register_functions(conn)
+    return conn
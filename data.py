@@ -1,51 +1,10 @@
-import sqlite3
+from connection import DB_PATH, connect
+from schema import fill_missing_flight_times, migrate
+from timezones import AIRPORT_TIME_ZONES
 
-def create_tables(conn):
-    """Creates the necessary tables if they do not exist."""
-    cur = conn.cursor()
-    
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS Pilot (
-            PilotID INTEGER PRIMARY KEY AUTOINCREMENT,
-            FirstName TEXT NOT NULL,
-            LastName TEXT NOT NULL,
-            Email TEXT,
-            PhoneNumber TEXT
-        );
-    """)
-
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS Airport (
-            AirportCode TEXT PRIMARY KEY,
-            AirportName TEXT NOT NULL,
-            City TEXT NOT NULL,
-            Country TEXT NOT NULL
-        );
-    """)
-
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS Flight (
-            FlightID INTEGER PRIMARY KEY AUTOINCREMENT,
-            FlightNumber TEXT NOT NULL,
-            PilotID INTEGER,
-            DepartureAirport TEXT NOT NULL,
-            ArrivalAirport TEXT NOT NULL,
-            DepartureDate DATE NOT NULL,
-            DepartureTime TIME NOT NULL,
-            ArrivalDate DATE NOT NULL,
-            ArrivalTime TIME NOT NULL,
-            FlightStatus TEXT NOT NULL CHECK (FlightStatus IN 
-                ('Scheduled', 'Departed', 'Delayed', 'Cancelled', 'Completed')),
-            FOREIGN KEY (PilotID) REFERENCES Pilot(PilotID),
-            FOREIGN KEY (DepartureAirport) REFERENCES Airport(AirportCode),
-            FOREIGN KEY (ArrivalAirport) REFERENCES Airport(AirportCode)
-        );
-    """)
-    conn.commit()
-
-def sample_data():
-    conn = sqlite3.connect("FlightManagement.db")
-    create_tables(conn)  # Ensure tables are created before inserting data
+def sample_data(db_path=DB_PATH):
+    conn = connect(db_path, "bulk-load")
+    migrate(conn)  # Ensure tables are created before inserting data
     cur = conn.cursor()
 
     # Clear existing data to prevent UNIQUE constraint errors
@@ -106,11 +65,13 @@ def sample_data():
         ('BA1313', 10, 'LHR', 'SIN', '2025-10-17', '15:45', '2025-10-18', '11:30', 'Scheduled')
     ]
 
-    cur.executemany("INSERT INTO Airport (AirportCode, AirportName, City, Country) VALUES (?, ?, ?, ?)", airports)
+    cur.executemany("INSERT INTO Airport (AirportCode, AirportName, City, Country, TimeZone) VALUES (?, ?, ?, ?, ?)",
+                    [(*airport, AIRPORT_TIME_ZONES[airport[0]]) for airport in airports])
     cur.executemany("INSERT INTO Pilot (FirstName, LastName, Email, PhoneNumber) VALUES (?, ?, ?, ?)", pilots)
     cur.executemany("INSERT INTO Flight (FlightNumber, PilotID, DepartureAirport, ArrivalAirport, DepartureDate, DepartureTime, ArrivalDate, ArrivalTime, FlightStatus) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", flights)
 
     conn.commit()
+    fill_missing_flight_times(conn)
     print("Sample data inserted successfully.")
     conn.close()
 
@@ -0,0 +1,208 @@
+import argparse
+import os
+import random
+import time
+from datetime import date, datetime, timedelta
+from itertools import accumulate, islice
+from zoneinfo import ZoneInfo
+
+from aggregates import create_triggers, drop_triggers, rebuild_aggregates
+from connection import connect
+from schema import (create_change_log_triggers, create_flight_time_triggers, create_indexes, create_schedule_triggers,
+                    create_search_triggers, drop_change_log_triggers, drop_flight_time_triggers, drop_indexes,
+                    drop_schedule_triggers, drop_search_triggers, migrate)
+from timezones import AIRPORT_TIME_ZONES
+
+# The real airports from data.sample_data come first so small scales still look familiar.
+BASE_AIRPORTS = [
+    ('LHR', 'Heathrow Airport', 'London', 'UK'),
+    ('LGW', 'Gatwick Airport', 'London', 'UK'),
+    ('MAN', 'Manchester Airport', 'Manchester', 'UK'),
+    ('EDI', 'Edinburgh Airport', 'Edinburgh', 'UK'),
+    ('BFS', 'Belfast International Airport', 'Belfast', 'UK'),
+    ('GLA', 'Glasgow Airport', 'Glasgow', 'UK'),
+    ('JFK', 'John F. Kennedy International Airport', 'New York', 'USA'),
+    ('CDG', 'Charles de Gaulle Airport', 'Paris', 'France'),
+    ('AMS', 'Amsterdam Schiphol Airport', 'Amsterdam', 'Netherlands'),
+    ('DXB', 'Dubai International Airport', 'Dubai', 'UAE'),
+    ('FRA', 'Frankfurt Main Airport', 'Frankfurt', 'Germany'),
+    ('MAD', 'Adolfo Suárez Madrid–Barajas Airport', 'Madrid', 'Spain'),
+    ('HKG', 'Hong Kong International Airport', 'Hong Kong', 'Hong Kong'),
+    ('NRT', 'Narita International Airport', 'Tokyo', 'Japan'),
+    ('SIN', 'Changi Airport', 'Singapore', 'Singapore')
+]
+
+# Synthetic airports take these zones in turn, so schedules cross time zones and DST rules.
+SYNTHETIC_TIME_ZONES = ('Europe/London', 'Europe/Paris', 'America/New_York', 'America/Chicago',
+                        'America/Los_Angeles', 'Asia/Dubai', 'Asia/Kolkata', 'Asia/Singapore',
+                        'Asia/Tokyo', 'Australia/Sydney')
+
+FIRST_NAMES = ['Emma', 'James', 'Sophie', 'Thomas', 'Olivia', 'William', 'Charlotte',
+               'Daniel', 'Amelia', 'George', 'Isla', 'Harry', 'Ava', 'Jack', 'Mia', 'Noah']
+LAST_NAMES = ['Thompson', 'Wilson', 'Davies', 'Harris', 'Clark', 'Lewis', 'Walker',
+              'Hall', 'Green', 'Adams', 'Patel', 'Khan', 'Evans', 'Roberts', 'Wright', 'Hughes']
+
+# Roughly what an operational schedule looks like: mostly future and finished flights.
+STATUS_WEIGHTS = [
+    ('Scheduled', 55), ('Completed', 25), ('Delayed', 8), ('Departed', 5), ('Cancelled', 7)
+]
+
+HUBS = ('LHR', 'LGW')
+HUB_SHARE = 0.6          # share of flights departing from a hub
+UNASSIGNED_SHARE = 0.05  # share of flights with no pilot
+FLIGHTS_PER_DAY = 2000   # schedule density, sets how many days the data spans
+START_DATE = date(2025, 1, 1)
+
+
+def scale_sizes(flights):
+    """Returns (airports, pilots) for a given number of flights."""
+    airports = max(len(BASE_AIRPORTS), int(flights ** 0.5 / 2))
+    pilots = max(10, flights // 200)
+    return airports, pilots
+
+
+def _zipf_cum_weights(n, exponent=1.1):
+    """Cumulative Zipf weights so a few routes/pilots carry most of the traffic."""
+    return list(accumulate(1 / (rank ** exponent) for rank in range(1, n + 1)))
+
+
+def _airport_code(i):
+    # Synthetic codes are four characters so they never collide with real IATA codes.
+    letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    return "X" + letters[i // 676 % 26] + letters[i // 26 % 26] + letters[i % 26]
+
+
+def route_minutes(origin, dest):
+    """Block time for a route, fixed per airport pair (40 min to about 14 h)."""
+    return 40 + sum(map(ord, origin + dest)) * 37 % 800
+
+
+def generate_airports(count):
+    """Returns count airport rows, with time zones: the base airports plus synthetic ones."""
+    airports = [(*airport, AIRPORT_TIME_ZONES[airport[0]]) for airport in BASE_AIRPORTS[:count]]
+    for i in range(count - len(airports)):
+        code = _airport_code(i)
+        airports.append((code, f"Synthetic Airport {code}", f"City {code}", f"Country {i % 60}",
+                         SYNTHETIC_TIME_ZONES[i % len(SYNTHETIC_TIME_ZONES)]))
+    return airports
+
+
+def generate_pilots(count, rng):
+    """Returns count pilot rows with unique e-mail addresses."""
+    pilots = []
+    for i in range(1, count + 1):
+        first = rng.choice(FIRST_NAMES)
+        last = rng.choice(LAST_NAMES)
+        pilots.append((first, last, f"{first.lower()}.{last.lower()}{i}@example.com", f"+4479{i:08d}"))
+    return pilots
+
+
+def generate_flights(count, airport_codes, pilot_count, rng, time_zones=None):
+    """Yields count flight rows lazily, with hub, destination, status and pilot skew.
+
+    Times are local to each airport: with time_zones (airport code -> IANA zone)
+    the arrival is the departure plus the block time, converted to the
+    destination's zone; without, both ends share one clock.
+    """
+    dest_weights = _zipf_cum_weights(len(airport_codes))
+    pilot_weights = _zipf_cum_weights(pilot_count, exponent=0.6)
+    pilot_ids = range(1, pilot_count + 1)
+    statuses = [status for status, _ in STATUS_WEIGHTS]
+    status_weights = list(accumulate(weight for _, weight in STATUS_WEIGHTS))
+    hubs = [code for code in HUBS if code in airport_codes] or airport_codes[:1]
+    days = max(30, count // FLIGHTS_PER_DAY)
+    position = {code: i for i, code in enumerate(airport_codes)}
+    dates = [(START_DATE + timedelta(days=d)).isoformat() for d in range(days + 2)]
+    zones = {code: ZoneInfo(zone) for code, zone in time_zones.items()} if time_zones else None
+    midnights = [datetime(START_DATE.year, START_DATE.month, START_DATE.day) + timedelta(days=d) for d in range(days)]
+
+    for i in range(count):
+        if rng.random() < HUB_SHARE:
+            origin = rng.choice(hubs)
+        else:
+            origin = rng.choice(airport_codes)
+        dest = rng.choices(airport_codes, cum_weights=dest_weights)[0]
+        if dest == origin:
+            dest = airport_codes[(position[origin] + 1) % len(airport_codes)]
+        pilot = None if rng.random() < UNASSIGNED_SHARE else rng.choices(pilot_ids, cum_weights=pilot_weights)[0]
+
+        day = rng.randrange(days)
+        dep_minutes = rng.randrange(5 * 60, 23 * 60, 5)
+        duration = route_minutes(origin, dest)
+        status = rng.choices(statuses, cum_weights=status_weights)[0]
+        dep_time = f"{dep_minutes // 60:02d}:{dep_minutes % 60:02d}"
+        if zones:
+            departs = (midnights[day] + timedelta(minutes=dep_minutes)).replace(tzinfo=zones[origin])
+            arrives = datetime.fromtimestamp(departs.timestamp() + duration * 60, zones[dest])
+            arr_date, arr_time = arrives.date().isoformat(), f"{arrives.hour:02d}:{arrives.minute:02d}"
+        else:
+            arr_total = dep_minutes + duration
+            arr_date, arr_time = dates[day + arr_total // 1440], f"{arr_total % 1440 // 60:02d}:{arr_total % 60:02d}"
+        yield (f"BA{100 + i % 9900}", pilot, origin, dest, dates[day], dep_time, arr_date, arr_time, status)
+
+
+def populate(conn, flights, seed=42, chunk_size=50000):
+    """Fills an empty database with a deterministic synthetic schedule of the given size.
+
+    The indexes and triggers are dropped for the load and recreated even if it fails.
+    """
+    rng = random.Random(seed)
+    airport_count, pilot_count = scale_sizes(flights)
+    migrate(conn)
+    try:
+        drop_indexes(conn)
+        drop_triggers(conn)
+        drop_flight_time_triggers(conn)
+        drop_schedule_triggers(conn)
+        drop_change_log_triggers(conn)
+        drop_search_triggers(conn)
+
+        airports = generate_airports(airport_count)
+        with conn:
+            conn.executemany("INSERT INTO Airport (AirportCode, AirportName, City, Country, TimeZone) VALUES (?, ?, ?, ?, ?)", airports)
+            conn.executemany("INSERT INTO Pilot (FirstName, LastName, Email, PhoneNumber) VALUES (?, ?, ?, ?)",
+                             generate_pilots(pilot_count, rng))
+
+        rows = generate_flights(flights, [a[0] for a in airports], pilot_count, rng, {a[0]: a[4] for a in airports})
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            with conn:
+                conn.executemany("INSERT INTO Flight (FlightNumber, PilotID, DepartureAirport, ArrivalAirport, DepartureDate, DepartureTime, ArrivalDate, ArrivalTime, FlightStatus) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", chunk)
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        create_flight_time_triggers(conn)
+        create_schedule_triggers(conn)
+        create_change_log_triggers(conn, resync_tables=("Airport", "Pilot", "Flight"))
+        create_search_triggers(conn)
+        create_indexes(conn)
+        create_triggers(conn)
+        rebuild_aggregates(conn)
+    conn.execute("ANALYZE")
+    conn.commit()
+
+
+def create_database(path, flights, seed=42):
+    """Creates a new database file at path populated with populate()."""
+    if os.path.exists(path):
+        raise FileExistsError(f"{path} already exists; generate into a new file.")
+    conn = connect(path, "bulk-load")
+    try:
+        populate(conn, flights, seed)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic flight schedule.")
+    parser.add_argument("--flights", type=int, default=10000, help="number of flights (e.g. 1000 to 10000000)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", default="synthetic.db", help="output database file (must not exist)")
+    args = parser.parse_args()
+    start = time.perf_counter()
+    create_database(args.db, args.flights, args.seed)
+    airports, pilots = scale_sizes(args.flights)
+    print(f"Generated {args.flights} flights, {airports} airports and {pilots} pilots "
+          f"in {args.db} ({time.perf_counter() - start:.1f}s).")
@@ -0,0 +1,486 @@
+import functools
+import inspect
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Query instrumentation: per-operation and per-statement latency histograms,
+# rows, SQLite VM steps and slow-query samples.
+#
+# Statements are timed by InstrumentedConnection/InstrumentedCursor (pass
+# factory=InstrumentedConnection to connection.connect): a statement runs from
+# execute() until its cursor is exhausted, closed or dropped, so a streamed
+# result includes the time its consumer spends between rows. Its rows are the
+# rows fetched, or the rows changed by a write. On top of that, attach()
+# installs on each connection
+#   - a progress handler, called every step_interval VM instructions, that
+#     charges the steps to the statement running on that thread, and
+#   - a trace callback, which sees every statement SQLite starts, including
+#     trigger programs and the implicit BEGIN; the first one a statement
+#     starts is kept as its expanded SQL (parameters inlined) for slow samples.
+# Operations are the FlightAPI methods, timed by wrap(api) with their statements
+# charged to them; a method called by another is part of the outer operation.
+#
+# Statements slower than slow_ms are kept (the latest max_samples) with their
+# EXPLAIN QUERY PLAN. prometheus() renders everything in the Prometheus text
+# format; write_prometheus() writes it atomically for a textfile collector.
+
+DEFAULT_SLOW_MS = 100.0
+DEFAULT_STEP_INTERVAL = 1000   # VM instructions per progress callback
+DEFAULT_MAX_SAMPLES = 50
+METRIC_PREFIX = "flightdb"
+
+# Histogram bucket upper bounds, milliseconds.
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=1024)
+def normalize_sql(sql):
+    """The statement key: the SQL text with runs of whitespace collapsed."""
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram in milliseconds (Prometheus style)."""
+    __slots__ = ("counts", "count", "sum")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)  # last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, ms):
+        i = 0
+        while i < len(LATENCY_BUCKETS_MS) and ms > LATENCY_BUCKETS_MS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += ms
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (inf if it is the last one)."""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, count in zip((*LATENCY_BUCKETS_MS, float("inf")), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class _Metrics:
+    """Totals for one operation or one statement."""
+    __slots__ = ("latency", "calls", "errors", "rows", "steps", "statements", "max_ms")
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.steps = 0
+        self.statements = 0   # statements SQLite started, trigger programs included
+        self.max_ms = 0.0
+
+    def as_dict(self):
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "total_ms": round(self.latency.sum, 3),
+            "mean_ms": round(self.latency.sum / self.calls, 3) if self.calls else None,
+            "p50_ms": self.latency.quantile(0.5),
+            "p95_ms": self.latency.quantile(0.95),
+            "max_ms": round(self.max_ms, 3),
+            "rows": self.rows,
+            "vm_steps": self.steps,
+            "sqlite_statements": self.statements,
+        }
+
+
+class _Running:
+    """A statement between execute() and the end of its result."""
+    __slots__ = ("conn", "sql", "params", "started", "last", "rows", "steps", "statements", "expanded", "operation")
+
+    def __init__(self, conn, sql, params, operation):
+        self.conn = conn
+        self.sql = sql
+        self.params = params
+        self.started = self.last = time.perf_counter()
+        self.rows = 0
+        self.steps = 0
+        self.statements = 0
+        self.expanded = None
+        self.operation = operation
+
+
+class _Operation:
+    __slots__ = ("name", "rows", "steps", "statements")
+
+    def __init__(self, name):
+        self.name = name
+        self.rows = 0
+        self.steps = 0
+        self.statements = 0
+
+
+class Instrumentation:
+    """Collects query metrics from instrumented connections and wrapped APIs.
+
+        instrumentation = Instrumentation()
+        conn = connect(path, factory=InstrumentedConnection)
+        instrumentation.attach(conn)
+        api = instrumentation.wrap(FlightAPI(conn))
+        ...
+        instrumentation.snapshot()                # dict, as shown by menu option 18
+        instrumentation.write_prometheus("flightdb.prom")
+    """
+
+    def __init__(self, slow_ms=DEFAULT_SLOW_MS, step_interval=DEFAULT_STEP_INTERVAL,
+                 max_samples=DEFAULT_MAX_SAMPLES):
+        self.slow_ms = slow_ms
+        self.step_interval = step_interval
+        self.operations = {}
+        self.statements = {}
+        self.slow_samples = deque(maxlen=max_samples)
+        self.slow_count = 0
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _state(self):
+        local = self._local
+        if not hasattr(local, "running"):
+            local.running = []      # statements open on this thread, innermost last
+            local.operation = None
+            local.paused = False
+        return local
+
+    def attach(self, conn):
+        """Installs the trace callback and progress handler; conn should be an InstrumentedConnection."""
+        if isinstance(conn, InstrumentedConnection):
+            conn.instrumentation = self
+        conn.set_trace_callback(self._traced)
+        conn.set_progress_handler(self._progress, self.step_interval)
+        return conn
+
+    def _traced(self, sql):
+        local = self._state()
+        if local.paused:
+            return
+        if local.running:
+            running = local.running[-1]
+            running.statements += 1
+            if running.expanded is None and not sql.startswith("BEGIN"):
+                running.expanded = sql
+        elif local.operation is not None:
+            local.operation.statements += 1
+
+    def _progress(self):
+        local = self._state()
+        if local.running and not local.paused:
+            local.running[-1].steps += self.step_interval
+        return 0
+
+    # Operations
+    @contextmanager
+    def operation(self, name):
+        """Times a block as one operation; nested operations count towards the outermost."""
+        local = self._state()
+        if local.operation is not None:
+            yield
+            return
+        current = local.operation = _Operation(name)
+        started = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            for running in list(local.running):
+                if running.operation is current:
+                    self._finish(running)
+            local.operation = None
+            with self._lock:
+                metrics = self.operations.get(name)
+                if metrics is None:
+                    metrics = self.operations[name] = _Metrics()
+                self._record(metrics, elapsed, current.rows, current.steps, current.statements, failed)
+
+    def wrap(self, api):
+        """Times every public method of api (a FlightAPI) as an operation; returns api.
+
+        Generator methods and transaction() are left alone: their work happens
+        after they return.
+        """
+        for name, method in inspect.getmembers(type(api), inspect.isfunction):
+            if name.startswith("_") or name == "transaction" or inspect.isgeneratorfunction(method):
+                continue
+            setattr(api, name, self._timed(name, getattr(api, name)))
+        return api
+
+    def _timed(self, name, method):
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            with self.operation(name):
+                return method(*args, **kwargs)
+        return timed
+
+    # Statements
+    def _begin(self, conn, sql, params):
+        local = self._state()
+        running = _Running(conn, sql, params, local.operation)
+        local.running.append(running)
+        return running
+
+    def _finish(self, running, failed=False):
+        local = self._state()
+        try:
+            local.running.remove(running)
+        except ValueError:
+            return  # already finished
+        elapsed = (running.last - running.started) * 1000
+        operation = running.operation
+        if operation is not None:
+            operation.rows += running.rows
+            operation.steps += running.steps
+            operation.statements += running.statements
+        key = normalize_sql(running.sql)
+        sample = None
+        if elapsed >= self.slow_ms:
+            sample = {
+                "sql": key,
+                "expanded_sql": normalize_sql(running.expanded) if running.expanded else None,
+                "ms": round(elapsed, 3),
+                "rows": running.rows,
+                "vm_steps": running.steps,
+                "operation": operation.name if operation else None,
+                "at": time.time(),
+                "plan": self._plan(running),
+            }
+        with self._lock:
+            metrics = self.statements.get(key)
+            if metrics is None:
+                metrics = self.statements[key] = _Metrics()
+            self._record(metrics, elapsed, running.rows, running.steps, running.statements, failed)
+            if sample:
+                self.slow_samples.append(sample)
+                self.slow_count += 1
+
+    def _plan(self, running):
+        """EXPLAIN QUERY PLAN lines for a statement, or None if it cannot be explained."""
+        if running.params is None:
+            return None
+        local = self._state()
+        local.paused = True
+        try:
+            rows = sqlite3.Connection.execute(running.conn, "EXPLAIN QUERY PLAN " + running.sql, running.params)
+            return [row[3] for row in rows]
+        except (sqlite3.Error, ValueError):
+            return None
+        finally:
+            local.paused = False
+
+    @staticmethod
+    def _record(metrics, elapsed, rows, steps, statements, failed):
+        metrics.latency.observe(elapsed)
+        metrics.calls += 1
+        metrics.errors += failed
+        metrics.rows += rows
+        metrics.steps += steps
+        metrics.statements += statements
+        metrics.max_ms = max(metrics.max_ms, elapsed)
+
+    # Output
+    def snapshot(self):
+        """Operations and statements (slowest total first) and the slow-query samples, as plain data."""
+        with self._lock:
+            operations = {name: m.as_dict() for name, m in self.operations.items()}
+            statements = {sql: m.as_dict() for sql, m in self.statements.items()}
+            samples = list(self.slow_samples)
+        return {
+            "since": self.started,
+            "slow_ms": self.slow_ms,
+            "operations": dict(sorted(operations.items(), key=lambda item: -item[1]["total_ms"])),
+            "statements": dict(sorted(statements.items(), key=lambda item: -item[1]["total_ms"])),
+            "slow_queries": self.slow_count,
+            "slow_samples": samples,
+        }
+
+    def reset(self):
+        with self._lock:
+            self.operations.clear()
+            self.statements.clear()
+            self.slow_samples.clear()
+            self.slow_count = 0
+            self.started = time.time()
+
+    def prometheus(self):
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            groups = (("operation", "operation", dict(self.operations)),
+                      ("statement", "sql", dict(self.statements)))
+            lines = []
+            for kind, label, metrics in groups:
+                base = f"{METRIC_PREFIX}_{kind}"
+                lines += [f"# HELP {base}_duration_milliseconds Wall-clock time per {kind}.",
+                          f"# TYPE {base}_duration_milliseconds histogram"]
+                for key, m in metrics.items():
+                    value = _label_value(key)
+                    cumulative = 0
+                    for bound, count in zip((*LATENCY_BUCKETS_MS, "+Inf"), m.latency.counts):
+                        cumulative += count
+                        lines.append(f'{base}_duration_milliseconds_bucket{{{label}="{value}",le="{bound}"}} {cumulative}')
+                    lines.append(f'{base}_duration_milliseconds_sum{{{label}="{value}"}} {m.latency.sum:.3f}')
+                    lines.append(f'{base}_duration_milliseconds_count{{{label}="{value}"}} {m.latency.count}')
+                for name, help_text, attribute in (("errors", "Calls that raised", "errors"),
+                                                   ("rows", "Rows returned or changed", "rows"),
+                                                   ("vm_steps", "SQLite VM instructions (sampled)", "steps"),
+                                                   ("sqlite_statements", "Statements SQLite started", "statements")):
+                    lines += [f"# HELP {base}_{name}_total {help_text} per {kind}.",
+                              f"# TYPE {base}_{name}_total counter"]
+                    for key, m in metrics.items():
+                        lines.append(f'{base}_{name}_total{{{label}="{_label_value(key)}"}} {getattr(m, attribute)}')
+            lines += [f"# HELP {METRIC_PREFIX}_slow_queries_total Statements that took {self.slow_ms} ms or more.",
+                      f"# TYPE {METRIC_PREFIX}_slow_queries_total counter",
+                      f"{METRIC_PREFIX}_slow_queries_total {self.slow_count}"]
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Writes prometheus() to path via a temporary file and rename, so readers never see half a file."""
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as handle:
+            handle.write(self.prometheus())
+        os.replace(temporary, path)
+        return path
+
+
+def _label_value(text):
+    return text.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """A cursor that reports each statement it runs to its connection's Instrumentation."""
+
+    _running = None
+
+    def _start(self, sql, params):
+        self._end()
+        instrumentation = getattr(self.connection, "instrumentation", None)
+        if instrumentation is not None:
+            self._running = instrumentation._begin(self.connection, sql, params)
+
+    def _end(self, failed=False):
+        running = self._running
+        if running is not None:
+            self._running = None
+            self.connection.instrumentation._finish(running, failed)
+
+    def _ran(self, failed=False):
+        running = self._running
+        if running is None:
+            return
+        running.last = time.perf_counter()
+        if failed:
+            self._end(failed=True)
+        elif self.description is None:  # a write or DDL: done once executed
+            running.rows = max(self.rowcount, 0)
+            self._end()
+
+    def execute(self, sql, parameters=()):
+        self._start(sql, parameters)
+        try:
+            super().execute(sql, parameters)
+        except BaseException:
+            self._ran(failed=True)
+            raise
+        self._ran()
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._start(sql, None)
+        try:
+            super().executemany(sql, seq_of_parameters)
+        except BaseException:
+            self._ran(failed=True)
+            raise
+        self._ran()
+        return self
+
+    def _fetched(self, count, done):
+        running = self._running
+        if running is not None:
+            running.rows += count
+            running.last = time.perf_counter()
+            if done:
+                self._end()
+
+    def fetchone(self):
+        row = super().fetchone()
+        self._fetched(row is not None, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(len(rows), not rows)
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        self._fetched(len(rows), True)
+        return rows
+
+    def __next__(self):
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(0, True)
+            raise
+        self._fetched(1, False)
+        return row
+
+    def close(self):
+        self._end()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._end()
+        except Exception:
+            pass  # the connection may already be closed
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """A connection whose statements and commits are timed by `instrumentation` (see attach())."""
+
+    instrumentation = None
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        if self.instrumentation is None or not self.in_transaction:
+            return super().commit()
+        running = self.instrumentation._begin(self, "COMMIT", None)
+        try:
+            super().commit()
+        except BaseException:
+            running.last = time.perf_counter()
+            self.instrumentation._finish(running, failed=True)
+            raise
+        running.last = time.perf_counter()
+        self.instrumentation._finish(running)
@@ -0,0 +1,392 @@
+import argparse
+import json
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+from connection import DB_PATH, connect
+from models import Itinerary, TimedFlight
+from schema import migrate
+from timezones import format_utc, parse_utc
+
+# Multi-leg itinerary search over the flight schedule.
+#
+# A Timetable holds every non-cancelled flight with known UTC times as
+# "connections" (origin, destination, departure, arrival, FlightID) in plain
+# arrays, one set of arrays per UTC departure day, each sorted by departure.
+# Walking the days in order walks every connection in departure order, which is
+# all the connection-scan algorithm (CSA) needs: one pass from the requested
+# departure time, relaxing the earliest arrival at each airport, stopping once
+# no later departure can improve the answer. No graph is built and nothing is
+# allocated per connection during a search.
+#
+# A passenger arriving at an airport can only board flights departing at least
+# its minimum connection time later (MIN_CONNECTION_MINUTES, overridable per
+# Timetable); the first flight of a journey can leave at the requested time.
+#
+# refresh() keeps the snapshot current incrementally: the ScheduleDay table
+# (schema.py) carries a trigger-maintained version per departure day, and only
+# days whose version changed are re-read, each with one range scan of
+# idx_flight_departure_utc. Searches run without a lock on the day arrays they
+# started with; refresh() swaps in new ones.
+
+DEFAULT_MIN_CONNECTION_MINUTES = 45
+DEFAULT_MAX_LEGS = 4
+DEFAULT_HORIZON_HOURS = 72  # search window when no arrive-by time is given
+DAY_SECONDS = 86400
+
+# Minimum connection times at the larger base airports; others use the default.
+MIN_CONNECTION_MINUTES = {
+    'LHR': 90,
+    'LGW': 60,
+    'JFK': 90,
+    'CDG': 75,
+    'AMS': 50,
+    'DXB': 75,
+    'FRA': 60,
+    'HKG': 60,
+    'NRT': 75,
+    'SIN': 60,
+}
+
+SCHEDULE_DAYS_SQL = "SELECT Day, Version FROM ScheduleDay"
+
+DAY_CONNECTIONS_SQL = """
+    SELECT DepartureAirport, ArrivalAirport, DepartureUTC, ArrivalUTC, FlightID
+    FROM Flight
+    WHERE DepartureUTC >= ? AND DepartureUTC < ?
+      AND ArrivalUTC > DepartureUTC AND FlightStatus <> 'Cancelled'
+    ORDER BY DepartureUTC, FlightID
+"""
+
+LEGS_SQL = """
+    SELECT FlightID, FlightNumber, PilotID, DepartureAirport, ArrivalAirport,
+           DepartureUTC, ArrivalUTC, FlightStatus
+    FROM Flight
+    WHERE FlightID IN (SELECT value FROM json_each(?))
+"""
+
+_NEVER = float("inf")
+
+
+class _Day:
+    """The connections departing on one UTC day, sorted by departure."""
+    __slots__ = ("day", "version", "origins", "destinations", "departures", "arrivals", "flight_ids")
+
+    def __init__(self, day, version):
+        self.day = day
+        self.version = version
+        self.origins = array("i")
+        self.destinations = array("i")
+        self.departures = array("q")
+        self.arrivals = array("q")
+        self.flight_ids = array("q")
+
+    def __len__(self):
+        return len(self.departures)
+
+
+class Timetable:
+    """An in-memory, incrementally refreshed snapshot of the schedule for itinerary search.
+
+        timetable = Timetable()
+        timetable.refresh(conn)
+        timetable.earliest_arrival(conn, "EDI", "SIN", "2025-03-02 06:00")   # Itinerary or None
+        timetable.options(conn, "EDI", "SIN", "2025-03-02", "2025-03-04")    # fewest legs first
+
+    One Timetable can be shared by threads, each passing its own connection.
+    """
+
+    def __init__(self, min_connection=None, default_min_connection=DEFAULT_MIN_CONNECTION_MINUTES):
+        self.default_min_connection = default_min_connection
+        self.min_connection = {**MIN_CONNECTION_MINUTES, **(min_connection or {})}
+        self.airports = []           # index -> airport code
+        self._index = {}             # airport code -> index
+        self._ready_after = []       # index -> minimum connection time, seconds
+        self._days = {}              # UTC day -> _Day
+        self._order = []             # [_Day, ...] by day, only days with connections
+        self._starts = []            # the UTC day of each entry in _order
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    def set_min_connection(self, code, minutes):
+        """Sets an airport's minimum connection time, for searches started afterwards."""
+        if minutes < 0:
+            raise ValueError("A minimum connection time cannot be negative.")
+        with self._lock:
+            self.min_connection[code] = minutes
+            if code in self._index:
+                self._ready_after[self._index[code]] = minutes * 60
+
+    def _airport(self, code):
+        index = self._index.get(code)
+        if index is None:
+            index = self._index[code] = len(self.airports)
+            self.airports.append(code)
+            self._ready_after.append(self.min_connection.get(code, self.default_min_connection) * 60)
+        return index
+
+    def refresh(self, conn):
+        """Re-reads the departure days whose version changed; returns how many were reloaded.
+
+        Versions and flights are read in one read transaction, so the snapshot is
+        consistent with a single commit.
+        """
+        with self._lock:
+            began = not conn.in_transaction
+            if began:
+                conn.execute("BEGIN")
+            try:
+                versions = dict(conn.execute(SCHEDULE_DAYS_SQL))
+                changed = [day for day, version in versions.items()
+                           if day not in self._days or self._days[day].version != version]
+                for day in changed:
+                    self._days[day] = self._load_day(conn, day, versions[day])
+            finally:
+                if began:
+                    conn.commit()
+            gone = [day for day in self._days if day not in versions]
+            for day in gone:
+                del self._days[day]
+            if changed or gone:
+                order = sorted((d for d in self._days.values() if len(d)), key=lambda d: d.day)
+                self._order, self._starts = order, [d.day for d in order]
+            self.reloads += len(changed)
+            return len(changed)
+
+    def _load_day(self, conn, day, version):
+        loaded = _Day(day, version)
+        rows = conn.execute(DAY_CONNECTIONS_SQL, (day * DAY_SECONDS, (day + 1) * DAY_SECONDS)).fetchall()
+        if rows:
+            origins, destinations, departures, arrivals, flight_ids = zip(*rows)
+            loaded.origins.extend(map(self._airport, origins))
+            loaded.destinations.extend(map(self._airport, destinations))
+            loaded.departures.extend(departures)
+            loaded.arrivals.extend(arrivals)
+            loaded.flight_ids.extend(flight_ids)
+        return loaded
+
+    def stats(self):
+        """Size of the snapshot: days, connections, airports and array bytes."""
+        order = self._order
+        connections = sum(len(d) for d in order)
+        return {
+            "days": len(order),
+            "connections": connections,
+            "airports": len(self.airports),
+            "bytes": connections * (4 + 4 + 8 + 8 + 8),
+            "day_reloads": self.reloads,
+        }
+
+    def _connections(self, order, starts, after):
+        """Yields (day, first index) for every day array from the departure time `after` on."""
+        position = bisect_left(starts, after // DAY_SECONDS)
+        for i in range(position, len(order)):
+            day = order[i]
+            yield day, bisect_left(day.departures, after) if i == position else 0
+
+    def _window(self, origin, destination, depart_after, arrive_by):
+        start = parse_utc(depart_after)
+        end = (parse_utc(arrive_by, end_of_day=True) if arrive_by is not None
+               else start + DEFAULT_HORIZON_HOURS * 3600)
+        if end <= start:
+            raise ValueError("The arrive-by time must be after the departure time.")
+        if origin == destination:
+            raise ValueError("The origin and destination must differ.")
+        return start, end
+
+    def earliest_arrival(self, conn, origin, destination, depart_after, arrive_by=None):
+        """The itinerary reaching destination soonest, with any number of legs, or None.
+
+        depart_after and arrive_by are UTC (see timezones.parse_utc); without
+        arrive_by the search looks DEFAULT_HORIZON_HOURS ahead.
+        """
+        start, end = self._window(origin, destination, depart_after, arrive_by)
+        order, starts, airports = self._order, self._starts, len(self.airports)
+        source, target = self._index.get(origin), self._index.get(destination)
+        if source is None or target is None:
+            return None
+        ready_after = self._ready_after[:airports]
+        arrival = [_NEVER] * airports
+        ready = [_NEVER] * airports
+        via = [None] * airports
+        arrival[source] = ready[source] = start
+        best = end + 1  # an arrival must be <= end
+        for day, first in self._connections(order, starts, start):
+            origins, destinations = day.origins, day.destinations
+            departures, arrivals = day.departures, day.arrivals
+            for i in range(first, len(departures)):
+                departs = departures[i]
+                if departs >= best:
+                    break
+                if ready[origins[i]] > departs:
+                    continue
+                to = destinations[i]
+                arrives = arrivals[i]
+                if arrives < arrival[to] and arrives < best:
+                    arrival[to] = arrives
+                    ready[to] = arrives + ready_after[to]
+                    via[to] = (day, i)
+                    if to == target:
+                        best = arrives
+            else:
+                continue
+            break
+        if via[target] is None:
+            return None
+        path, stop = [], target
+        while stop != source:
+            day, i = via[stop]
+            path.append((day, i))
+            stop = day.origins[i]
+        found = self._itineraries(conn, [path[::-1]])
+        return found[0] if found else None
+
+    def options(self, conn, origin, destination, depart_after, arrive_by=None, max_legs=DEFAULT_MAX_LEGS):
+        """The Pareto-optimal itineraries: fewest legs first, each arriving earlier than the one before.
+
+        The first is the minimum-transfer itinerary and the last the earliest
+        arrival within max_legs flights. One pass, one label per airport per leg count.
+        """
+        if max_legs < 1:
+            raise ValueError("An itinerary needs at least one leg.")
+        start, end = self._window(origin, destination, depart_after, arrive_by)
+        order, starts, airports = self._order, self._starts, len(self.airports)
+        source, target = self._index.get(origin), self._index.get(destination)
+        if source is None or target is None:
+            return []
+        ready_after = self._ready_after[:airports]
+        # Per leg count k: arrival with exactly k legs, and best with at most k (for pruning).
+        arrival = [[_NEVER] * airports for _ in range(max_legs + 1)]
+        best = [[_NEVER] * airports for _ in range(max_legs + 1)]
+        ready = [[_NEVER] * airports for _ in range(max_legs + 1)]
+        via = [[None] * airports for _ in range(max_legs + 1)]
+        for k in range(max_legs + 1):
+            best[k][source] = start
+        arrival[0][source] = ready[0][source] = start
+        legs = range(1, max_legs + 1)
+        stop = end + 1  # a later departure cannot improve on the direct flight found
+        for day, first in self._connections(order, starts, start):
+            origins, destinations = day.origins, day.destinations
+            departures, arrivals = day.departures, day.arrivals
+            for i in range(first, len(departures)):
+                departs = departures[i]
+                if departs >= stop:
+                    break
+                frm = origins[i]
+                to = destinations[i]
+                arrives = arrivals[i]
+                if arrives > end:
+                    continue
+                for k in legs:
+                    if ready[k - 1][frm] > departs or arrives >= best[k][to]:
+                        continue
+                    arrival[k][to] = arrives
+                    ready[k][to] = arrives + ready_after[to]
+                    via[k][to] = (day, i)
+                    for j in range(k, max_legs + 1):
+                        if arrives < best[j][to]:
+                            best[j][to] = arrives
+                    if to == target and k == 1:
+                        stop = arrives
+            else:
+                continue
+            break
+        found, previous = [], _NEVER
+        for k in legs:
+            if arrival[k][target] < previous:
+                previous = arrival[k][target]
+                found.append(self._path(via, k, target))
+        return self._itineraries(conn, found)
+
+    def fewest_transfers(self, conn, origin, destination, depart_after, arrive_by=None,
+                         max_legs=DEFAULT_MAX_LEGS):
+        """The itinerary with the fewest legs (earliest arrival among those), or None."""
+        found = self.options(conn, origin, destination, depart_after, arrive_by, max_legs)
+        return found[0] if found else None
+
+    def _path(self, via, k, target):
+        """The (day, index) connections of the k-leg label at target, in travel order."""
+        path, stop = [], target
+        while k:
+            day, i = via[k][stop]
+            path.append((day, i))
+            stop = day.origins[i]
+            k -= 1
+        return path[::-1]
+
+    def _itineraries(self, conn, paths):
+        """Itinerary rows for connection paths, with legs read back from Flight."""
+        ids = [day.flight_ids[i] for path in paths for day, i in path]
+        flights = {row[0]: TimedFlight(*row) for row in conn.execute(LEGS_SQL, (json.dumps(ids),))} if ids else {}
+        itineraries = []
+        for path in paths:
+            legs = [flights.get(day.flight_ids[i]) for day, i in path]
+            if None in legs:  # deleted since the last refresh; the next refresh drops it
+                continue
+            first, last = path[0], path[-1]
+            itineraries.append(Itinerary(
+                self.airports[first[0].origins[first[1]]], self.airports[last[0].destinations[last[1]]],
+                first[0].departures[first[1]], last[0].arrivals[last[1]], legs))
+        return itineraries
+
+
+def describe(itinerary):
+    """A one-line-per-leg text rendering of an itinerary (times in UTC)."""
+    lines = [f"{itinerary.origin} → {itinerary.destination}: {itinerary.transfers} transfer(s), "
+             f"departs {format_utc(itinerary.departure_utc)}, arrives {format_utc(itinerary.arrival_utc)} UTC "
+             f"({itinerary.minutes // 60}h{itinerary.minutes % 60:02d})"]
+    for leg in itinerary.legs:
+        lines.append(f"    {leg.flight_number:<8} {leg.departure_airport:>4} {format_utc(leg.departure_utc)}"
+                     f"  →  {leg.arrival_airport:>4} {format_utc(leg.arrival_utc)}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find connecting-flight itineraries between two airports.")
+    parser.add_argument("origin")
+    parser.add_argument("destination")
+    parser.add_argument("depart_after", metavar="DEPART_AFTER", help="UTC, YYYY-MM-DD or 'YYYY-MM-DD HH:MM'")
+    parser.add_argument("--arrive-by", help="UTC, YYYY-MM-DD (the whole day) or 'YYYY-MM-DD HH:MM'")
+    parser.add_argument("--max-legs", type=int, default=DEFAULT_MAX_LEGS)
+    parser.add_argument("--min-connection", type=int, metavar="MINUTES",
+                        help="minimum connection time at every airport (default: per airport)")
+    parser.add_argument("--db", default=DB_PATH, help="SQLite database file")
+    args = parser.parse_args(argv)
+
+    conn = connect(args.db)
+    migrate(conn)
+    if args.min_connection is None:
+        timetable = Timetable()
+    else:
+        timetable = Timetable(min_connection={code: args.min_connection for code in MIN_CONNECTION_MINUTES},
+                              default_min_connection=args.min_connection)
+    start = time.perf_counter()
+    timetable.refresh(conn)
+    loaded = time.perf_counter()
+    try:
+        options = timetable.options(conn, args.origin, args.destination, args.depart_after,
+                                    args.arrive_by, args.max_legs)
+        fastest = timetable.earliest_arrival(conn, args.origin, args.destination, args.depart_after, args.arrive_by)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 2
+    searched = time.perf_counter()
+    stats = timetable.stats()
+    print(f"Loaded {stats['connections']} flights over {stats['days']} days in {loaded - start:.2f}s; "
+          f"searched in {(searched - loaded) * 1000:.1f} ms.\n")
+    if not options and fastest is None:
+        print("No itinerary found.")
+        return 1
+    for itinerary in options:
+        print(describe(itinerary) + "\n")
+    if fastest is not None and (not options or fastest.arrival_utc < options[-1].arrival_utc):
+        print("Earliest arrival (more legs):")
+        print(describe(fastest))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
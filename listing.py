@@ -0,0 +1,107 @@
+# Streaming and keyset-paginated flight listings (Q2 and Q8).
+#
+# Rows are ordered by (DepartureDate, DepartureTime, FlightID) and a page is
+# fetched by seeking past the key of the previous page's last row, so page N
+# costs the same as page 1 (no OFFSET scan). Both listings use the same
+# column layout, FLIGHT_LISTING_COLUMNS.
+#
+# With joins=False the queries read Flight alone and return its own columns
+# (FLIGHT_ROW_COLUMNS); FlightAPI uses that form and resolves cities and pilot
+# names from its DimensionCache (cache.py).
+
+FLIGHT_LISTING_COLUMNS = (
+    "FlightID", "FlightNumber", "PilotID", "Pilot", "Departure", "Arrival",
+    "DepartureDate", "DepartureTime", "ArrivalDate", "ArrivalTime", "FlightStatus",
+)
+
+FLIGHT_LISTING_SQL = """
+    SELECT
+        f.FlightID,
+        f.FlightNumber,
+        f.PilotID,
+        IFNULL(p.FirstName || ' ' || p.LastName, 'Unassigned') AS Pilot,
+        o.City AS Departure,
+        d.City AS Arrival,
+        f.DepartureDate,
+        f.DepartureTime,
+        f.ArrivalDate,
+        f.ArrivalTime,
+        f.FlightStatus
+    FROM Flight f
+    LEFT JOIN Pilot p ON f.PilotID = p.PilotID
+    JOIN Airport o ON f.DepartureAirport = o.AirportCode
+    JOIN Airport d ON f.ArrivalAirport = d.AirportCode
+"""
+
+FLIGHT_ROW_COLUMNS = (
+    "FlightID", "FlightNumber", "PilotID", "DepartureAirport", "ArrivalAirport",
+    "DepartureDate", "DepartureTime", "ArrivalDate", "ArrivalTime", "FlightStatus",
+)
+
+FLIGHT_ROWS_SQL = "SELECT " + ", ".join(f"f.{column}" for column in FLIGHT_ROW_COLUMNS) + " FROM Flight f"
+
+_FORWARD = " ORDER BY f.DepartureDate, f.DepartureTime, f.FlightID"
+_BACKWARD = " ORDER BY f.DepartureDate DESC, f.DepartureTime DESC, f.FlightID DESC"
+_AFTER = "(f.DepartureDate, f.DepartureTime, f.FlightID) > (?, ?, ?)"
+_BEFORE = "(f.DepartureDate, f.DepartureTime, f.FlightID) < (?, ?, ?)"
+
+DEFAULT_PAGE_SIZE = 50
+DEFAULT_BATCH_SIZE = 500
+
+
+def listing_sql(status=False, after=False, before=False, joins=True):
+    """Builds the listing query; each flag adds its WHERE condition and placeholders."""
+    conditions = []
+    if status:
+        conditions.append("f.FlightStatus = ?")
+    if after:
+        conditions.append(_AFTER)
+    if before:
+        conditions.append(_BEFORE)
+    sql = FLIGHT_LISTING_SQL if joins else FLIGHT_ROWS_SQL
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    return sql + (_BACKWARD if before else _FORWARD)
+
+
+def page_key(row):
+    """The keyset position of a listing row: (DepartureDate, DepartureTime, FlightID)."""
+    return (row[6], row[7], row[0])
+
+
+def iter_rows(cursor, batch_size=DEFAULT_BATCH_SIZE):
+    """Yields rows from an executed cursor lazily, batch_size rows per fetch."""
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield from rows
+
+
+def iter_flights(conn, status=None, batch_size=DEFAULT_BATCH_SIZE, joins=True):
+    """Yields every flight (optionally only one status) in departure order without loading them all."""
+    params = (status,) if status is not None else ()
+    cursor = conn.execute(listing_sql(status=status is not None, joins=joins), params)
+    return iter_rows(cursor, batch_size)
+
+
+def flight_page(conn, status=None, after=None, before=None, page_size=DEFAULT_PAGE_SIZE, joins=True):
+    """Returns one page of flights in departure order.
+
+    after  - key of the last row of the previous page (page_key); None for page 1
+    before - key of the first row of the following page, to step backwards
+    """
+    if after and before:
+        raise ValueError("Pass either after or before, not both.")
+    params = []
+    if status is not None:
+        params.append(status)
+    if after:
+        params.extend(after)
+    if before:
+        params.extend(before)
+    sql = listing_sql(status=status is not None, after=bool(after), before=bool(before), joins=joins) + " LIMIT ?"
+    rows = conn.execute(sql, (*params, page_size)).fetchall()
+    if before:
+        rows.reverse()
+    return rows
@@ -0,0 +1,210 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmark import report_metadata, write_report
+from server import DEFAULT_PORT
+
+# Load generator for server.py. Each of --concurrency clients keeps one HTTP/1.1
+# keep-alive connection and sends requests back to back for --seconds, drawing
+# from a weighted mix of read endpoints plus a share of status updates. Reports
+# p50/p99 latency per endpoint and overall requests/second.
+
+READ_MIX = [
+    # (name, weight)
+    ("flights first page", 2),
+    ("flights next page", 2),
+    ("flight by id", 3),
+    ("pilot schedule", 1),
+    ("airport by code", 1),
+    ("destination report", 1),
+]
+
+
+class Client:
+    """A minimal keep-alive HTTP/1.1 client for JSON requests."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self._reader = self._writer = None
+
+    async def request(self, method, path, body=None):
+        """Sends one request; returns (status, decoded JSON body)."""
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        data = json.dumps(body).encode() if body is not None else b""
+        self._writer.write(f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                           f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+        await self._writer.drain()
+        status = int((await self._reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self._reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+        return status, json.loads(await self._reader.readexactly(length)) if length else None
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            await self._writer.wait_closed()
+
+
+async def _sample_targets(client):
+    """Collects flight IDs, page cursors, pilot IDs and airport codes to request."""
+    status, page = await client.request("GET", "/flights?page_size=1000")
+    if status != 200 or not page["flights"]:
+        raise SystemExit("The server returned no flights to test against.")
+    flights = page["flights"]
+    cursors = [",".join(str(f[key]) for key in ("departure_date", "departure_time", "flight_id")) for f in flights]
+    airports = set()
+    for flight in flights[:20]:
+        _, row = await client.request("GET", f"/flights/{flight['flight_id']}")
+        airports.update((row["departure_airport"], row["arrival_airport"]))
+    return {
+        "flight_ids": [f["flight_id"] for f in flights],
+        "cursors": cursors,
+        "pilot_ids": sorted({f["pilot_id"] for f in flights if f["pilot_id"] is not None}),
+        "airports": sorted(airports),
+    }
+
+
+def _request_for(name, targets, rng):
+    if name == "flights first page":
+        return "GET", "/flights?page_size=50", None
+    if name == "flights next page":
+        return "GET", f"/flights?page_size=50&after={rng.choice(targets['cursors'])}", None
+    if name == "flight by id":
+        return "GET", f"/flights/{rng.choice(targets['flight_ids'])}", None
+    if name == "pilot schedule":
+        return "GET", f"/pilots/{rng.choice(targets['pilot_ids'])}/schedule", None
+    if name == "airport by code":
+        return "GET", f"/airports/{rng.choice(targets['airports'])}", None
+    if name == "destination report":
+        return "GET", "/reports/destinations", None
+    if name == "status update":
+        status = rng.choice(("Scheduled", "Delayed"))
+        return "PUT", f"/flights/{rng.choice(targets['flight_ids'])}/status", {"status": status}
+    raise ValueError(name)
+
+
+async def _worker(host, port, targets, seconds, write_ratio, seed, samples):
+    rng = random.Random(seed)
+    names = [name for name, _ in READ_MIX]
+    weights = [weight for _, weight in READ_MIX]
+    client = Client(host, port)
+    deadline = time.perf_counter() + seconds
+    try:
+        while time.perf_counter() < deadline:
+            name = "status update" if rng.random() < write_ratio else rng.choices(names, weights)[0]
+            method, path, body = _request_for(name, targets, rng)
+            start = time.perf_counter()
+            status, _ = await client.request(method, path, body)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            samples.append((name, elapsed_ms, status))
+    finally:
+        await client.close()
+
+
+def _summary(latencies):
+    if len(latencies) < 2:
+        value = round(latencies[0], 3) if latencies else None
+        return {"requests": len(latencies), "p50_ms": value, "p99_ms": value, "mean_ms": value}
+    cuts = statistics.quantiles(latencies, n=100)
+    return {
+        "requests": len(latencies),
+        "p50_ms": round(cuts[49], 3),
+        "p99_ms": round(cuts[98], 3),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+    }
+
+
+async def run_load(host="127.0.0.1", port=DEFAULT_PORT, seconds=10.0, concurrency=16, write_ratio=0.1, seed=42):
+    """Runs the load test and returns overall and per-endpoint latency statistics."""
+    setup = Client(host, port)
+    targets = await _sample_targets(setup)
+    await setup.close()
+
+    samples = []
+    start = time.perf_counter()
+    await asyncio.gather(*(_worker(host, port, targets, seconds, write_ratio, seed + i, samples)
+                           for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    results = {
+        "overall": _summary([ms for _, ms, _ in samples]),
+        "requests_per_s": round(len(samples) / elapsed, 1),
+        "errors": sum(1 for _, _, status in samples if status >= 500),
+        "rejected": sum(1 for _, _, status in samples if 400 <= status < 500),
+        "endpoints": {},
+    }
+    for name in sorted({name for name, _, _ in samples}):
+        results["endpoints"][name] = _summary([ms for n, ms, _ in samples if n == name])
+    return results
+
+
+def _wait_for_port(host, port, timeout=15.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise SystemExit(f"Server did not start listening on {host}:{port}.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the flight HTTP server on localhost.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=16, help="simultaneous keep-alive clients")
+    parser.add_argument("--write-ratio", type=float, default=0.1, help="share of requests that update a status")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--spawn", metavar="DB", help="start server.py on this database for the test")
+    parser.add_argument("--readers", type=int, default=4, help="reader threads for --spawn")
+    parser.add_argument("--output", help="write a JSON report to this file")
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.spawn:
+        server = subprocess.Popen([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "server.py"), "--db", args.spawn, "--host", args.host,
+                                   "--port", str(args.port), "--readers", str(args.readers)],
+                                  stdout=subprocess.DEVNULL)
+        _wait_for_port(args.host, args.port)
+    try:
+        results = asyncio.run(run_load(args.host, args.port, args.seconds, args.concurrency,
+                                       args.write_ratio, args.seed))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    overall = results["overall"]
+    print(f"{results['requests_per_s']:.1f} requests/s over {overall['requests']} requests "
+          f"({results['errors']} errors, {results['rejected']} rejected)")
+    print(f"{'Endpoint':<20} | {'Requests':>8} | {'p50 ms':>8} | {'p99 ms':>8}")
+    print("-" * 55)
+    for name, stats in [("overall", overall)] + sorted(results["endpoints"].items()):
+        print(f"{name:<20} | {stats['requests']:>8} | {stats['p50_ms']:>8.3f} | {stats['p99_ms']:>8.3f}")
+    if args.output:
+        meta = report_metadata(seconds=args.seconds, concurrency=args.concurrency, write_ratio=args.write_ratio,
+                               readers=args.readers if args.spawn else None)
+        write_report(args.output, "loadtest", meta, results)
+    return 1 if results["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,8 @@
+from instrumentation import Instrumentation
 from services import FlightService
 
 def main():
-    service = FlightService()
+    service = FlightService(instrumentation=Instrumentation())
 
     while True:
         print("\n╔═════════════════════════════════════════════╗")
@@ -23,10 +24,18 @@ def main():
         print(" 10. Delete Flight")
         print(" 11. Flights Assigned per Pilot")
         print(" 12. Flight Count by Destination")
+        print(" 13. Bulk Update Flight Status")
+        print(" 14. Pilot Double-Booking Report")
+        print(" 15. Block-Time Report")
+        print(" 16. All-Time Flight Counts (incl. archive)")
+        print(" 17. Find an Itinerary")
+        print(" 18. Query Statistics")
+        print(" 19. Auto-Roster Pilots")
+        print(" 20. Search Airports and Pilots")
         print("  0. Exit System")
         print("=" * 47)
 
-        choice = input("\nEnter your choice (0-12): ").strip()
+        choice = input("\nEnter your choice (0-20): ").strip()
 
         if choice == '1':
             service.add_new_flight()
@@ -88,12 +97,52 @@ def main():
             print("\nAction completed.")
             
 
+        elif choice == '13':
+            service.bulk_update_flight_status()
+            print("\nAction completed.")
+            print("=" * 20)
+
+        elif choice == '14':
+            service.view_pilot_conflicts()
+            print("\nAction completed.")
+            print("=" * 20)
+
+        elif choice == '15':
+            service.view_block_times()
+            print("\nAction completed.")
+            print("=" * 20)
+
+        elif choice == '16':
+            service.view_flight_history()
+            print("\nAction completed.")
+            print("=" * 20)
+
+        elif choice == '17':
+            service.find_itinerary()
+            print("\nAction completed.")
+            print("=" * 20)
+
+        elif choice == '18':
+            service.view_query_stats()
+            print("\nAction completed.")
+            print("=" * 20)
+
+        elif choice == '19':
+            service.auto_roster_flights()
+            print("\nAction completed.")
+            print("=" * 20)
+
+        elif choice == '20':
+            service.search_directory()
+            print("\nAction completed.")
+            print("=" * 20)
+
         elif choice == '0':
             print("\nThank you for using the Flight Management System.")
             break
 
         else:
-            print("\nInvalid choice. Please enter a number between 0 and 12.")
+            print("\nInvalid choice. Please enter a number between 0 and 20.")
 
         # Prompt to continue or exit
         again = input("\nReturn to menu? (yes/no): ").strip().lower()
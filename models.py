@@ -0,0 +1,252 @@
+FLIGHT_STATUSES = ('Scheduled', 'Departed', 'Delayed', 'Cancelled', 'Completed')
+
+# Status changes allowed by the bulk operations: new status -> statuses it may replace.
+# Completed and Cancelled are final; a Delayed flight can be re-timed back to Scheduled.
+STATUS_TRANSITIONS = {
+    'Scheduled': ('Delayed',),
+    'Delayed': ('Scheduled',),
+    'Departed': ('Scheduled', 'Delayed'),
+    'Completed': ('Departed',),
+    'Cancelled': ('Scheduled', 'Delayed'),
+}
+
+
+class Row:
+    """Base for the lightweight, __slots__-based row objects returned by FlightAPI.
+
+    Fields are given positionally in __slots__ order, so a row object can be built
+    straight from a cursor tuple: Flight(*row).
+    """
+    __slots__ = ()
+
+    def __init__(self, *values):
+        if len(values) != len(self.__slots__):
+            raise TypeError(f"{type(self).__name__} takes {len(self.__slots__)} values, got {len(values)}")
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    def __iter__(self):
+        return (getattr(self, name) for name in self.__slots__)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and tuple(self) == tuple(other)
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class Flight(Row):
+    """A row of the Flight table."""
+    __slots__ = ("flight_id", "flight_number", "pilot_id", "departure_airport", "arrival_airport",
+                 "departure_date", "departure_time", "arrival_date", "arrival_time", "status")
+    flight_id: int
+    flight_number: str
+    pilot_id: int | None
+    departure_airport: str
+    arrival_airport: str
+    departure_date: str
+    departure_time: str
+    arrival_date: str
+    arrival_time: str
+    status: str
+
+
+class FlightListing(Row):
+    """A flight with pilot name and cities resolved, as shown by the Q2/Q8 listings."""
+    __slots__ = ("flight_id", "flight_number", "pilot_id", "pilot", "departure_city", "arrival_city",
+                 "departure_date", "departure_time", "arrival_date", "arrival_time", "status")
+    flight_id: int
+    flight_number: str
+    pilot_id: int | None
+    pilot: str
+    departure_city: str
+    arrival_city: str
+    departure_date: str
+    departure_time: str
+    arrival_date: str
+    arrival_time: str
+    status: str
+
+    @property
+    def key(self):
+        """Keyset position for FlightAPI.flight_page(after=... / before=...)."""
+        return (self.departure_date, self.departure_time, self.flight_id)
+
+
+class ScheduleEntry(Row):
+    """One flight of a pilot's schedule (Q6)."""
+    __slots__ = ("flight_id", "flight_number", "departure_date", "departure_time", "arrival_date",
+                 "arrival_time", "departure_city", "arrival_city", "status")
+    flight_id: int
+    flight_number: str
+    departure_date: str
+    departure_time: str
+    arrival_date: str
+    arrival_time: str
+    departure_city: str
+    arrival_city: str
+    status: str
+
+
+class Pilot(Row):
+    """A row of the Pilot table."""
+    __slots__ = ("pilot_id", "first_name", "last_name", "email", "phone_number")
+    pilot_id: int
+    first_name: str
+    last_name: str
+    email: str | None
+    phone_number: str | None
+
+    @property
+    def name(self):
+        return f"{self.first_name} {self.last_name}"
+
+
+class Airport(Row):
+    """A row of the Airport table; time_zone is an IANA name such as 'Europe/London'."""
+    __slots__ = ("code", "name", "city", "country", "time_zone")
+    code: str
+    name: str
+    city: str
+    country: str
+    time_zone: str | None
+
+
+class TimedFlight(Row):
+    """A flight with its departure and arrival as UTC epoch seconds (the time-window queries)."""
+    __slots__ = ("flight_id", "flight_number", "pilot_id", "departure_airport", "arrival_airport",
+                 "departure_utc", "arrival_utc", "status")
+    flight_id: int
+    flight_number: str
+    pilot_id: int | None
+    departure_airport: str
+    arrival_airport: str
+    departure_utc: int | None
+    arrival_utc: int | None
+    status: str
+
+    @property
+    def block_minutes(self):
+        """Minutes from departure to arrival, or None if either time zone is unknown."""
+        if self.departure_utc is None or self.arrival_utc is None:
+            return None
+        return (self.arrival_utc - self.departure_utc) // 60
+
+
+class Itinerary(Row):
+    """A journey of one or more connecting flights; legs are TimedFlight rows in travel order."""
+    __slots__ = ("origin", "destination", "departure_utc", "arrival_utc", "legs")
+    origin: str
+    destination: str
+    departure_utc: int
+    arrival_utc: int
+    legs: list
+
+    @property
+    def transfers(self):
+        return len(self.legs) - 1
+
+    @property
+    def minutes(self):
+        """Minutes from the first departure to the last arrival."""
+        return (self.arrival_utc - self.departure_utc) // 60
+
+
+class ChangeEvent(Row):
+    """One ChangeLog entry: data is the row after the change (None for a delete) and old
+    the row before it (None for an insert), both as dicts."""
+    __slots__ = ("seq", "table", "operation", "key", "data", "old", "changed_at")
+    seq: int
+    table: str
+    operation: str
+    key: int | str | None
+    data: dict | None
+    old: dict | None
+    changed_at: int
+
+    @property
+    def changed(self):
+        """The columns an update changed."""
+        if self.data is None or self.old is None:
+            return []
+        return [column for column, value in self.data.items() if self.old.get(column) != value]
+
+
+class BlockTime(Row):
+    """Block-time statistics, in minutes, for the flights of one route or one pilot."""
+    __slots__ = ("key", "label", "flights", "total_minutes", "min_minutes", "mean_minutes", "max_minutes")
+    key: str | int | None
+    label: str
+    flights: int
+    total_minutes: int
+    min_minutes: int
+    mean_minutes: float
+    max_minutes: int
+
+
+class BlockTimeSpread(Row):
+    """Distribution of block times, in minutes, over the flights of one route (analytics.py)."""
+    __slots__ = ("origin", "destination", "flights", "min_minutes", "p50_minutes", "p90_minutes", "max_minutes",
+                 "mean_minutes")
+    origin: str
+    destination: str
+    flights: int
+    min_minutes: int
+    p50_minutes: int
+    p90_minutes: int
+    max_minutes: int
+    mean_minutes: float
+
+
+class CityCount(Row):
+    """Number of flights arriving in a city (Q9/Q12)."""
+    __slots__ = ("city", "flight_count")
+    city: str
+    flight_count: int
+
+
+class PilotConflict(Row):
+    """Two flights of one pilot that overlap: flight_id arrives after other_flight_id departs.
+
+    arrives and departs are UTC times, 'YYYY-MM-DD HH:MM'.
+    """
+    __slots__ = ("pilot_id", "flight_id", "other_flight_id", "arrives", "departs")
+    pilot_id: int
+    flight_id: int
+    other_flight_id: int
+    arrives: str
+    departs: str
+
+
+class PilotCount(Row):
+    """Number of flights assigned to a pilot (Q11); pilot_id is None for unassigned flights."""
+    __slots__ = ("pilot_id", "pilot", "flight_count")
+    pilot_id: int | None
+    pilot: str
+    flight_count: int
+
+
+class DayStatusMix(Row):
+    """Number of flights in each status departing on one UTC day (analytics.py)."""
+    __slots__ = ("day", "scheduled", "departed", "delayed", "cancelled", "completed")
+    day: str
+    scheduled: int
+    departed: int
+    delayed: int
+    cancelled: int
+    completed: int
+
+
+class RouteOnTime(Row):
+    """Share of a route's flights that were not delayed; cancelled flights are left out of the rate."""
+    __slots__ = ("origin", "destination", "flights", "delayed", "cancelled", "on_time_rate")
+    origin: str
+    destination: str
+    flights: int
+    delayed: int
+    cancelled: int
+    on_time_rate: float
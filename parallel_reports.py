@@ -0,0 +1,163 @@
+import argparse
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from connection import DB_PATH, connect
+from models import CityCount, PilotCount
+from schema import DESTINATION_COUNTS_FROM_FLIGHTS_SQL, PILOT_COUNTS_FROM_FLIGHTS_SQL
+
+# Parallel full-scan aggregation over Flight.
+#
+# The table is split into FlightID ranges (rowid range scans, no index needed)
+# and each range is counted in a worker process holding its own read-only
+# ("reporting", mode=ro) connection. The partial counts are keyed by airport
+# code or PilotID, so merging them is a Counter sum; cities and pilot names are
+# resolved once, after the merge.
+#
+# Menu options 9, 11 and 12 read the trigger-maintained summary tables and do
+# not scan Flight at all. This engine is for the recounts behind them
+# (aggregates.py verify --workers) and for running the same reports on a copy
+# of the data without summaries. Each worker reads its own snapshot, so counts
+# taken while flights are being written may mix before and after a commit.
+
+DEFAULT_WORKERS = 4
+SHARDS_PER_WORKER = 4  # smaller shards even out workers that fall behind
+
+FLIGHT_ID_RANGE_SQL = "SELECT MIN(FlightID), MAX(FlightID) FROM Flight"
+
+PARTIAL_SQL = {
+    "destinations": """
+        SELECT ArrivalAirport, COUNT(*) FROM Flight
+        WHERE FlightID >= ? AND FlightID < ?
+        GROUP BY ArrivalAirport
+    """,
+    "pilots": """
+        SELECT IFNULL(PilotID, 0), COUNT(*) FROM Flight
+        WHERE FlightID >= ? AND FlightID < ?
+        GROUP BY IFNULL(PilotID, 0)
+    """,
+}
+
+AIRPORT_CITIES_SQL = "SELECT AirportCode, City FROM Airport"
+
+PILOT_NAMES_SQL = "SELECT PilotID, FirstName || ' ' || LastName FROM Pilot"
+
+_worker_conn = None
+
+
+def _open_worker(db_path):
+    global _worker_conn
+    _worker_conn = connect(db_path, "reporting")
+
+
+def _count_shard(report, low, high):
+    return _worker_conn.execute(PARTIAL_SQL[report], (low, high)).fetchall()
+
+
+def shard_ranges(conn, shards):
+    """Splits the FlightIDs present into up to `shards` half-open [low, high) ranges."""
+    low, high = conn.execute(FLIGHT_ID_RANGE_SQL).fetchone()
+    if low is None:
+        return []
+    step = max(1, -(-(high - low + 1) // shards))
+    return [(start, min(start + step, high + 1)) for start in range(low, high + 1, step)]
+
+
+class ParallelReports:
+    """Destination and pilot flight counts computed by a pool of worker processes.
+
+        with ParallelReports("FlightManagement.db", workers=4) as reports:
+            reports.destination_counts()   # [CityCount, ...], busiest first
+    """
+
+    def __init__(self, db_path=DB_PATH, workers=DEFAULT_WORKERS):
+        self.db_path = db_path
+        self.workers = workers
+        self.conn = connect(db_path, "reporting")
+        self._pool = ProcessPoolExecutor(workers, initializer=_open_worker, initargs=(db_path,))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._pool.shutdown()
+        self.conn.close()
+
+    def counts(self, report):
+        """Merged partial counts for a PARTIAL_SQL report: airport code or PilotID (0 = unassigned) -> flights."""
+        ranges = shard_ranges(self.conn, self.workers * SHARDS_PER_WORKER)
+        futures = [self._pool.submit(_count_shard, report, low, high) for low, high in ranges]
+        total = Counter()
+        for future in futures:
+            for key, count in future.result():
+                total[key] += count
+        return total
+
+    def destination_counts(self):
+        """Flights per arrival city, busiest first, as CityCount rows (flights to unknown airports are skipped)."""
+        cities = dict(self.conn.execute(AIRPORT_CITIES_SQL))
+        per_city = Counter()
+        for code, count in self.counts("destinations").items():
+            if code in cities:
+                per_city[cities[code]] += count
+        return [CityCount(city, count) for city, count in per_city.most_common()]
+
+    def flights_per_pilot(self):
+        """Flights per pilot, busiest first, as PilotCount rows; unassigned flights have pilot_id None."""
+        names = dict(self.conn.execute(PILOT_NAMES_SQL))
+        return [PilotCount(pilot_id or None, names.get(pilot_id, 'Unassigned'), count)
+                for pilot_id, count in self.counts("pilots").most_common()]
+
+
+def check(reports):
+    """Compares the parallel counts with the single-statement SQL; returns a list of mismatches."""
+    problems = []
+    expected_cities = dict(reports.conn.execute(DESTINATION_COUNTS_FROM_FLIGHTS_SQL))
+    actual_cities = {row.city: row.flight_count for row in reports.destination_counts()}
+    if actual_cities != expected_cities:
+        problems.append(("destinations", expected_cities, actual_cities))
+    expected_pilots = dict(reports.conn.execute(PILOT_COUNTS_FROM_FLIGHTS_SQL))
+    actual_pilots = {row.pilot_id or 0: row.flight_count for row in reports.flights_per_pilot()}
+    if actual_pilots != expected_pilots:
+        problems.append(("pilots", expected_pilots, actual_pilots))
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Flight count reports computed by parallel worker processes.")
+    parser.add_argument("command", choices=("destinations", "pilots", "check"))
+    parser.add_argument("--db", default=DB_PATH, help="SQLite database file")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    args = parser.parse_args(argv)
+
+    with ParallelReports(args.db, args.workers) as reports:
+        start = time.perf_counter()
+        if args.command == "check":
+            problems = check(reports)
+            for report, expected, actual in problems:
+                diff = {key for key in expected.keys() | actual.keys() if expected.get(key) != actual.get(key)}
+                print(f"{report}: {len(diff)} key(s) differ from the single-statement SQL, e.g. {sorted(diff, key=str)[:5]}")
+            if not problems:
+                print(f"Parallel counts match the single-statement SQL ({args.workers} workers, "
+                      f"{time.perf_counter() - start:.2f}s).")
+            return 1 if problems else 0
+        if args.command == "destinations":
+            print(f"{'City':<25} | {'Flight Count':<15}")
+            print("-" * 45)
+            for row in reports.destination_counts():
+                print(f"{row.city:<25} | {row.flight_count:<15}")
+        else:
+            print(f"{'Pilot':<25} | {'Flight Count':<15}")
+            print("-" * 45)
+            for row in reports.flights_per_pilot():
+                print(f"{row.pilot:<25} | {row.flight_count:<15}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+import re
+import sys
+
+import api
+import archive
+import cache
+import itinerary
+import scheduling
+from listing import listing_sql
+from services import FlightService
+
+_KEY = ("2025-10-10", "08:00", 1)
+
+
+def _bulk_status_sql(new_status, **criteria):
+    """The statement FlightAPI.bulk_set_status issues, with its parameters."""
+    where, params = api.flight_filter(**criteria)
+    sources = api.STATUS_TRANSITIONS[new_status]
+    sql = f"UPDATE Flight SET FlightStatus = ? WHERE {where} AND FlightStatus IN ({', '.join('?' for _ in sources)})"
+    return sql, (new_status, *params, *sources)
+
+
+# Every query issued by FlightService, with placeholder parameters for EXPLAIN.
+# Flags:
+#   full_scan   - the query is meant to read every flight (streaming all of Q8)
+#   sorts_group - ORDER BY sorts the grouped result (one row per city/pilot),
+#                 so a temp B-tree there is expected and cheap
+QUERY_PLAN_CHECKS = [
+    # (name, sql, params, full_scan, sorts_group)
+    ("Q2 status, first page", listing_sql(status=True, joins=False) + " LIMIT ?", ("Scheduled", 50), False, False),
+    ("Q2 status, next page", listing_sql(status=True, after=True, joins=False) + " LIMIT ?", ("Scheduled", *_KEY, 50), False, False),
+    ("Q2 status, previous page", listing_sql(status=True, before=True, joins=False) + " LIMIT ?", ("Scheduled", *_KEY, 50), False, False),
+    ("Q3 update status", api.UPDATE_STATUS_SQL, ("Delayed", 1), False, False),
+    ("Q3 update status, many", api.UPDATE_STATUSES_SQL, ("Delayed", "[1, 2, 3]"), False, False),
+    ("Bulk delay by airport",
+     *_bulk_status_sql("Delayed", departure_airport="LHR", departs_from="2025-10-10 06:00",
+                       departs_until="2025-10-10 12:00"), False, False),
+    ("Bulk complete arrived",
+     *_bulk_status_sql("Completed", status="Departed", arrived_before="2025-10-10 12:00"), False, False),
+    ("Q4 assign pilot", api.ASSIGN_PILOT_SQL, (1, 1), False, False),
+    ("Q4 pilot overlap check", scheduling.LATEST_ARRIVAL_SQL, (1, 1, 1760000000), False, False),
+    ("Bulk assign overlap check", scheduling.OTHER_PILOT_FLIGHTS_SQL, (1, "[1, 2]"), False, False),
+    ("Q14 double-booking sweep", scheduling.ALL_PILOT_FLIGHTS_SQL, (), False, False),
+    ("Q5 remove pilot", api.REMOVE_PILOT_SQL, (1,), False, False),
+    ("Q6 pilot lookup", cache.PILOT_BY_ID_SQL, (1,), False, False),
+    ("Airport lookup", cache.AIRPORT_BY_CODE_SQL, ("LHR",), False, False),
+    ("Q6 pilot schedule", api.PILOT_SCHEDULE_SQL, (1,), False, False),
+    ("Q8 details, first page", listing_sql(joins=False) + " LIMIT ?", (50,), False, False),
+    ("Q8 details, next page", listing_sql(after=True, joins=False) + " LIMIT ?", (*_KEY, 50), False, False),
+    ("Q8 details, previous page", listing_sql(before=True, joins=False) + " LIMIT ?", (*_KEY, 50), False, False),
+    ("Q8 details, stream all", listing_sql(joins=False), (), True, False),
+    ("Q10 find flight", api.FIND_FLIGHT_BY_NUMBER_SQL, ("BA101", "2025-10-10"), False, False),
+    ("Q10 delete flight", api.DELETE_FLIGHT_SQL, (1,), False, False),
+    ("Departing between (UTC)", api.DEPARTING_BETWEEN_SQL, (1760000000, 1760086400), False, False),
+    ("Arriving between (UTC)", api.ARRIVING_BETWEEN_SQL, (1760000000, 1760086400), False, False),
+    ("Q15 block times per route", api.BLOCK_TIMES_SQL["route"], (1760000000, 1762592000), False, True),
+    ("Q15 block times per pilot", api.BLOCK_TIMES_SQL["pilot"], (1760000000, 1762592000), False, True),
+    ("Archive batch selection", archive.ARCHIVABLE_FLIGHTS_SQL,
+     (*archive.ARCHIVED_STATUSES, "2025-10-01", archive.DEFAULT_BATCH_SIZE), False, False),
+    ("Itinerary timetable day", itinerary.DAY_CONNECTIONS_SQL, (1760000000, 1760086400), False, False),
+    ("Q11 flights per pilot", api.FLIGHTS_PER_PILOT_SQL, (), False, True),
+    ("Q9/Q12 destination counts", api.FLIGHT_COUNT_BY_DESTINATION_SQL, (), False, True),
+]
+
+# "SCAN Flight", "SCAN f", "SCAN TABLE Flight AS f" (older SQLite) - but not
+# "SCAN f USING COVERING INDEX ...", which only walks an index.
+_TABLE_SCAN = re.compile(r"^SCAN (?:TABLE )?(?:Flight|f)(?: AS f)?$")
+
+
+def explain(conn, sql, params=()):
+    """Returns the EXPLAIN QUERY PLAN detail lines for a statement."""
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+
+def check_query_plans(conn):
+    """Returns a list of (name, problem, plan) for every query whose plan has regressed."""
+    problems = []
+    for name, sql, params, full_scan, sorts_group in QUERY_PLAN_CHECKS:
+        plan = explain(conn, sql, params)
+        if not full_scan and any(_TABLE_SCAN.match(step) for step in plan):
+            problems.append((name, "full table scan of Flight", plan))
+        if not sorts_group and "USE TEMP B-TREE FOR ORDER BY" in plan:
+            problems.append((name, "temp B-tree sort for ORDER BY", plan))
+    return problems
+
+
+def main(db_path=":memory:"):
+    """Checks the query plans against db_path and exits non-zero on any regression."""
+    service = FlightService(db_path)
+    problems = check_query_plans(service.conn)
+    for name, sql, params, _, _ in QUERY_PLAN_CHECKS:
+        print(f"{name:<28} | " + "; ".join(explain(service.conn, sql, params)))
+    if problems:
+        print("\nQuery plan regressions:")
+        for name, problem, plan in problems:
+            print(f"  {name}: {problem}")
+        return 1
+    print("\nAll FlightService query plans use indexes.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(*sys.argv[1:]))
@@ -0,0 +1,305 @@
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+from contextlib import contextmanager
+from itertools import islice
+from operator import attrgetter, itemgetter
+
+from api import FlightAPI
+from connection import DB_PATH, connect
+from listing import FLIGHT_LISTING_COLUMNS, iter_flights
+from schema import migrate
+
+# Table and export output shared by the menu views and the export command.
+#
+# render() takes any iterable of rows (row objects from models.py, or cursor
+# tuples) and writes them in one of FORMATS without building the output as one
+# string and without one write per row: lines are collected in chunks of
+# flush_rows and each chunk is written with a single write() call, so a line-
+# buffered terminal or pipe sees one write per chunk instead of one per row.
+#
+# Fixed-width tables size each column from the heading and the first
+# sample_rows rows (capped at the column's max_width); later rows that are
+# wider are cut to fit, so the rows never have to be held in memory. CSV, TSV
+# and JSON Lines write the raw values (None as an empty field / null) under the
+# column names, streaming straight from the iterable.
+
+FORMATS = ("table", "csv", "tsv", "jsonl")
+DEFAULT_SAMPLE_ROWS = 200
+DEFAULT_FLUSH_ROWS = 1000
+DEFAULT_MAX_WIDTH = 40
+OUTPUT_BUFFER_SIZE = 1 << 16
+
+_EXTENSIONS = {".csv": "csv", ".tsv": "tsv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".txt": "table"}
+
+
+class Column:
+    """One output column.
+
+    key       - attribute name (row objects), index (cursor tuples) or callable(row)
+    name      - field name in CSV/TSV/JSON Lines; defaults to key when it is a string
+    align     - '<' or '>' in tables
+    format    - callable(value) -> str for tables (default str); exports write the raw value
+    width     - fixed table width instead of sizing from the sample
+    """
+    __slots__ = ("heading", "key", "name", "align", "format", "width", "max_width")
+
+    def __init__(self, heading, key, name=None, align="<", format=str, width=None, max_width=DEFAULT_MAX_WIDTH):
+        self.heading = heading
+        self.key = key
+        self.name = name or (key if isinstance(key, str) else heading)
+        self.align = align
+        self.format = format
+        self.width = width
+        self.max_width = max_width
+
+
+def _getter(columns):
+    """Returns a function mapping a row to the tuple of its column values."""
+    keys = [column.key for column in columns]
+    if all(isinstance(key, int) for key in keys):
+        if len(keys) == 1:
+            index = keys[0]
+            return lambda row: (row[index],)
+        return itemgetter(*keys)
+    if all(isinstance(key, str) for key in keys):
+        if len(keys) == 1:
+            get = attrgetter(keys[0])
+            return lambda row: (get(row),)
+        return attrgetter(*keys)
+    getters = [key if callable(key) else (itemgetter(key) if isinstance(key, int) else attrgetter(key))
+               for key in keys]
+    return lambda row: tuple(get(row) for get in getters)
+
+
+def _chunks(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _table(out, rows, columns, title, sample_rows, flush_rows):
+    values = _getter(columns)
+    custom = [(i, column.format) for i, column in enumerate(columns) if column.format is not str]
+    if custom:
+        def cells(row):
+            row = list(values(row))
+            for i, fmt in custom:
+                row[i] = fmt(row[i])
+            return tuple(row)
+    else:
+        cells = values  # '%s' applies str() itself
+
+    rows = iter(rows)
+    sample = [cells(row) for row in islice(rows, sample_rows)]
+    if not sample:
+        return 0
+    widths = []
+    for i, column in enumerate(columns):
+        if column.width is not None:
+            widths.append(column.width)
+        else:
+            widest = max(len(str(row[i])) for row in sample)
+            widths.append(max(len(column.heading), min(widest, column.max_width)))
+    # printf-style '%-8.8s' pads and truncates in one step and is faster than str.format.
+    template = " | ".join(f"%{'-' if column.align == '<' else ''}{width}.{width}s"
+                          for column, width in zip(columns, widths)) + "\n"
+    header = template % tuple(column.heading for column in columns)
+    rule = len(header) - 1
+    if title:
+        out.write(f"\n{title}\n")
+    out.write("=" * rule + "\n" + header + "-" * rule + "\n")
+    out.write("".join([template % row for row in sample]))
+    count = len(sample)
+    for chunk in _chunks(rows, flush_rows):
+        out.write("".join([template % cells(row) for row in chunk]))
+        count += len(chunk)
+    out.write("=" * rule + "\n")
+    return count
+
+
+def _delimited(out, rows, columns, flush_rows, **dialect):
+    values = _getter(columns)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, **dialect)
+    writer.writerow([column.name for column in columns])
+    count = 0
+    for chunk in _chunks(rows, flush_rows):
+        writer.writerows(map(values, chunk))
+        out.write(buffer.getvalue())
+        buffer.seek(0)
+        buffer.truncate()
+        count += len(chunk)
+    if not count:
+        out.write(buffer.getvalue())
+    return count
+
+
+def _jsonl(out, rows, columns, flush_rows):
+    values = _getter(columns)
+    names = [column.name for column in columns]
+    encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    count = 0
+    for chunk in _chunks(rows, flush_rows):
+        out.write("".join(encode(dict(zip(names, values(row)))) + "\n" for row in chunk))
+        count += len(chunk)
+    return count
+
+
+def render(rows, columns, fmt="table", out=None, title=None, sample_rows=DEFAULT_SAMPLE_ROWS,
+           flush_rows=DEFAULT_FLUSH_ROWS):
+    """Writes rows to out (default sys.stdout) as a table or an export format; returns the row count.
+
+    An empty table writes nothing (the caller prints its own "no rows" message);
+    the export formats still write their header, if any.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}'; use one of {', '.join(FORMATS)}.")
+    out = sys.stdout if out is None else out
+    if fmt == "table":
+        count = _table(out, rows, columns, title, sample_rows, flush_rows)
+    elif fmt == "csv":
+        count = _delimited(out, rows, columns, flush_rows)
+    elif fmt == "tsv":
+        count = _delimited(out, rows, columns, flush_rows, delimiter="\t", lineterminator="\n")
+    else:
+        count = _jsonl(out, rows, columns, flush_rows)
+    out.flush()
+    return count
+
+
+def format_for(path, default="table"):
+    """Picks the format from a file extension (.csv, .tsv, .jsonl/.ndjson, .txt)."""
+    for extension, fmt in _EXTENSIONS.items():
+        if path.lower().endswith(extension):
+            return fmt
+    return default
+
+
+@contextmanager
+def open_output(path=None):
+    """Yields a text stream for path, or sys.stdout for None or '-'; a file is closed afterwards."""
+    if path in (None, "-"):
+        yield sys.stdout
+        return
+    with open(path, "w", encoding="utf-8", newline="", buffering=OUTPUT_BUFFER_SIZE) as handle:
+        yield handle
+
+
+# Column layouts of the menu views (row objects from models.py).
+FLIGHT_COLUMNS = [
+    Column("FlightID", "flight_id"),
+    Column("Flight", "flight_number"),
+    Column("Pilot", "pilot", max_width=25),
+    Column("From", "departure_city", max_width=20),
+    Column("To", "arrival_city", max_width=20),
+    Column("Depart", "departure_date"),
+    Column("Time", "departure_time"),
+    Column("Arrive", "arrival_date"),
+    Column("Time", "arrival_time"),
+]
+
+FLIGHT_DETAIL_COLUMNS = [
+    Column("FlightID", "flight_id"),
+    Column("Flight", "flight_number"),
+    Column("PilotID", "pilot_id"),
+    Column("Pilot", "pilot", max_width=25),
+    Column("From", "departure_city", max_width=20),
+    Column("To", "arrival_city", max_width=20),
+    Column("Status", "status"),
+]
+
+SCHEDULE_COLUMNS = [
+    Column("FlightID", "flight_id"),
+    Column("Flight", "flight_number"),
+    Column("Depart", "departure_date"),
+    Column("Time", "departure_time"),
+    Column("Arrive", "arrival_date"),
+    Column("Time", "arrival_time"),
+    Column("From", "departure_city", max_width=20),
+    Column("To", "arrival_city", max_width=20),
+    Column("Status", "status"),
+]
+
+CITY_COUNT_COLUMNS = [
+    Column("City", "city"),
+    Column("Flight Count", "flight_count", align=">"),
+]
+
+PILOT_COUNT_COLUMNS = [
+    Column("PilotID", "pilot_id"),
+    Column("Pilot", "pilot"),
+    Column("Flights Assigned", "flight_count", align=">"),
+]
+
+CONFLICT_COLUMNS = [
+    Column("PilotID", "pilot_id"),
+    Column("Flight", "flight_id"),
+    Column("Arrives (UTC)", "arrives"),
+    Column("Clashes", "other_flight_id"),
+    Column("Departs (UTC)", "departs"),
+]
+
+# The joined listing query (listing.FLIGHT_LISTING_SQL) as cursor tuples, for exports
+# that skip building row objects.
+FLIGHT_EXPORT_COLUMNS = [Column(name, index) for index, name in enumerate(FLIGHT_LISTING_COLUMNS)]
+
+
+def export_flights(conn, out, fmt="csv", status=None):
+    """Streams every flight (optionally one status) from the joined listing query; returns the row count."""
+    return render(iter_flights(conn, status, batch_size=DEFAULT_FLUSH_ROWS), FLIGHT_EXPORT_COLUMNS, fmt, out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export flights or a pilot schedule as a table, CSV, TSV or JSON Lines.")
+    parser.add_argument("what", choices=("flights", "schedule", "destinations", "pilots", "conflicts"))
+    parser.add_argument("--status", help="flights: only this status")
+    parser.add_argument("--pilot", type=int, help="schedule: the pilot ID")
+    parser.add_argument("--format", choices=FORMATS,
+                        help="output format (default: from the --output extension, else csv)")
+    parser.add_argument("--output", help="output file (default: stdout)")
+    parser.add_argument("--db", default=DB_PATH, help="SQLite database file")
+    args = parser.parse_args(argv)
+    fmt = args.format or (format_for(args.output, "csv") if args.output else "csv")
+
+    # Bring the schema up to date on a read-write connection first; the
+    # read-only reporting connection below cannot migrate.
+    setup = connect(args.db)
+    migrate(setup)
+    setup.close()
+    conn = connect(args.db, "reporting")
+    flights = FlightAPI(conn)
+    if args.what == "schedule" and args.pilot is None:
+        parser.error("schedule needs --pilot")
+    try:
+        with open_output(args.output) as out:
+            if args.what == "flights":
+                count = export_flights(conn, out, fmt, args.status)
+            elif args.what == "schedule":
+                count = render(flights.pilot_schedule(args.pilot), SCHEDULE_COLUMNS, fmt, out)
+            elif args.what == "destinations":
+                count = render(flights.destination_counts(), CITY_COUNT_COLUMNS, fmt, out)
+            elif args.what == "pilots":
+                count = render(flights.flights_per_pilot(), PILOT_COUNT_COLUMNS, fmt, out)
+            else:
+                count = render(flights.pilot_conflicts(), CONFLICT_COLUMNS, fmt, out)
+    except BrokenPipeError:
+        # The reader (e.g. `head`) went away; point stdout at devnull so the final flush is quiet.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    except OSError as e:
+        print(f"Error writing {args.output}: {e}", file=sys.stderr)
+        return 1
+    if args.output:
+        print(f"{count} row(s) written to {args.output} ({fmt}).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
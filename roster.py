@@ -0,0 +1,261 @@
+import argparse
+import heapq
+import sqlite3
+import sys
+import time
+from collections import defaultdict, deque
+
+from connection import DB_PATH, connect
+from models import TimedFlight
+from schema import migrate
+from timezones import format_utc, parse_utc
+
+# Automatic rostering: gives a pilot to every unassigned Scheduled or Delayed
+# flight departing in a UTC window, in one pass.
+#
+# A pilot may take a flight if they are at its departure airport (where their
+# previous flight arrived), have rested min_rest minutes since that arrival, and
+# can still make their next already-assigned flight: it must depart from where
+# the new flight lands, at least min_rest after it lands. That next flight may
+# lie past the window, so each pilot's first flight after it is read too.
+# Pilots with no flight before the window have no known airport and can start
+# anywhere. Unassigned flights whose departure airport has no known time zone
+# (DepartureUTC NULL) are matched by local date and reported unstaffed.
+#
+# The flights to staff and the pilots' existing flights in the window are swept
+# together in departure order. Pilots wait in heaps ordered by the time they
+# are free, one per (airport they are at, airport their next own flight leaves
+# from), so a flight from A to B looks only at the pilots who could take it and
+# the one who has waited longest comes first: O(log n) per flight instead of a
+# scan of every pilot. A pilot who moves (takes a flight, or departs on one of
+# their own) is not searched for in the heap they leave: their version number
+# goes up and the entry left behind is dropped when it reaches the top (lazy
+# deletion). A pilot's existing flights may already overlap each other
+# (generated or imported data): a pilot is free, and at an airport, only once
+# the flight of theirs that lands last has landed, whichever departed last.
+#
+# The plan is read and written in one IMMEDIATE transaction, so no other
+# writer can assign a pilot in between.
+
+DEFAULT_MIN_REST_MINUTES = 60
+ROSTER_STATUSES = ("Scheduled", "Delayed")
+
+_TIMED_COLUMNS = """
+    FlightID, FlightNumber, PilotID, DepartureAirport, ArrivalAirport,
+    DepartureUTC, ArrivalUTC, FlightStatus
+"""
+
+UNASSIGNED_FLIGHTS_SQL = f"""
+    SELECT {_TIMED_COLUMNS}
+    FROM Flight
+    WHERE DepartureUTC >= ? AND DepartureUTC < ?
+      AND PilotID IS NULL AND FlightStatus IN ({', '.join('?' for _ in ROSTER_STATUSES)})
+    ORDER BY DepartureUTC, FlightID
+"""
+
+ASSIGNED_FLIGHTS_SQL = """
+    SELECT PilotID, DepartureAirport, ArrivalAirport, DepartureUTC, ArrivalUTC
+    FROM Flight
+    WHERE DepartureUTC >= ? AND DepartureUTC < ?
+      AND PilotID IS NOT NULL AND FlightStatus != 'Cancelled'
+    ORDER BY DepartureUTC
+"""
+
+# Unassigned flights with no UTC departure (time zone unknown), by local date.
+UNTIMED_FLIGHTS_SQL = f"""
+    SELECT {_TIMED_COLUMNS}
+    FROM Flight
+    WHERE DepartureUTC IS NULL
+      AND DepartureDate >= date(?, 'unixepoch') AND DepartureDate <= date(? - 1, 'unixepoch')
+      AND PilotID IS NULL AND FlightStatus IN ({', '.join('?' for _ in ROSTER_STATUSES)})
+    ORDER BY DepartureDate, DepartureTime, FlightID
+"""
+
+# Where each pilot's first flight at or after the horizon leaves from, so a
+# pilot given a flight near the end of the window can still make it.
+NEXT_DEPARTURES_SQL = """
+    SELECT PilotID, DepartureAirport, MIN(DepartureUTC)
+    FROM Flight
+    WHERE DepartureUTC >= ? AND PilotID IS NOT NULL AND FlightStatus != 'Cancelled'
+    GROUP BY PilotID
+"""
+
+# Where and when the last to land of each pilot's flights departing before the
+# window lands (SQLite takes the bare columns from the row holding the MAX).
+LAST_POSITIONS_SQL = """
+    SELECT PilotID, ArrivalAirport, MAX(ArrivalUTC)
+    FROM Flight
+    WHERE DepartureUTC < ? AND PilotID IS NOT NULL AND FlightStatus != 'Cancelled'
+    GROUP BY PilotID
+"""
+
+ROSTER_ASSIGN_SQL = "UPDATE Flight SET PilotID = ? WHERE FlightID = ? AND PilotID IS NULL"
+
+
+def _pop_fitting(pool, version, upcoming, departure, arrival, rest):
+    """Pops the longest-waiting pilot in pool who is free by departure and can still make their
+    next flight after landing at arrival; drops stale entries, keeps the rest. Returns the entry or None."""
+    skipped = []
+    found = None
+    while pool and pool[0][0] <= departure:
+        entry = heapq.heappop(pool)
+        pilot_id = entry[1]
+        if entry[2] != version[pilot_id]:
+            continue  # stale: the pilot has moved on
+        if not upcoming[pilot_id] or arrival + rest <= upcoming[pilot_id][0][1]:
+            found = entry
+            break
+        skipped.append(entry)  # their own next flight leaves too soon
+    for entry in skipped:
+        heapq.heappush(pool, entry)
+    return found
+
+
+def plan_roster(conn, start, end, min_rest_minutes=DEFAULT_MIN_REST_MINUTES):
+    """Chooses pilots for the unassigned flights departing in [start, end) (UTC); writes nothing.
+
+    start and end are as timezones.parse_utc takes them (a bare end date
+    includes that day). Returns (assignments, unstaffed): (FlightID, PilotID)
+    pairs in departure order, and the TimedFlights no pilot could take (those
+    with no UTC departure first).
+    """
+    start, end = parse_utc(start), parse_utc(end, end_of_day=True)
+    if end <= start:
+        raise ValueError("The roster window must end after it starts.")
+    if min_rest_minutes < 0:
+        raise ValueError("The minimum rest time cannot be negative.")
+    rest = min_rest_minutes * 60
+    flights = [TimedFlight(*row) for row in conn.execute(UNASSIGNED_FLIGHTS_SQL, (start, end, *ROSTER_STATUSES))]
+    untimed = [TimedFlight(*row) for row in conn.execute(UNTIMED_FLIGHTS_SQL, (start, end, *ROSTER_STATUSES))]
+    if not flights:
+        return [], untimed
+    horizon = max(f.arrival_utc or f.departure_utc for f in flights) + rest + 1
+
+    # Existing flights: each pilot's upcoming ones, and sweep events.
+    upcoming = defaultdict(deque)
+    events = []
+    for pilot_id, origin, destination, departure, arrival in conn.execute(ASSIGNED_FLIGHTS_SQL, (start, horizon)):
+        upcoming[pilot_id].append((origin, departure))
+        events.append((departure, 0, pilot_id, destination, arrival))
+    # Beyond the horizon only where each pilot must be next matters; no sweep event.
+    for pilot_id, origin, departure in conn.execute(NEXT_DEPARTURES_SQL, (horizon,)):
+        upcoming[pilot_id].append((origin, departure))
+    events.extend((f.departure_utc, 1, i) for i, f in enumerate(flights))
+    events.sort()
+
+    # Heaps of (free from, pilot, version), keyed by (where the pilot is, where their
+    # next own flight leaves from). A flight from A to B can only go to a pilot in
+    # (A, None) or (A, B); None as the first part means no known airport yet.
+    pools = defaultdict(list)
+    version = {}
+
+    landing = {}  # pilot -> (free from, airport) after the flight of theirs that lands last
+
+    def place(pilot_id, airport, free_from):
+        if pilot_id in landing and landing[pilot_id][0] > free_from:
+            free_from, airport = landing[pilot_id]  # still flying an earlier, longer flight
+        landing[pilot_id] = (free_from, airport)
+        version[pilot_id] = version.get(pilot_id, -1) + 1
+        bound = upcoming[pilot_id][0][0] if upcoming[pilot_id] else None
+        heapq.heappush(pools[airport, bound], (free_from, pilot_id, version[pilot_id]))
+
+    for pilot_id, airport, arrival in conn.execute(LAST_POSITIONS_SQL, (start,)):
+        place(pilot_id, airport, (arrival or start) + rest)
+    for (pilot_id,) in conn.execute("SELECT PilotID FROM Pilot"):
+        if pilot_id not in version:
+            place(pilot_id, None, start)
+
+    assignments, unstaffed = [], untimed
+    for event in events:
+        if event[1] == 0:  # a pilot leaves on one of their own flights
+            departure, _, pilot_id, destination, arrival = event
+            if pilot_id in version:
+                upcoming[pilot_id].popleft()
+                place(pilot_id, destination, (arrival or departure) + rest)
+            continue
+        flight = flights[event[2]]
+        if flight.arrival_utc is None:  # time zone unknown: cannot tell when the pilot is free again
+            unstaffed.append(flight)
+            continue
+        chosen = None
+        for airport in (flight.departure_airport, None):  # pilots already there first
+            candidates = []
+            for bound in (None, flight.arrival_airport):
+                pool = pools.get((airport, bound))
+                if not pool:
+                    continue
+                entry = _pop_fitting(pool, version, upcoming, flight.departure_utc, flight.arrival_utc, rest)
+                if entry:
+                    candidates.append((entry, pool))
+            if candidates:
+                candidates.sort()
+                chosen = candidates[0][0][1]
+                for entry, pool in candidates[1:]:
+                    heapq.heappush(pool, entry)
+                break
+        if chosen is None:
+            unstaffed.append(flight)
+            continue
+        place(chosen, flight.arrival_airport, flight.arrival_utc + rest)
+        assignments.append((flight.flight_id, chosen))
+    return assignments, unstaffed
+
+
+def auto_roster(conn, start, end, min_rest_minutes=DEFAULT_MIN_REST_MINUTES, dry_run=False, commit=True):
+    """Plans the roster for [start, end) and assigns it; returns a summary dict.
+
+    The summary has the number of flights assigned, the (FlightID, PilotID)
+    assignments, and the unstaffed TimedFlights. With commit (the default) the
+    plan is read and written in one BEGIN IMMEDIATE transaction; pass
+    commit=False to leave the writes in the caller's transaction. dry_run
+    plans without writing.
+    """
+    began = commit and not conn.in_transaction
+    if began:
+        conn.execute("BEGIN IMMEDIATE")
+    try:
+        assignments, unstaffed = plan_roster(conn, start, end, min_rest_minutes)
+        assigned = 0
+        if assignments and not dry_run:
+            assigned = conn.executemany(ROSTER_ASSIGN_SQL, [(pilot, flight) for flight, pilot in assignments]).rowcount
+        if began:
+            conn.commit()
+    except BaseException:
+        if began:
+            conn.rollback()
+        raise
+    return {"assigned": assigned if not dry_run else len(assignments), "assignments": assignments,
+            "unstaffed": unstaffed}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Assign pilots to every unassigned flight in a UTC window.")
+    parser.add_argument("start", help="first departure, UTC: YYYY-MM-DD or YYYY-MM-DD HH:MM")
+    parser.add_argument("end", help="last departure, UTC (a bare date includes that day)")
+    parser.add_argument("--min-rest", type=int, default=DEFAULT_MIN_REST_MINUTES,
+                        help="minutes a pilot rests between landing and the next departure")
+    parser.add_argument("--dry-run", action="store_true", help="plan and report without assigning")
+    parser.add_argument("--db", default=DB_PATH, help="SQLite database file")
+    args = parser.parse_args(argv)
+
+    conn = connect(args.db)
+    migrate(conn)
+    started = time.perf_counter()
+    try:
+        result = auto_roster(conn, args.start, args.end, args.min_rest, args.dry_run)
+    except (ValueError, sqlite3.Error) as e:
+        print(f"Error: {e}")
+        return 1
+    verb = "Would assign" if args.dry_run else "Assigned"
+    print(f"{verb} pilots to {result['assigned']} flight(s) in {time.perf_counter() - started:.2f}s; "
+          f"{len(result['unstaffed'])} left unstaffed.")
+    for flight in result["unstaffed"][:20]:
+        print(f"  {flight.flight_id:<8} {flight.flight_number:<8} {flight.departure_airport}->{flight.arrival_airport}"
+              f"  departs {format_utc(flight.departure_utc) + ' UTC' if flight.departure_utc else 'at an unknown UTC time'}")
+    if len(result["unstaffed"]) > 20:
+        print(f"  ... and {len(result['unstaffed']) - 20} more.")
+    return 0 if not result["unstaffed"] else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
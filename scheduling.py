@@ -0,0 +1,159 @@
+import argparse
+import json
+import sys
+
+from connection import DB_PATH, connect
+from models import PilotConflict
+from schema import migrate
+from timezones import format_utc
+
+# Pilot double-booking checks. A pilot's non-cancelled flights must not overlap in
+# time. Flights are compared by their UTC departure and arrival instants
+# (DepartureUTC/ArrivalUTC), not their local dates and times, which are in
+# different time zones at each end. Both checks walk idx_flight_pilot_departure_utc
+# (PilotID, DepartureUTC): an assignment reads only the pilot's flights departing
+# before the new one lands, and the report is one sweep, not a pairwise
+# comparison. Neither relies on the pilot's existing flights being free of
+# overlaps. A flight with no UTC times (an airport without a time zone) cannot
+# be placed in time and is not checked.
+
+# Of a pilot's flights departing before a given instant, the one that lands last
+# (SQLite takes the bare FlightID from the row holding the MAX).
+LATEST_ARRIVAL_SQL = """
+    SELECT FlightID, MAX(ArrivalUTC)
+    FROM Flight
+    WHERE PilotID = ?
+      AND FlightID != ?
+      AND FlightStatus != 'Cancelled'
+      AND DepartureUTC < ?
+"""
+
+_FLIGHT_TIMES_SQL = "SELECT DepartureUTC, ArrivalUTC, FlightStatus FROM Flight WHERE FlightID = ?"
+
+_PILOT_SWEEP_SQL = """
+    SELECT PilotID, FlightID, DepartureUTC, ArrivalUTC
+    FROM Flight
+    WHERE {where} AND FlightStatus != 'Cancelled' AND DepartureUTC IS NOT NULL AND ArrivalUTC IS NOT NULL
+    ORDER BY PilotID, DepartureUTC
+"""
+ALL_PILOT_FLIGHTS_SQL = _PILOT_SWEEP_SQL.format(where="PilotID IS NOT NULL")
+PILOT_FLIGHTS_SQL = _PILOT_SWEEP_SQL.format(where="PilotID = ?")
+OTHER_PILOT_FLIGHTS_SQL = _PILOT_SWEEP_SQL.format(
+    where="PilotID = ? AND FlightID NOT IN (SELECT value FROM json_each(?))")
+LISTED_FLIGHTS_SQL = _PILOT_SWEEP_SQL.format(where="FlightID IN (SELECT value FROM json_each(?))")
+
+
+class ScheduleConflictError(ValueError):
+    """Raised when an assignment would make a pilot fly two overlapping flights."""
+
+    def __init__(self, message, conflicts):
+        super().__init__(message)
+        self.conflicts = conflicts
+
+
+def _conflict(pilot_id, flight_id, arrival, other_flight_id, departure):
+    return PilotConflict(pilot_id, flight_id, other_flight_id, format_utc(arrival), format_utc(departure))
+
+
+def find_pilot_conflict(conn, pilot_id, flight_id):
+    """Returns the PilotConflict that assigning pilot_id to flight_id would create, or None.
+
+    A flight clashes if it departs before the new one arrives and lands after it
+    departs, so it is enough to check the latest landing among the pilot's flights
+    departing before the new arrival: one index range scan. This holds even if the
+    pilot's existing flights already overlap each other (e.g. generated or imported
+    data; find_conflicts reports those), where the flight departing last need not
+    be the one landing last.
+    """
+    flight = conn.execute(_FLIGHT_TIMES_SQL, (flight_id,)).fetchone()
+    if flight is None or flight[2] == 'Cancelled' or flight[0] is None or flight[1] is None:
+        return None
+    departure, arrival = flight[0], flight[1]
+    previous = conn.execute(LATEST_ARRIVAL_SQL, (pilot_id, flight_id, arrival)).fetchone()
+    if previous and previous[1] is not None and previous[1] > departure:
+        return _conflict(pilot_id, previous[0], previous[1], flight_id, departure)
+    return None
+
+
+def _sweep(rows):
+    """One pass over flights sorted by (pilot, departure): report each flight that
+    departs before the latest arrival seen so far for the same pilot."""
+    conflicts = []
+    current_pilot = None
+    latest_arrival = latest_flight = None
+    for pilot_id, flight_id, departure, arrival in rows:
+        if pilot_id != current_pilot:
+            current_pilot = pilot_id
+            latest_arrival, latest_flight = arrival, flight_id
+            continue
+        if departure < latest_arrival:
+            conflicts.append(_conflict(pilot_id, latest_flight, latest_arrival, flight_id, departure))
+        if arrival > latest_arrival:
+            latest_arrival, latest_flight = arrival, flight_id
+    return conflicts
+
+
+def find_conflicts(conn, pilot_id=None):
+    """Returns every overlapping pair of flights for one pilot or for all pilots.
+
+    A single sweep over the index in (PilotID, DepartureUTC) order, O(n) after the
+    index walk, rather than a pairwise comparison.
+    """
+    if pilot_id is None:
+        rows = conn.execute(ALL_PILOT_FLIGHTS_SQL)
+    else:
+        rows = conn.execute(PILOT_FLIGHTS_SQL, (pilot_id,))
+    return _sweep(rows)
+
+
+def find_assignment_conflicts(conn, pilot_id, flight_ids):
+    """Returns the overlaps that giving pilot_id all of flight_ids would create.
+
+    Clashes among the pilot's existing flights are not reported, only those
+    involving at least one of flight_ids, so an already double-booked pilot can
+    still be given flights that fit.
+    """
+    ids = json.dumps(list(flight_ids))
+    existing = conn.execute(OTHER_PILOT_FLIGHTS_SQL, (pilot_id, ids))
+    added = conn.execute(LISTED_FLIGHTS_SQL, (ids,))
+    rows = sorted([(row, False) for row in existing] + [(row, True) for row in added],
+                  key=lambda item: item[0][2])
+
+    conflicts = []
+    latest = latest_added = None  # (arrival, FlightID) over all flights / over flight_ids only
+    for (_, flight_id, departure, arrival), is_added in rows:
+        clash = latest if is_added else latest_added
+        if clash and departure < clash[0]:
+            conflicts.append(_conflict(pilot_id, clash[1], clash[0], flight_id, departure))
+        if latest is None or arrival > latest[0]:
+            latest = (arrival, flight_id)
+        if is_added and (latest_added is None or arrival > latest_added[0]):
+            latest_added = (arrival, flight_id)
+    return conflicts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report pilots booked on overlapping flights.")
+    parser.add_argument("--db", default=DB_PATH, help="SQLite database file")
+    parser.add_argument("--pilot", type=int, help="only check this PilotID")
+    args = parser.parse_args(argv)
+
+    # The overlap checks read the UTC columns, so bring the schema up to date
+    # on a read-write connection before the read-only one opens.
+    setup = connect(args.db)
+    migrate(setup)
+    setup.close()
+    conflicts = find_conflicts(connect(args.db, "reporting"), args.pilot)
+    if not conflicts:
+        print("No pilot is booked on overlapping flights.")
+        return 0
+    print(f"{'PilotID':<8} | {'Flight':<8} | {'Arrives (UTC)':<16} | {'Clashes':<8} | {'Departs (UTC)':<16}")
+    print("-" * 68)
+    for c in conflicts:
+        print(f"{c.pilot_id:<8} | {c.flight_id:<8} | {c.arrives:<16} | {c.other_flight_id:<8} | {c.departs:<16}")
+    print(f"\n{len(conflicts)} overlapping flight pair(s).")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,705 @@
+# The database schema, as numbered forward migrations.
+#
+# PRAGMA user_version records the last migration applied, so opening a database
+# that is already current costs a few reads and no write transaction (unless
+# migrate() finds something to repair: see repair_summaries and
+# fill_missing_flight_times). Each
+# migration runs in its own IMMEDIATE transaction together with the version
+# bump, so a crash mid-way leaves the database at the previous version and the
+# next start simply retries it. Every statement is idempotent (IF NOT EXISTS),
+# so databases created before versioning (user_version 0) upgrade in place.
+#
+# To change the schema, append a migration to MIGRATIONS; never edit one that
+# has shipped.
+
+from timezones import AIRPORT_TIME_ZONES, register_functions
+
+TABLES = {
+    "Pilot": """
+        CREATE TABLE IF NOT EXISTS Pilot (
+            PilotID INTEGER PRIMARY KEY AUTOINCREMENT,
+            FirstName TEXT NOT NULL,
+            LastName TEXT NOT NULL,
+            Email TEXT,
+            PhoneNumber TEXT
+        );
+    """,
+    "Airport": """
+        CREATE TABLE IF NOT EXISTS Airport (
+            AirportCode TEXT PRIMARY KEY,
+            AirportName TEXT NOT NULL,
+            City TEXT NOT NULL,
+            Country TEXT NOT NULL
+        );
+    """,
+    "Flight": """
+        CREATE TABLE IF NOT EXISTS Flight (
+            FlightID INTEGER PRIMARY KEY AUTOINCREMENT,
+            FlightNumber TEXT NOT NULL,
+            PilotID INTEGER,
+            DepartureAirport TEXT NOT NULL,
+            ArrivalAirport TEXT NOT NULL,
+            DepartureDate DATE NOT NULL,
+            DepartureTime TIME NOT NULL,
+            ArrivalDate DATE NOT NULL,
+            ArrivalTime TIME NOT NULL,
+            FlightStatus TEXT NOT NULL CHECK (FlightStatus IN
+                ('Scheduled', 'Departed', 'Delayed', 'Cancelled', 'Completed')),
+            FOREIGN KEY (PilotID) REFERENCES Pilot(PilotID),
+            FOREIGN KEY (DepartureAirport) REFERENCES Airport(AirportCode),
+            FOREIGN KEY (ArrivalAirport) REFERENCES Airport(AirportCode)
+        );
+    """,
+}
+
+# Secondary indexes on Flight, one per FlightService access path.
+#   full listing (Q8)            -> departure order (keyset pagination)
+#   status listing (Q2)          -> FlightStatus, then departure order
+#   pilot schedule (Q6, Q11)     -> PilotID, then departure order
+#   delete lookup (Q10)          -> FlightNumber + DepartureDate
+#   bulk updates by airport      -> DepartureAirport, then departure order
+#   destination counts (Q9, Q12) -> ArrivalAirport
+FLIGHT_INDEXES = {
+    "idx_flight_departure": "Flight (DepartureDate, DepartureTime)",
+    "idx_flight_status_departure": "Flight (FlightStatus, DepartureDate, DepartureTime)",
+    "idx_flight_pilot_departure": "Flight (PilotID, DepartureDate, DepartureTime)",
+    "idx_flight_number_date": "Flight (FlightNumber, DepartureDate)",
+    "idx_flight_arrival": "Flight (ArrivalAirport)",
+    "idx_flight_origin_departure": "Flight (DepartureAirport, DepartureDate, DepartureTime)",
+}
+
+# Summary tables behind Q9/Q12 (flights per arrival city) and Q11 (flights per
+# pilot). They are kept current by triggers, so every write path - the menu, the
+# bulk importer, raw SQL - updates them in the same transaction as the flight.
+# Unassigned flights are counted under PilotID 0 (real IDs start at 1).
+# aggregates.py rebuilds and verifies them.
+SUMMARY_TABLES = {
+    "DestinationFlightCount": """
+        CREATE TABLE IF NOT EXISTS DestinationFlightCount (
+            City TEXT PRIMARY KEY,
+            FlightCount INTEGER NOT NULL
+        );
+    """,
+    "PilotFlightCount": """
+        CREATE TABLE IF NOT EXISTS PilotFlightCount (
+            PilotID INTEGER PRIMARY KEY,
+            FlightCount INTEGER NOT NULL
+        );
+    """,
+}
+
+_ADD_CITY = """
+    INSERT INTO DestinationFlightCount (City, FlightCount)
+    SELECT City, {count} FROM Airport WHERE AirportCode = {code}
+    ON CONFLICT (City) DO UPDATE SET FlightCount = FlightCount + excluded.FlightCount;
+"""
+
+_SUBTRACT_CITY = """
+    UPDATE DestinationFlightCount SET FlightCount = FlightCount - {count}
+    WHERE City = {city};
+    DELETE FROM DestinationFlightCount WHERE City = {city} AND FlightCount <= 0;
+"""
+
+_ADD_PILOT = """
+    INSERT INTO PilotFlightCount (PilotID, FlightCount) VALUES (IFNULL({pilot}, 0), 1)
+    ON CONFLICT (PilotID) DO UPDATE SET FlightCount = FlightCount + 1;
+"""
+
+_SUBTRACT_PILOT = """
+    UPDATE PilotFlightCount SET FlightCount = FlightCount - 1 WHERE PilotID = IFNULL({pilot}, 0);
+    DELETE FROM PilotFlightCount WHERE PilotID = IFNULL({pilot}, 0) AND FlightCount <= 0;
+"""
+
+_OLD_CITY = "(SELECT City FROM Airport WHERE AirportCode = OLD.ArrivalAirport)"
+_AIRPORT_FLIGHTS = "(SELECT COUNT(*) FROM Flight WHERE ArrivalAirport = {code})"
+
+SUMMARY_TRIGGERS = {
+    "trg_flight_insert_counts": "AFTER INSERT ON Flight BEGIN"
+        + _ADD_CITY.format(count=1, code="NEW.ArrivalAirport")
+        + _ADD_PILOT.format(pilot="NEW.PilotID")
+        + "END",
+    "trg_flight_delete_counts": "AFTER DELETE ON Flight BEGIN"
+        + _SUBTRACT_CITY.format(count=1, city=_OLD_CITY)
+        + _SUBTRACT_PILOT.format(pilot="OLD.PilotID")
+        + "END",
+    "trg_flight_arrival_counts": "AFTER UPDATE OF ArrivalAirport ON Flight"
+        " WHEN OLD.ArrivalAirport IS NOT NEW.ArrivalAirport BEGIN"
+        + _SUBTRACT_CITY.format(count=1, city=_OLD_CITY)
+        + _ADD_CITY.format(count=1, code="NEW.ArrivalAirport")
+        + "END",
+    "trg_flight_pilot_counts": "AFTER UPDATE OF PilotID ON Flight"
+        " WHEN OLD.PilotID IS NOT NEW.PilotID BEGIN"
+        + _SUBTRACT_PILOT.format(pilot="OLD.PilotID")
+        + _ADD_PILOT.format(pilot="NEW.PilotID")
+        + "END",
+    # Airport changes move every flight arriving there between cities.
+    "trg_airport_insert_counts": "AFTER INSERT ON Airport BEGIN"
+        + _ADD_CITY.format(count=_AIRPORT_FLIGHTS.format(code="NEW.AirportCode"), code="NEW.AirportCode")
+        + "DELETE FROM DestinationFlightCount WHERE City = NEW.City AND FlightCount <= 0; END",
+    # A new code also moves the airport's flights: those arriving at the old code
+    # no longer count, those arriving at the new one now do.
+    "trg_airport_update_counts": "AFTER UPDATE OF AirportCode, City ON Airport"
+        " WHEN OLD.City IS NOT NEW.City OR OLD.AirportCode IS NOT NEW.AirportCode BEGIN"
+        + _SUBTRACT_CITY.format(count=_AIRPORT_FLIGHTS.format(code="OLD.AirportCode"), city="OLD.City")
+        + _ADD_CITY.format(count=_AIRPORT_FLIGHTS.format(code="NEW.AirportCode"), code="NEW.AirportCode")
+        + "DELETE FROM DestinationFlightCount WHERE City = NEW.City AND FlightCount <= 0; END",
+    "trg_airport_delete_counts": "AFTER DELETE ON Airport BEGIN"
+        + _SUBTRACT_CITY.format(count=_AIRPORT_FLIGHTS.format(code="OLD.AirportCode"), city="OLD.City")
+        + "END",
+}
+
+# UTC epoch copies of the local flight times (see timezones.py), range-indexed
+# for "departing/arriving between" queries and block-time statistics. They are
+# added by migration 4, after the base tables. Computing them needs the
+# utc_epoch() SQL function, which only this application's connections register,
+# so the triggers here do not call it: they clear the UTC times a change makes
+# stale (a flight's local times or airports, an airport's TimeZone), in plain SQL
+# that any client can run, and queue the flight in FlightTimePending. The
+# application fills them in: FlightAPI with FLIGHT_UTC_SQL /
+# AIRPORT_FLIGHTS_UTC_SQL after its own writes (a flight leaves the queue once
+# both times are set), bulk loads once at the end, and migrate() for the flights
+# other clients left queued (fill_missing_flight_times). A flight whose airport
+# has no time zone leaves the queue after one try; setting that time zone, or
+# changing the flight's times, queues it again. So opening a current database
+# reads one row of the queue, not every flight without a UTC time.
+FLIGHT_TIME_COLUMNS = {
+    "Airport": {"TimeZone": "TEXT"},
+    "Flight": {"DepartureUTC": "INTEGER", "ArrivalUTC": "INTEGER"},
+}
+
+FLIGHT_TIME_TABLES = {
+    "FlightTimePending": """
+        CREATE TABLE IF NOT EXISTS FlightTimePending (
+            FlightID INTEGER PRIMARY KEY
+        );
+    """,
+}
+
+FLIGHT_TIME_INDEXES = {
+    "idx_flight_departure_utc": "Flight (DepartureUTC)",
+    "idx_flight_arrival_utc": "Flight (ArrivalUTC)",
+    "idx_flight_pilot_departure_utc": "Flight (PilotID, DepartureUTC)",  # pilot overlap checks (scheduling.py)
+}
+
+_ZONE_OF = "(SELECT TimeZone FROM Airport WHERE AirportCode = {code})"
+
+_SET_FLIGHT_UTC = f"""
+    UPDATE Flight SET
+        DepartureUTC = utc_epoch(DepartureDate, DepartureTime, {_ZONE_OF.format(code="Flight.DepartureAirport")}),
+        ArrivalUTC = utc_epoch(ArrivalDate, ArrivalTime, {_ZONE_OF.format(code="Flight.ArrivalAirport")})
+"""
+
+FLIGHT_UTC_SQL = _SET_FLIGHT_UTC + "WHERE FlightID = ?"
+
+# (zone, airport code): an airport's flights after its TimeZone is set.
+AIRPORT_FLIGHTS_UTC_SQL = (
+    "UPDATE Flight SET DepartureUTC = utc_epoch(DepartureDate, DepartureTime, ?1) WHERE DepartureAirport = ?2",
+    "UPDATE Flight SET ArrivalUTC = utc_epoch(ArrivalDate, ArrivalTime, ?1) WHERE ArrivalAirport = ?2",
+)
+
+_DEPARTURE_UTC = f"utc_epoch(DepartureDate, DepartureTime, {_ZONE_OF.format(code='Flight.DepartureAirport')})"
+_ARRIVAL_UTC = f"utc_epoch(ArrivalDate, ArrivalTime, {_ZONE_OF.format(code='Flight.ArrivalAirport')})"
+
+_PENDING_SQL = "SELECT 1 FROM FlightTimePending LIMIT 1"
+
+# The queued flights' empty UTC times; a time that cannot be computed stays NULL.
+_FILL_PENDING_UTC_SQL = f"""
+    UPDATE Flight SET
+        DepartureUTC = IFNULL(DepartureUTC, {_DEPARTURE_UTC}),
+        ArrivalUTC = IFNULL(ArrivalUTC, {_ARRIVAL_UTC})
+    WHERE FlightID IN (SELECT FlightID FROM FlightTimePending)
+"""
+
+_QUEUE_FLIGHT = " INSERT OR IGNORE INTO FlightTimePending (FlightID) VALUES (NEW.FlightID);"
+
+_LOCAL_TIMES_CHANGED = " OR ".join(f"OLD.{column} IS NOT NEW.{column}" for column in (
+    "DepartureDate", "DepartureTime", "ArrivalDate", "ArrivalTime", "DepartureAirport", "ArrivalAirport"))
+
+FLIGHT_TIME_TRIGGERS = {
+    "trg_flight_insert_queue_utc": "AFTER INSERT ON Flight"
+        " WHEN NEW.DepartureUTC IS NULL OR NEW.ArrivalUTC IS NULL BEGIN" + _QUEUE_FLIGHT + " END",
+    # Unless the same UPDATE also set the UTC times.
+    "trg_flight_times_clear_utc": "AFTER UPDATE OF DepartureDate, DepartureTime, ArrivalDate, ArrivalTime,"
+        f" DepartureAirport, ArrivalAirport ON Flight WHEN ({_LOCAL_TIMES_CHANGED})"
+        " AND NEW.DepartureUTC IS OLD.DepartureUTC AND NEW.ArrivalUTC IS OLD.ArrivalUTC BEGIN"
+        " UPDATE Flight SET DepartureUTC = NULL, ArrivalUTC = NULL WHERE FlightID = NEW.FlightID;"
+        + _QUEUE_FLIGHT + " END",
+    "trg_flight_utc_dequeue": "AFTER UPDATE OF DepartureUTC, ArrivalUTC ON Flight"
+        " WHEN NEW.DepartureUTC IS NOT NULL AND NEW.ArrivalUTC IS NOT NULL BEGIN"
+        " DELETE FROM FlightTimePending WHERE FlightID = NEW.FlightID; END",
+    "trg_airport_insert_queue_utc": "AFTER INSERT ON Airport WHEN NEW.TimeZone IS NOT NULL BEGIN"
+        " INSERT OR IGNORE INTO FlightTimePending (FlightID) SELECT FlightID FROM Flight"
+        " WHERE (DepartureAirport = NEW.AirportCode AND DepartureUTC IS NULL)"
+        " OR (ArrivalAirport = NEW.AirportCode AND ArrivalUTC IS NULL); END",
+    "trg_airport_time_zone_clear_utc": "AFTER UPDATE OF TimeZone ON Airport"
+        " WHEN OLD.TimeZone IS NOT NEW.TimeZone BEGIN"
+        " UPDATE Flight SET DepartureUTC = NULL WHERE DepartureAirport = NEW.AirportCode;"
+        " UPDATE Flight SET ArrivalUTC = NULL WHERE ArrivalAirport = NEW.AirportCode;"
+        " INSERT OR IGNORE INTO FlightTimePending (FlightID) SELECT FlightID FROM Flight"
+        " WHERE DepartureAirport = NEW.AirportCode OR ArrivalAirport = NEW.AirportCode; END",
+}
+
+# Version 4's triggers, which called utc_epoch() (replaced by migration 10).
+_UTC_EPOCH_TRIGGERS = ("trg_flight_insert_utc", "trg_flight_times_utc", "trg_airport_insert_utc",
+                       "trg_airport_time_zone_utc")
+
+# Per-day versions of the timetable, behind the itinerary snapshot (itinerary.py).
+# Day is the UTC day of a departure (DepartureUTC / 86400); every insert, delete
+# or change of a flight's airports, UTC times, status or number bumps the
+# version of the day(s) it departs on, so a snapshot reloads only the days whose
+# version moved since it last looked.
+SCHEDULE_TABLES = {
+    "ScheduleDay": """
+        CREATE TABLE IF NOT EXISTS ScheduleDay (
+            Day INTEGER PRIMARY KEY,
+            Version INTEGER NOT NULL
+        );
+    """,
+}
+
+_BUMP_DAY = """
+    INSERT INTO ScheduleDay (Day, Version) SELECT {utc} / 86400, 1 WHERE {utc} IS NOT NULL
+    ON CONFLICT (Day) DO UPDATE SET Version = Version + 1;
+"""
+
+# A new flight's UTC times are set by an UPDATE after the insert (FLIGHT_UTC_SQL),
+# which fires trg_flight_schedule_update; the insert trigger covers rows
+# inserted with their UTC times already filled in.
+SCHEDULE_TRIGGERS = {
+    "trg_flight_schedule_insert": "AFTER INSERT ON Flight WHEN NEW.DepartureUTC IS NOT NULL BEGIN"
+        + _BUMP_DAY.format(utc="NEW.DepartureUTC") + "END",
+    "trg_flight_schedule_update": "AFTER UPDATE OF FlightNumber, DepartureAirport, ArrivalAirport,"
+        " DepartureUTC, ArrivalUTC, FlightStatus ON Flight BEGIN"
+        + _BUMP_DAY.format(utc="OLD.DepartureUTC")
+        + _BUMP_DAY.format(utc="NEW.DepartureUTC") + "END",
+    "trg_flight_schedule_delete": "AFTER DELETE ON Flight BEGIN"
+        + _BUMP_DAY.format(utc="OLD.DepartureUTC") + "END",
+}
+
+_BUMP_ALL_DAYS_SQL = """
+    INSERT INTO ScheduleDay (Day, Version)
+    SELECT DISTINCT DepartureUTC / 86400, 1 FROM Flight WHERE DepartureUTC IS NOT NULL
+    ON CONFLICT (Day) DO UPDATE SET Version = Version + 1
+"""
+
+# Change-data capture (changelog.py). Every insert, update and delete of a
+# Flight, Pilot or Airport row appends one ChangeLog entry; Seq is AUTOINCREMENT,
+# so it only grows and is never reused after compaction deletes old entries.
+# Data is the row after the change as a JSON object (NULL for a delete) and Old
+# the row before it (NULL for an insert); storing the whole old row costs the
+# trigger less than working out which columns changed. Updates that change no
+# logged column (e.g. the UTC time triggers' own UPDATE) are not logged. ChangeConsumer records how far each
+# named consumer has read, for compaction.
+CHANGE_LOG_TABLES = {
+    "ChangeLog": """
+        CREATE TABLE IF NOT EXISTS ChangeLog (
+            Seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            TableName TEXT NOT NULL,
+            Operation TEXT NOT NULL CHECK (Operation IN ('INSERT', 'UPDATE', 'DELETE', 'RESYNC')),
+            RowKey,
+            Data TEXT,
+            Old TEXT,
+            ChangedAt INTEGER NOT NULL
+        );
+    """,
+    "ChangeConsumer": """
+        CREATE TABLE IF NOT EXISTS ChangeConsumer (
+            Name TEXT PRIMARY KEY,
+            Seq INTEGER NOT NULL,
+            UpdatedAt INTEGER NOT NULL
+        );
+    """,
+}
+
+# table -> (key column, logged columns); the UTC columns are derived, so not logged.
+CHANGE_LOG_COLUMNS = {
+    "Flight": ("FlightID", ("FlightID", "FlightNumber", "PilotID", "DepartureAirport", "ArrivalAirport",
+                            "DepartureDate", "DepartureTime", "ArrivalDate", "ArrivalTime", "FlightStatus")),
+    "Pilot": ("PilotID", ("PilotID", "FirstName", "LastName", "Email", "PhoneNumber")),
+    "Airport": ("AirportCode", ("AirportCode", "AirportName", "City", "Country", "TimeZone")),
+}
+
+_NOW = "CAST(strftime('%s', 'now') AS INTEGER)"
+
+
+def _log_change(table, operation, key, data, old):
+    return (f" INSERT INTO ChangeLog (TableName, Operation, RowKey, Data, Old, ChangedAt)"
+            f" VALUES ('{table}', '{operation}', {key}, {data}, {old}, {_NOW}); ")
+
+
+def _json_row(ref, columns):
+    return "json_object(" + ", ".join(f"'{column}', {ref}.{column}" for column in columns) + ")"
+
+
+def _change_log_triggers():
+    triggers = {}
+    for table, (key, columns) in CHANGE_LOG_COLUMNS.items():
+        new, old = _json_row("NEW", columns), _json_row("OLD", columns)
+        any_changed = " OR ".join(f"OLD.{column} IS NOT NEW.{column}" for column in columns)
+        name = table.lower()
+        triggers[f"trg_{name}_log_insert"] = (f"AFTER INSERT ON {table} BEGIN"
+                                              + _log_change(table, "INSERT", f"NEW.{key}", new, "NULL") + "END")
+        triggers[f"trg_{name}_log_update"] = (f"AFTER UPDATE ON {table} WHEN {any_changed} BEGIN"
+                                              + _log_change(table, "UPDATE", f"NEW.{key}", new, old) + "END")
+        triggers[f"trg_{name}_log_delete"] = (f"AFTER DELETE ON {table} BEGIN"
+                                              + _log_change(table, "DELETE", f"OLD.{key}", "NULL", old) + "END")
+    return triggers
+
+
+CHANGE_LOG_TRIGGERS = _change_log_triggers()
+
+# Type-ahead search (search.py): FTS5 indexes of Airport and Pilot, kept in step
+# by triggers. Every word is also indexed by its first 1-3 characters (prefix),
+# so short prefix queries read one posting list instead of expanding every word.
+# PilotSearch's rowid is the PilotID. Airport rowids are not stable (VACUUM may
+# renumber a table without an INTEGER PRIMARY KEY), so AirportSearch keeps its
+# own and an airport's entry is found by matching its code. Where SQLite is built
+# without FTS5, migration 7 creates nothing and search.py keeps an in-memory
+# index instead.
+SEARCH_TOKENIZER = "unicode61 remove_diacritics 2"
+
+SEARCH_TABLES = {
+    "AirportSearch": "CREATE VIRTUAL TABLE IF NOT EXISTS AirportSearch USING fts5("
+        f"AirportCode, AirportName, City, Country, tokenize = '{SEARCH_TOKENIZER}', prefix = '1 2 3')",
+    "PilotSearch": "CREATE VIRTUAL TABLE IF NOT EXISTS PilotSearch USING fts5("
+        f"FirstName, LastName, Email, tokenize = '{SEARCH_TOKENIZER}', prefix = '1 2 3')",
+}
+
+_INDEX_AIRPORT = """
+    INSERT INTO AirportSearch (AirportCode, AirportName, City, Country)
+    VALUES (NEW.AirportCode, NEW.AirportName, NEW.City, NEW.Country);
+"""
+
+_UNINDEX_AIRPORT = """
+    DELETE FROM AirportSearch
+    WHERE AirportSearch MATCH 'AirportCode : "' || replace(OLD.AirportCode, '"', '""') || '"'
+      AND AirportCode = OLD.AirportCode;
+"""
+
+_INDEX_PILOT = """
+    INSERT INTO PilotSearch (rowid, FirstName, LastName, Email)
+    VALUES (NEW.PilotID, NEW.FirstName, NEW.LastName, NEW.Email);
+"""
+
+_UNINDEX_PILOT = " DELETE FROM PilotSearch WHERE rowid = OLD.PilotID; "
+
+SEARCH_TRIGGERS = {
+    "trg_airport_search_insert": "AFTER INSERT ON Airport BEGIN" + _INDEX_AIRPORT + "END",
+    "trg_airport_search_update": "AFTER UPDATE OF AirportCode, AirportName, City, Country ON Airport BEGIN"
+        + _UNINDEX_AIRPORT + _INDEX_AIRPORT + "END",
+    "trg_airport_search_delete": "AFTER DELETE ON Airport BEGIN" + _UNINDEX_AIRPORT + "END",
+    "trg_pilot_search_insert": "AFTER INSERT ON Pilot BEGIN" + _INDEX_PILOT + "END",
+    "trg_pilot_search_update": "AFTER UPDATE OF PilotID, FirstName, LastName, Email ON Pilot BEGIN"
+        + _UNINDEX_PILOT + _INDEX_PILOT + "END",
+    "trg_pilot_search_delete": "AFTER DELETE ON Pilot BEGIN" + _UNINDEX_PILOT + "END",
+}
+
+# table -> statements refilling its search index from scratch
+SEARCH_REINDEX_SQL = {
+    "Airport": ("DELETE FROM AirportSearch",
+                "INSERT INTO AirportSearch (AirportCode, AirportName, City, Country)"
+                " SELECT AirportCode, AirportName, City, Country FROM Airport"),
+    "Pilot": ("DELETE FROM PilotSearch",
+              "INSERT INTO PilotSearch (rowid, FirstName, LastName, Email)"
+              " SELECT PilotID, FirstName, LastName, Email FROM Pilot"),
+}
+
+# The original full-scan aggregations, used to fill, rebuild and verify the summaries.
+DESTINATION_COUNTS_FROM_FLIGHTS_SQL = """
+    SELECT d.City, COUNT(f.FlightID)
+    FROM Flight f
+    JOIN Airport d ON f.ArrivalAirport = d.AirportCode
+    GROUP BY d.City
+"""
+
+PILOT_COUNTS_FROM_FLIGHTS_SQL = """
+    SELECT IFNULL(PilotID, 0), COUNT(*)
+    FROM Flight
+    GROUP BY IFNULL(PilotID, 0)
+"""
+
+
+def fill_summaries(conn):
+    """Recomputes both summary tables from Flight inside the caller's transaction."""
+    conn.execute("DELETE FROM DestinationFlightCount")
+    conn.execute("DELETE FROM PilotFlightCount")
+    conn.execute(f"INSERT INTO DestinationFlightCount (City, FlightCount) {DESTINATION_COUNTS_FROM_FLIGHTS_SQL}")
+    conn.execute(f"INSERT INTO PilotFlightCount (PilotID, FlightCount) {PILOT_COUNTS_FROM_FLIGHTS_SQL}")
+
+
+def fill_flight_times(conn):
+    """Recomputes DepartureUTC and ArrivalUTC of every flight inside the caller's transaction."""
+    conn.execute(_SET_FLIGHT_UTC)
+
+
+def fill_missing_flight_times(conn):
+    """Computes the UTC times of the flights in FlightTimePending (e.g. written with the sqlite3
+    shell) and empties it, in one transaction; returns the number of flights tried. Reads only
+    if the queue is empty."""
+    if conn.execute(_PENDING_SQL).fetchone() is None:
+        return 0
+    with conn:
+        tried = conn.execute(_FILL_PENDING_UTC_SQL).rowcount
+        conn.execute("DELETE FROM FlightTimePending")
+    return tried
+
+
+def _create_flight_time_triggers(conn):
+    for ddl in FLIGHT_TIME_TABLES.values():
+        conn.execute(ddl)
+    for name, body in FLIGHT_TIME_TRIGGERS.items():
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+
+
+def create_flight_time_triggers(conn):
+    """Recomputes every flight's UTC times and creates the UTC time triggers, in one transaction."""
+    with conn:
+        fill_flight_times(conn)
+        _create_flight_time_triggers(conn)
+        conn.execute("DELETE FROM FlightTimePending")
+
+
+def drop_flight_time_triggers(conn):
+    """Drops the UTC time triggers (e.g. for a bulk load followed by create_flight_time_triggers)."""
+    for name in FLIGHT_TIME_TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    conn.commit()
+
+
+def create_schedule_triggers(conn):
+    """Creates the timetable version triggers and bumps every day with flights, in one transaction."""
+    with conn:
+        for name, body in SCHEDULE_TRIGGERS.items():
+            conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+        conn.execute(_BUMP_ALL_DAYS_SQL)
+
+
+def drop_schedule_triggers(conn):
+    """Drops the timetable version triggers (e.g. for a bulk load followed by create_schedule_triggers)."""
+    for name in SCHEDULE_TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    conn.commit()
+
+
+def create_change_log_triggers(conn, resync_tables=()):
+    """Creates the change log triggers in one transaction.
+
+    After a load with the triggers dropped, pass the loaded tables as
+    resync_tables: each gets a RESYNC entry telling consumers to re-read it.
+    """
+    with conn:
+        for name, body in CHANGE_LOG_TRIGGERS.items():
+            conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+        conn.executemany("INSERT INTO ChangeLog (TableName, Operation, ChangedAt)"
+                         f" VALUES (?, 'RESYNC', {_NOW})", [(table,) for table in resync_tables])
+
+
+def drop_change_log_triggers(conn):
+    """Drops the change log triggers (e.g. for a bulk load followed by create_change_log_triggers)."""
+    for name in CHANGE_LOG_TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    conn.commit()
+
+
+def fts5_available(conn):
+    """True if this SQLite has the FTS5 full-text search module built in."""
+    return bool(conn.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')").fetchone()[0])
+
+
+def has_search_tables(conn):
+    """True if the FTS5 search indexes exist (migration 7 on an FTS5-enabled SQLite)."""
+    return conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE name IN (?, ?)",
+                        tuple(SEARCH_TABLES)).fetchone()[0] == len(SEARCH_TABLES)
+
+
+def create_search_triggers(conn, reindex_tables=("Airport", "Pilot")):
+    """Creates the search index triggers and refills the indexes of reindex_tables, in one transaction.
+
+    Does nothing on a database without the search indexes.
+    """
+    if not has_search_tables(conn):
+        return
+    with conn:
+        for name, body in SEARCH_TRIGGERS.items():
+            conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+        for table in reindex_tables:
+            for sql in SEARCH_REINDEX_SQL.get(table, ()):
+                conn.execute(sql)
+
+
+def drop_search_triggers(conn):
+    """Drops the search index triggers (e.g. for a bulk load followed by create_search_triggers)."""
+    for name in SEARCH_TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    conn.commit()
+
+
+def create_indexes(conn):
+    """Creates the managed secondary indexes on Flight if they do not exist."""
+    _flight_indexes(conn)
+    _create_indexes(conn, FLIGHT_TIME_INDEXES)
+    conn.commit()
+
+
+def drop_indexes(conn):
+    """Drops the managed secondary indexes on Flight (e.g. before a bulk load)."""
+    for name in (*FLIGHT_INDEXES, *FLIGHT_TIME_INDEXES):
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+    conn.commit()
+
+
+def _create_indexes(conn, indexes):
+    for name, target in indexes.items():
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+
+
+# Migrations. Each runs inside migrate()'s transaction and must not commit.
+def _base_tables(conn):
+    for ddl in TABLES.values():
+        conn.execute(ddl)
+
+
+def _flight_indexes(conn):
+    _create_indexes(conn, FLIGHT_INDEXES)
+
+
+def _summary_tables(conn):
+    for ddl in SUMMARY_TABLES.values():
+        conn.execute(ddl)
+    for name, body in SUMMARY_TRIGGERS.items():
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+    fill_summaries(conn)
+
+
+def _airport_code_counts(conn):
+    # trg_airport_city_counts ignored AirportCode changes; its replacement covers both.
+    conn.execute("DROP TRIGGER IF EXISTS trg_airport_city_counts")
+    _summary_tables(conn)
+
+
+def _pilot_utc_index(conn):
+    _create_indexes(conn, FLIGHT_TIME_INDEXES)
+
+
+def _plain_sql_time_triggers(conn):
+    for name in _UTC_EPOCH_TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    _create_flight_time_triggers(conn)
+
+
+def _flight_utc_times(conn):
+    for table, columns in FLIGHT_TIME_COLUMNS.items():
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        for column, type_ in columns.items():
+            if column not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {type_}")
+    conn.executemany("UPDATE Airport SET TimeZone = ? WHERE AirportCode = ? AND TimeZone IS NULL",
+                     [(zone, code) for code, zone in AIRPORT_TIME_ZONES.items()])
+    fill_flight_times(conn)
+    _create_flight_time_triggers(conn)
+    _create_indexes(conn, FLIGHT_TIME_INDEXES)
+
+
+def _flight_time_queue(conn):
+    # The clear triggers now also queue the flight; recreate them with the queue.
+    for name in FLIGHT_TIME_TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    _create_flight_time_triggers(conn)
+    conn.execute("INSERT OR IGNORE INTO FlightTimePending (FlightID)"
+                 " SELECT FlightID FROM Flight WHERE DepartureUTC IS NULL OR ArrivalUTC IS NULL")
+
+
+def _schedule_versions(conn):
+    for ddl in SCHEDULE_TABLES.values():
+        conn.execute(ddl)
+    for name, body in SCHEDULE_TRIGGERS.items():
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+    conn.execute(_BUMP_ALL_DAYS_SQL)
+
+
+def _change_log(conn):
+    for ddl in CHANGE_LOG_TABLES.values():
+        conn.execute(ddl)
+    for name, body in CHANGE_LOG_TRIGGERS.items():
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+
+
+def _search_index(conn):
+    if not fts5_available(conn):
+        return
+    for ddl in SEARCH_TABLES.values():
+        conn.execute(ddl)
+    for name, body in SEARCH_TRIGGERS.items():
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+    for statements in SEARCH_REINDEX_SQL.values():
+        for sql in statements:
+            conn.execute(sql)
+
+MIGRATIONS = [
+    # (version, description, apply)
+    (1, "Pilot, Airport and Flight tables", _base_tables),
+    (2, "Flight secondary indexes", _flight_indexes),
+    (3, "trigger-maintained summary tables", _summary_tables),
+    (4, "Airport time zones and UTC flight times", _flight_utc_times),
+    (5, "per-day timetable versions for the itinerary snapshot", _schedule_versions),
+    (6, "change log of Flight, Pilot and Airport rows", _change_log),
+    (7, "full-text search indexes of Airport and Pilot", _search_index),
+    (8, "summary counts follow Airport code changes", _airport_code_counts),
+    (9, "Flight (PilotID, DepartureUTC) index for pilot overlap checks", _pilot_utc_index),
+    (10, "UTC time triggers in plain SQL, without utc_epoch()", _plain_sql_time_triggers),
+    (11, "queue of flights whose UTC times need computing", _flight_time_queue),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def repair_summaries(conn):
+    """Recreates any missing summary trigger and recounts the summary tables; returns the names recreated.
+
+    The version number alone cannot tell that a trigger was dropped (e.g. by an
+    interrupted bulk load), and the summaries drift without it.
+    """
+    existing = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    missing = [name for name in SUMMARY_TRIGGERS if name not in existing]
+    if missing:
+        with conn:
+            for name in missing:
+                conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {SUMMARY_TRIGGERS[name]}")
+            fill_summaries(conn)
+    return missing
+
+
+def schema_version(conn):
+    """The last migration applied to this database (0 for a new or unversioned one)."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """Brings the database up to SCHEMA_VERSION; returns the versions applied.
+
+    A current database is only read, unless repair_summaries finds a summary
+    trigger missing or other clients left flights queued in FlightTimePending
+    (fill_missing_flight_times). Older ones are upgraded one migration per
+    transaction; BEGIN IMMEDIATE takes the write lock before re-reading the
+    version, so processes starting together apply each migration once.
+    """
+    register_functions(conn)  # utc_epoch(), for the migrations and fill_missing_flight_times
+    if schema_version(conn) >= SCHEMA_VERSION:
+        if not conn.execute("PRAGMA query_only").fetchone()[0]:
+            repair_summaries(conn)
+            fill_missing_flight_times(conn)
+        return []
+    if conn.in_transaction:
+        conn.commit()
+    applied = []
+    for version, _, apply in MIGRATIONS:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if schema_version(conn) < version:
+                apply(conn)
+                conn.execute(f"PRAGMA user_version = {version}")
+                applied.append(version)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    return applied
@@ -0,0 +1,423 @@
+import argparse
+import json
+import re
+import sys
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from heapq import merge
+from itertools import groupby
+
+from changelog import FIRST_SEQ_SQL, latest_seq
+from connection import DB_PATH, connect
+from models import Airport, Pilot
+from schema import has_search_tables, migrate
+
+# Type-ahead search for airports (code, name, city, country) and pilots (name,
+# e-mail), so a user can find an AirportCode or PilotID from part of a name.
+#
+# Every word of the query must be the start of some word of the row, in any
+# column and any order: "lon he" finds Heathrow (London), "smi exa" finds
+# john.smith@example.com. Case and accents are ignored.
+#
+# Ranking is by where the query's longest word (the most specific one, the
+# "lead") matches: rows where it is a word of the first column (the airport
+# code, the pilot's first name) come first, then the second column and so on
+# (SEARCH_COLUMNS); within a column, rows where it is a whole word come before
+# rows where it is only the start of one. Within a tier rows are in key order
+# (airport code, PilotID), the same in both backends. Each tier is read in
+# order until the limit is filled. A relevance score (bm25) would have to score
+# every match before returning the first ten; "a" matches every airport
+# ("... Airport").
+#
+# The index is the FTS5 tables of migration 7 (schema.SEARCH_TABLES), which
+# triggers keep in step with Airport and Pilot; each tier is one MATCH with a
+# column filter, read with a LIMIT. PilotSearch's rowid is the PilotID, so its
+# tiers come out in key order as FTS5 reads them; an AirportSearch tier is sorted
+# by code, which reads the whole tier. Where SQLite has no FTS5 those tables do
+# not exist and SearchIndex keeps a PrefixIndex per table in memory instead: per
+# column, the distinct words in sorted order, so the words starting with a
+# prefix are one contiguous range found by bisection (a trie flattened into an
+# array, without a dict per node), each with the sorted keys of the rows it
+# appears in. It also keeps the sorted keys under each word start of up to three
+# characters, as FTS5 does with prefix = '1 2 3', so a short prefix spanning
+# thousands of words is one list; a longer one merges its words' lists lazily.
+# It is read once and then kept current from the change log: before a search,
+# the Airport and Pilot entries logged since are applied, and a RESYNC entry or
+# a compacted gap reloads the table.
+
+DEFAULT_LIMIT = 10
+MERGE_WORDS = 32  # a longer prefix spanning more words than this filters the keys under its start instead
+PREFIX_LENGTH = 3  # PrefixIndex keeps the keys under every word start up to this long, as FTS5's prefix = '1 2 3'
+
+# table -> its searched columns, in ranking order (schema.SEARCH_TABLES)
+SEARCH_COLUMNS = {
+    "Airport": ("AirportCode", "AirportName", "City", "Country"),
+    "Pilot": ("FirstName", "LastName", "Email"),
+}
+
+# one ranking tier: the keys of the matching rows, in key order
+AIRPORT_MATCH_SQL = "SELECT AirportCode FROM AirportSearch WHERE AirportSearch MATCH ? ORDER BY AirportCode LIMIT ?"
+
+PILOT_MATCH_SQL = "SELECT rowid FROM PilotSearch WHERE PilotSearch MATCH ? ORDER BY rowid LIMIT ?"
+
+AIRPORTS_BY_CODE_SQL = """
+    SELECT AirportCode, AirportName, City, Country, TimeZone
+    FROM Airport
+    WHERE AirportCode IN (SELECT value FROM json_each(?))
+"""
+
+PILOTS_BY_ID_SQL = """
+    SELECT PilotID, FirstName, LastName, Email, PhoneNumber
+    FROM Pilot
+    WHERE PilotID IN (SELECT value FROM json_each(?))
+"""
+
+ALL_AIRPORTS_SQL = "SELECT AirportCode, AirportName, City, Country, TimeZone FROM Airport"
+
+ALL_PILOTS_SQL = "SELECT PilotID, FirstName, LastName, Email, PhoneNumber FROM Pilot"
+
+DIMENSION_CHANGES_SQL = """
+    SELECT TableName, Operation, RowKey, Data, Old
+    FROM ChangeLog
+    WHERE Seq > ? AND Seq <= ? AND TableName IN ('Airport', 'Pilot')
+    ORDER BY Seq
+"""
+
+# model, positions of the searched columns (in SEARCH_COLUMNS order) in its rows, columns as logged
+# (schema.CHANGE_LOG_COLUMNS), and the SQL for one tier, for rows by key and for every row. Rows
+# are in model order, key first.
+_TABLES = {
+    "Airport": (Airport, (0, 1, 2, 3), ("AirportCode", "AirportName", "City", "Country", "TimeZone"),
+                AIRPORT_MATCH_SQL, AIRPORTS_BY_CODE_SQL, ALL_AIRPORTS_SQL),
+    "Pilot": (Pilot, (1, 2, 3), ("PilotID", "FirstName", "LastName", "Email", "PhoneNumber"),
+              PILOT_MATCH_SQL, PILOTS_BY_ID_SQL, ALL_PILOTS_SQL),
+}
+
+_WORD = re.compile(r"[^\W_]+")  # letters and digits, as FTS5's unicode61 tokenizer splits
+
+
+def words(text):
+    """The lower-cased, accent-free words of text, as the search index splits it."""
+    if not text:
+        return []
+    text = str(text).lower()
+    if not text.isascii():
+        text = "".join(char for char in unicodedata.normalize("NFKD", text) if not unicodedata.combining(char))
+    return _WORD.findall(text)
+
+
+def _lead(terms):
+    """Splits query words into the longest (the first such) and the rest."""
+    lead = max(terms, key=len)
+    rest = list(terms)
+    rest.remove(lead)
+    return lead, rest
+
+
+def _fts_keys(conn, match_sql, columns, lead, rest, limit):
+    """Keys of the FTS5 matches in ranking order: one MATCH per tier, each read only up to the limit."""
+    also = "".join(f' AND "{term}"*' for term in rest)
+    found = {}  # key -> None, in ranking order
+    for column in columns:
+        for prefix in ("", "*"):
+            wanted = -1 if limit is None else limit + len(found)  # the rows of earlier tiers come back too
+            for (key,) in conn.execute(match_sql, (f'{column} : "{lead}"{prefix}{also}', wanted)):
+                found.setdefault(key)
+                if len(found) == limit:
+                    return list(found)
+    return list(found)
+
+
+def _split(fields):
+    """The words of each field, a tuple per field."""
+    return tuple(map(tuple, map(words, fields)))
+
+
+def _starts(field):
+    """The distinct starts, up to PREFIX_LENGTH characters, of a field's words."""
+    return {word[:length] for word in field for length in range(1, PREFIX_LENGTH + 1)}
+
+
+class PrefixIndex:
+    """Rows of one table searchable by word prefix, in memory (the fallback to the FTS5 index).
+
+    add(key, row, fields) indexes the words of each field (column); search()
+    returns the matching rows in the ranking order described above.
+    """
+
+    def __init__(self, columns):
+        self._words = [[] for _ in range(columns)]     # per column: its distinct words, sorted
+        self._postings = [{} for _ in range(columns)]  # per column: word -> the keys of its rows, sorted
+        self._starts = [{} for _ in range(columns)]    # per column: word start (PREFIX_LENGTH) -> keys, sorted
+        self._rows = {}                                # key -> (row, words per column, all its words)
+
+    def __len__(self):
+        return len(self._rows)
+
+    @property
+    def vocabulary(self):
+        """The number of distinct (column, word) pairs indexed."""
+        return sum(map(len, self._words))
+
+    def load(self, entries):
+        """Replaces the contents with (key, row, fields) entries, sorting the words and keys once."""
+        self._postings = [{} for _ in self._postings]
+        self._rows = {}
+        for key, row, fields in entries:
+            split = _split(fields)
+            self._rows[key] = (row, split, sum(split, ()))
+            for column, field in enumerate(split):
+                postings = self._postings[column]
+                for word in field:
+                    keys = postings.get(word)
+                    if keys is None:
+                        postings[word] = [key]
+                    elif keys[-1] != key:  # not the word twice in one field
+                        keys.append(key)
+        self._starts = []
+        for postings in self._postings:
+            starts = {}
+            for word, keys in postings.items():
+                keys.sort()
+                for start in _starts((word,)):
+                    starts.setdefault(start, []).extend(keys)
+            for keys in starts.values():
+                keys.sort()  # sorted runs, one per word
+            self._starts.append({start: [key for key, _ in groupby(keys)] for start, keys in starts.items()})
+        self._words = [sorted(postings) for postings in self._postings]
+
+    def add(self, key, row, fields):
+        """Indexes a row, or re-indexes the columns of an indexed one whose words changed."""
+        split = _split(fields)
+        entry = self._rows.get(key)
+        for column, field in enumerate(split):
+            old = entry[1][column] if entry else ()
+            if field != old:
+                self._unindex(key, column, old)
+                self._index(key, column, field)
+        self._rows[key] = (row, split, sum(split, ()))
+
+    def remove(self, key):
+        entry = self._rows.pop(key, None)
+        if entry is None:
+            return
+        for column, field in enumerate(entry[1]):
+            self._unindex(key, column, field)
+
+    def _index(self, key, column, field):
+        postings = self._postings[column]
+        for word in dict.fromkeys(field):
+            keys = postings.get(word)
+            if keys is None:
+                postings[word] = [key]
+                insort(self._words[column], word)
+            else:
+                insort(keys, key)
+        starts = self._starts[column]
+        for start in _starts(field):
+            keys = starts.get(start)
+            if keys is None:
+                starts[start] = [key]
+            else:
+                insort(keys, key)
+
+    def _unindex(self, key, column, field):
+        postings = self._postings[column]
+        for word in dict.fromkeys(field):
+            keys = postings[word]
+            del keys[bisect_left(keys, key)]
+            if not keys:
+                del postings[word]
+                del self._words[column][bisect_left(self._words[column], word)]
+        starts = self._starts[column]
+        for start in _starts(field):
+            keys = starts[start]
+            del keys[bisect_left(keys, key)]
+            if not keys:
+                del starts[start]
+
+    def _tier(self, column, prefix):
+        """Keys of the rows with a word in column starting with prefix: those with the whole word first,
+        then the rest, each by key (a key may come more than once)."""
+        ordered = self._words[column]
+        postings = self._postings[column]
+        start, stop = bisect_left(ordered, prefix), bisect_left(ordered, prefix + "\U0010ffff")
+        if start < stop and ordered[start] == prefix:
+            yield from postings[prefix]
+            start += 1
+        if len(prefix) <= PREFIX_LENGTH:
+            yield from self._starts[column].get(prefix, ())
+        elif stop - start <= MERGE_WORDS:
+            yield from merge(*map(postings.get, ordered[start:stop]))
+        else:  # too many words to merge: filter the keys under the prefix's start instead
+            rows = self._rows
+            for key in self._starts[column].get(prefix[:PREFIX_LENGTH], ()):
+                if any(word.startswith(prefix) for word in rows[key][1][column]):
+                    yield key
+
+    def search(self, text, limit=DEFAULT_LIMIT):
+        """Rows matching every word of text, best first; all of them if limit is None."""
+        terms = words(text)
+        if not terms:
+            return []
+        lead, rest = _lead(terms)
+        seen, found = set(), []
+        for column in range(len(self._words)):
+            for key in self._tier(column, lead):
+                if key in seen:
+                    continue
+                seen.add(key)
+                row, _, row_words = self._rows[key]
+                if all(any(word.startswith(term) for word in row_words) for term in rest):
+                    found.append(row)
+                    if len(found) == limit:
+                        return found
+        return found
+
+
+class SearchIndex:
+    """Ranked type-ahead search over airports and pilots.
+
+        index = SearchIndex()
+        index.airports(conn, "lond")   # [Airport(code='LHR', ...), Airport(code='LGW', ...)]
+        index.pilots(conn, "smi")      # Pilot rows
+
+    Uses the FTS5 index where the database has one (see the top of this module),
+    else an in-memory PrefixIndex per table, refreshed from the change log.
+    backend="memory" forces the latter. One SearchIndex can be shared by
+    threads, each passing its own connection.
+    """
+
+    def __init__(self, backend=None):
+        if backend not in (None, "fts5", "memory"):
+            raise ValueError(f"Unknown search backend '{backend}'; use 'fts5' or 'memory'.")
+        self.backend = backend
+        self._memory = {table: PrefixIndex(len(columns)) for table, columns in SEARCH_COLUMNS.items()}
+        self._seq = None  # change log position the in-memory indexes are current to
+        self._lock = threading.Lock()
+        self.reloads = 0
+        self.applied = 0
+
+    def _uses_fts(self, conn):
+        if self.backend is None:
+            self.backend = "fts5" if has_search_tables(conn) else "memory"
+        return self.backend == "fts5"
+
+    def airports(self, conn, text, limit=DEFAULT_LIMIT):
+        """Airports matching every word of text as a word prefix, best first (all if limit is None)."""
+        return self._search(conn, "Airport", text, limit)
+
+    def pilots(self, conn, text, limit=DEFAULT_LIMIT):
+        """Pilots matching every word of text as a word prefix, best first (all if limit is None)."""
+        return self._search(conn, "Pilot", text, limit)
+
+    def _search(self, conn, table, text, limit):
+        if limit is not None and limit < 1:
+            raise ValueError("A search limit must be at least 1.")
+        if self._uses_fts(conn):
+            return self._fts_search(conn, table, text, limit)
+        with self._lock:
+            self._refresh(conn)
+            return [_TABLES[table][0](*values) for values in self._memory[table].search(text, limit)]
+
+    def _fts_search(self, conn, table, text, limit):
+        terms = words(text)
+        if not terms:
+            return []
+        model, _, _, match_sql, by_key_sql, _ = _TABLES[table]
+        keys = _fts_keys(conn, match_sql, SEARCH_COLUMNS[table], *_lead(terms), limit)
+        rows = {values[0]: values for values in conn.execute(by_key_sql, (json.dumps(keys),))}
+        return [model(*rows[key]) for key in keys if key in rows]
+
+    def refresh(self, conn):
+        """Brings the in-memory indexes up to date with the change log; a no-op with FTS5."""
+        if not self._uses_fts(conn):
+            with self._lock:
+                self._refresh(conn)
+
+    def _refresh(self, conn):
+        began = not conn.in_transaction
+        if began:
+            conn.execute("BEGIN")
+        try:
+            latest = latest_seq(conn)
+            if self._seq == latest:
+                return
+            first = conn.execute(FIRST_SEQ_SQL).fetchone()[0]
+            if self._seq is None or first is None or first > self._seq + 1:
+                reload = set(_TABLES)  # first use, or entries we never saw were compacted
+                changes = []
+            else:
+                changes = conn.execute(DIMENSION_CHANGES_SQL, (self._seq, latest)).fetchall()
+                reload = {change[0] for change in changes if change[1] == "RESYNC"}
+            for table in reload:
+                self._load(conn, table)
+            for table, operation, key, data, old in changes:
+                if table not in reload:
+                    self._apply(table, operation, key, data, old)
+            self._seq = latest
+        finally:
+            if began:
+                conn.commit()
+
+    def _load(self, conn, table):
+        searched = _TABLES[table][1]
+        self._memory[table].load((values[0], values, [values[i] for i in searched])
+                                 for values in conn.execute(_TABLES[table][5]))
+        self.reloads += 1
+
+    def _apply(self, table, operation, key, data, old):
+        _, searched, columns, _, _, _ = _TABLES[table]
+        index = self._memory[table]
+        if operation == "DELETE":
+            index.remove(key)
+        else:
+            logged = json.loads(data)
+            values = tuple(logged.get(column) for column in columns)
+            if old and json.loads(old)[columns[0]] != values[0]:
+                index.remove(json.loads(old)[columns[0]])  # the update changed the key itself
+            index.add(values[0], values, [values[i] for i in searched])
+        self.applied += 1
+
+    def stats(self):
+        """The backend in use and, in memory, the rows and words indexed."""
+        stats = {"backend": self.backend}
+        if self.backend == "memory":
+            stats.update({f"{table.lower()}s": len(index) for table, index in self._memory.items()})
+            stats.update({"words": sum(index.vocabulary for index in self._memory.values()),
+                          "reloads": self.reloads, "changes_applied": self.applied})
+        return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find airports or pilots by the start of any word.")
+    parser.add_argument("kind", choices=("airports", "pilots"))
+    parser.add_argument("text", nargs="+", help="words to look for, e.g. 'lon hea'")
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT)
+    parser.add_argument("--memory", action="store_true", help="use the in-memory index, not FTS5")
+    parser.add_argument("--db", default=DB_PATH, help="SQLite database file")
+    args = parser.parse_args(argv)
+
+    conn = connect(args.db)
+    migrate(conn)
+    index = SearchIndex("memory" if args.memory else None)
+    start = time.perf_counter()
+    try:
+        rows = getattr(index, args.kind)(conn, " ".join(args.text), args.limit)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 2
+    elapsed = time.perf_counter() - start
+    for row in rows:
+        if args.kind == "airports":
+            print(f"  {row.code:<6} {row.name} ({row.city}, {row.country})")
+        else:
+            print(f"  {row.pilot_id:<8} {row.name:<28} {row.email or ''}")
+    print(f"{len(rows)} match(es) in {elapsed * 1000:.1f} ms ({index.backend}).")
+    return 0 if rows else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
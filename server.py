@@ -0,0 +1,477 @@
+import argparse
+import asyncio
+import json
+import re
+import sqlite3
+import sys
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qsl, urlsplit
+
+from api import FlightAPI
+from cache import DimensionCache
+from changelog import ChangeLogGapError
+from itinerary import DEFAULT_MAX_LEGS, Timetable
+from connection import DB_PATH, connect
+from listing import DEFAULT_PAGE_SIZE
+from models import Row
+from roster import DEFAULT_MIN_REST_MINUTES
+from scheduling import ScheduleConflictError
+from schema import migrate
+from search import DEFAULT_LIMIT as DEFAULT_SEARCH_LIMIT, SearchIndex
+from writer import GroupCommitWriter
+
+# HTTP/JSON front end over FlightAPI, standard library only.
+#
+# The asyncio loop only parses requests and writes responses. GET requests run on
+# a pool of threads, each holding its own read-only ("reporting") connection; with
+# WAL they never wait for a writer. Every other method goes to a GroupCommitWriter
+# (writer.py): one thread with the one read-write connection, committing queued
+# writes in batches, so no two transactions contend for the write lock. All
+# connections share one DimensionCache, so a write's invalidation is seen by
+# every reader, and the readers share one itinerary Timetable and one SearchIndex.
+#
+#   GET    /flights?status=&after=&before=&page_size=   one keyset page (cursor in "next")
+#   POST   /flights                                     add_flight fields as JSON
+#   GET    /flights/departing?from=&to=                 UTC window, e.g. from=2025-10-14&to=2025-10-14 12:00
+#   GET    /flights/arriving?from=&to=
+#   GET    /flights/{id}
+#   DELETE /flights/{id}
+#   PUT    /flights/{id}/status                         {"status": ...}
+#   PUT    /flights/{id}/pilot                          {"pilot_id": ...}
+#   DELETE /flights/{id}/pilot
+#   POST   /flights/bulk-status                         {"new_status": ..., <flight_filter criteria>}
+#   POST   /flights/auto-roster                         {"start": ..., "end": ..., "min_rest_minutes", "dry_run"}; UTC
+#   POST   /pilots                                      add_pilot fields
+#   GET    /pilots/{id}
+#   GET    /pilots/{id}/schedule
+#   GET    /search/pilots?q=&limit=                     type-ahead: every word of q starts a name/e-mail word
+#   POST   /airports                                    add_airport fields
+#   GET    /airports/{code}
+#   PUT    /airports/{code}/time-zone                   {"time_zone": ...}
+#   GET    /search/airports?q=&limit=                   type-ahead over code, name, city and country
+#   GET    /reports/destinations | /reports/pilots | /reports/conflicts
+#   GET    /reports/block-times?from=&to=&by=route|pilot
+#   GET    /itineraries?origin=&destination=&after=&by=&max_legs=   UTC times; fewest legs first
+#   GET    /changes?since=&limit=                       change log entries after `since` (410 once compacted)
+#   GET    /stats                                       cache hit/miss counters, timetable size
+
+DEFAULT_PORT = 8080
+DEFAULT_READERS = 4
+MAX_BODY_BYTES = 1024 * 1024
+
+
+class HTTPError(Exception):
+    """An error response: status code plus a JSON body."""
+
+    def __init__(self, status, message, **extra):
+        super().__init__(message)
+        self.status = status
+        self.body = {"error": message, **extra}
+
+
+class ConnectionPool:
+    """A thread pool whose threads each own one connection and FlightAPI.
+
+    run(fn, *args) calls fn(api, *args) on one of the threads.
+    """
+
+    def __init__(self, db_path, profile, size, dimensions, name, timetable=None, search=None):
+        self.db_path = db_path
+        self.profile = profile
+        self.dimensions = dimensions
+        self.timetable = timetable if timetable is not None else Timetable()
+        self.search = search if search is not None else SearchIndex()
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix=name, initializer=self._open)
+
+    def _open(self):
+        conn = connect(self.db_path, self.profile, check_same_thread=False)
+        self._local.api = FlightAPI(conn, dimensions=self.dimensions, timetable=self.timetable, search=self.search)
+        with self._lock:
+            self._connections.append(conn)
+
+    def _call(self, fn, args):
+        return fn(self._local.api, *args)
+
+    async def run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._call, fn, args)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        for conn in self._connections:
+            conn.close()
+
+
+# Routing
+ROUTES = []
+
+
+def route(method, pattern):
+    """Registers handler(api, params, query, body) for method and a path regex."""
+    def register(handler):
+        ROUTES.append((method, re.compile(f"^{pattern}$"), handler))
+        return handler
+    return register
+
+
+def _found(value, what):
+    if value is None:
+        raise HTTPError(HTTPStatus.NOT_FOUND, f"{what} not found.")
+    return value
+
+
+def _changed(count, what):
+    if not count:
+        raise HTTPError(HTTPStatus.NOT_FOUND, f"{what} not found.")
+    return {"updated": count}
+
+
+def _cursor(value):
+    """Parses a page cursor "DepartureDate,DepartureTime,FlightID"."""
+    if not value:
+        return None
+    try:
+        departure_date, departure_time, flight_id = value.split(",")
+        return (departure_date, departure_time, int(flight_id))
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"Invalid page cursor '{value}'.") from None
+
+
+def _page_cursor(row):
+    return ",".join(str(part) for part in row.key)
+
+
+def _int(value, name):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"'{name}' must be an integer.") from None
+
+
+def _window(query):
+    """The required from/to parameters of a UTC time window."""
+    missing = [name for name in ("from", "to") if not query.get(name)]
+    if missing:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"Missing query parameter(s): {', '.join(missing)}.")
+    return query["from"], query["to"]
+
+
+@route("GET", r"/flights")
+def list_flights(api, params, query, body):
+    page_size = min(_int(query.get("page_size", DEFAULT_PAGE_SIZE), "page_size"), 1000)
+    rows = api.flight_page(query.get("status"), after=_cursor(query.get("after")),
+                           before=_cursor(query.get("before")), page_size=page_size)
+    return {
+        "flights": rows,
+        "next": _page_cursor(rows[-1]) if len(rows) == page_size else None,
+        "previous": _page_cursor(rows[0]) if rows else None,
+    }
+
+
+@route("POST", r"/flights")
+def add_flight(api, params, query, body):
+    return HTTPStatus.CREATED, {"flight_id": api.add_flight(**body)}
+
+
+@route("POST", r"/flights/bulk-status")
+def bulk_status(api, params, query, body):
+    body = dict(body)
+    new_status = body.pop("new_status", None)
+    return {"updated": api.bulk_set_status(new_status, **body)}
+
+
+@route("POST", r"/flights/auto-roster")
+def roster_flights(api, params, query, body):
+    missing = [name for name in ("start", "end") if not body.get(name)]
+    if missing:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"Missing field(s): {', '.join(missing)}.")
+    return api.auto_roster(body["start"], body["end"],
+                           _int(body.get("min_rest_minutes", DEFAULT_MIN_REST_MINUTES), "min_rest_minutes"),
+                           bool(body.get("dry_run", False)))
+
+
+@route("GET", r"/flights/departing")
+def flights_departing(api, params, query, body):
+    return api.flights_departing_between(*_window(query))
+
+
+@route("GET", r"/flights/arriving")
+def flights_arriving(api, params, query, body):
+    return api.flights_arriving_between(*_window(query))
+
+
+@route("GET", r"/flights/(\d+)")
+def get_flight(api, params, query, body):
+    return _found(api.flight(int(params[0])), "Flight")
+
+
+@route("DELETE", r"/flights/(\d+)")
+def delete_flight(api, params, query, body):
+    return _changed(api.delete_flight(int(params[0])), "Flight")
+
+
+@route("PUT", r"/flights/(\d+)/status")
+def set_status(api, params, query, body):
+    return _changed(api.set_status(int(params[0]), body.get("status")), "Flight")
+
+
+@route("PUT", r"/flights/(\d+)/pilot")
+def assign_pilot(api, params, query, body):
+    return _changed(api.assign_pilot(int(params[0]), _int(body.get("pilot_id"), "pilot_id")), "Flight")
+
+
+@route("DELETE", r"/flights/(\d+)/pilot")
+def remove_pilot(api, params, query, body):
+    return _changed(api.remove_pilot(int(params[0])), "Flight")
+
+
+@route("POST", r"/pilots")
+def add_pilot(api, params, query, body):
+    return HTTPStatus.CREATED, {"pilot_id": api.add_pilot(**body)}
+
+
+@route("GET", r"/pilots/(\d+)")
+def get_pilot(api, params, query, body):
+    return _found(api.pilot(int(params[0])), "Pilot")
+
+
+@route("GET", r"/pilots/(\d+)/schedule")
+def pilot_schedule(api, params, query, body):
+    pilot_id = int(params[0])
+    return {"pilot": _found(api.pilot(pilot_id), "Pilot"), "flights": api.pilot_schedule(pilot_id)}
+
+
+@route("POST", r"/airports")
+def add_airport(api, params, query, body):
+    api.add_airport(**body)
+    return HTTPStatus.CREATED, {"code": body.get("code")}
+
+
+@route("GET", r"/airports/([A-Za-z0-9]+)")
+def get_airport(api, params, query, body):
+    return _found(api.airport(params[0].upper()), "Airport")
+
+
+@route("PUT", r"/airports/([A-Za-z0-9]+)/time-zone")
+def set_time_zone(api, params, query, body):
+    return _changed(api.set_time_zone(params[0].upper(), body.get("time_zone")), "Airport")
+
+
+@route("GET", r"/search/(airports|pilots)")
+def search(api, params, query, body):
+    if not query.get("q", "").strip():
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Missing query parameter: q.")
+    limit = min(_int(query.get("limit", DEFAULT_SEARCH_LIMIT), "limit"), 100)
+    if params[0] == "airports":
+        return api.search_airports(query["q"], limit)
+    return api.search_pilots(query["q"], limit)
+
+
+@route("GET", r"/reports/destinations")
+def destination_report(api, params, query, body):
+    return api.destination_counts()
+
+
+@route("GET", r"/reports/pilots")
+def pilot_report(api, params, query, body):
+    return api.flights_per_pilot()
+
+
+@route("GET", r"/reports/conflicts")
+def conflict_report(api, params, query, body):
+    return api.pilot_conflicts(_int(query["pilot_id"], "pilot_id") if "pilot_id" in query else None)
+
+
+@route("GET", r"/reports/block-times")
+def block_time_report(api, params, query, body):
+    return api.block_times(*_window(query), by=query.get("by", "route"))
+
+
+@route("GET", r"/itineraries")
+def itineraries(api, params, query, body):
+    missing = [name for name in ("origin", "destination", "after") if not query.get(name)]
+    if missing:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"Missing query parameter(s): {', '.join(missing)}.")
+    return api.itineraries(query["origin"].upper(), query["destination"].upper(), query["after"],
+                           query.get("by"), _int(query.get("max_legs", DEFAULT_MAX_LEGS), "max_legs"))
+
+
+@route("GET", r"/changes")
+def changes(api, params, query, body):
+    limit = min(_int(query.get("limit", 1000), "limit"), 1000)
+    events = api.changes(_int(query.get("since", 0), "since"), limit)
+    return {"changes": events, "latest": api.latest_change()}
+
+
+@route("GET", r"/stats")
+def stats(api, params, query, body):
+    return {"cache": api.dimensions.stats(), "timetable": api.timetable.stats(), "search": api.search.stats()}
+
+
+def _json_default(value):
+    if isinstance(value, Row):
+        return value.as_dict()
+    raise TypeError(f"{type(value).__name__} is not JSON serialisable")
+
+
+def _call(api, handler, params, query, body):
+    """Runs a handler on a pool thread, mapping API errors to HTTP errors."""
+    try:
+        return handler(api, params, query, body)
+    except ChangeLogGapError as e:
+        raise HTTPError(HTTPStatus.GONE, str(e), first_seq=e.first_seq) from None
+    except ScheduleConflictError as e:
+        raise HTTPError(HTTPStatus.CONFLICT, str(e), conflicts=[c.as_dict() for c in e.conflicts]) from None
+    except sqlite3.IntegrityError as e:
+        raise HTTPError(HTTPStatus.CONFLICT, str(e)) from None
+    except (ValueError, TypeError) as e:  # TypeError: unexpected or missing JSON fields
+        raise HTTPError(HTTPStatus.BAD_REQUEST, str(e)) from None
+
+
+async def _respond(writer, status, payload, keep_alive):
+    """Writes one JSON response."""
+    data = json.dumps(payload, default=_json_default).encode()
+    writer.write(
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(data)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + data)
+    await writer.drain()
+
+
+class FlightServer:
+    """Serves the routes above over HTTP/1.1 with keep-alive."""
+
+    def __init__(self, db_path=DB_PATH, readers=DEFAULT_READERS, dimensions=None):
+        # Bring the schema up to date (and switch to WAL) before any read-only
+        # connection opens the file.
+        setup = connect(db_path)
+        migrate(setup)
+        setup.close()
+        self.dimensions = dimensions if dimensions is not None else DimensionCache()
+        self.readers = ConnectionPool(db_path, "reporting", readers, self.dimensions, "flight-reader")
+        self.writer = GroupCommitWriter(db_path, "interactive", dimensions=self.dimensions)
+        self._server = None
+
+    async def dispatch(self, method, target, body):
+        """Returns (status, payload) for one request."""
+        url = urlsplit(target)
+        query = dict(parse_qsl(url.query))
+        allowed = False
+        for route_method, pattern, handler in ROUTES:
+            match = pattern.match(url.path.rstrip("/") or "/")
+            if not match:
+                continue
+            allowed = True
+            if route_method != method:
+                continue
+            if method == "GET":
+                result = await self.readers.run(_call, handler, match.groups(), query, body)
+            else:
+                result = await asyncio.wrap_future(self.writer.submit(_call, handler, match.groups(), query, body))
+            if isinstance(result, tuple):
+                return result
+            return HTTPStatus.OK, result
+        if allowed:
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} is not supported on {url.path}.")
+        raise HTTPError(HTTPStatus.NOT_FOUND, f"No route for {url.path}.")
+
+    async def handle(self, reader, writer):
+        """Serves requests on one client connection until it closes."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode("latin-1").split(None, 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                # Refuse a bad or oversized body before reading any of it, and
+                # close: the unread bytes would otherwise be taken as the next request.
+                length = headers.get("content-length", "0")
+                if not (length.isascii() and length.isdigit()):
+                    error = HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length.")
+                elif int(length) > MAX_BODY_BYTES:
+                    error = HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large.")
+                else:
+                    error = None
+                if error:
+                    await _respond(writer, error.status, error.body, False)
+                    break
+                length = int(length)
+                raw = await reader.readexactly(length) if length else b""
+
+                try:
+                    try:
+                        body = json.loads(raw) if raw else {}
+                    except json.JSONDecodeError as e:
+                        raise HTTPError(HTTPStatus.BAD_REQUEST, f"Invalid JSON body: {e}") from None
+                    if not isinstance(body, dict):
+                        raise HTTPError(HTTPStatus.BAD_REQUEST, "The JSON body must be an object.")
+                    status, payload = await self.dispatch(method.upper(), target, body)
+                except HTTPError as e:
+                    status, payload = e.status, e.body
+                except sqlite3.Error as e:
+                    status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}
+                except Exception:
+                    traceback.print_exc()
+                    status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Internal server error."}
+
+                keep_alive = (headers.get("connection", "").lower() != "close"
+                              and not version.strip().upper().endswith("1.0"))
+                await _respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass  # client went away or sent something that is not HTTP
+        finally:
+            writer.close()
+
+    async def start(self, host="127.0.0.1", port=DEFAULT_PORT):
+        self._server = await asyncio.start_server(self.handle, host, port)
+        return self._server
+
+    async def serve_forever(self, host="127.0.0.1", port=DEFAULT_PORT):
+        server = await self.start(host, port)
+        address = server.sockets[0].getsockname()
+        print(f"Serving flights from {self.readers.db_path} on http://{address[0]}:{address[1]}")
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+        self.readers.close()
+        self.writer.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the flight database as an HTTP/JSON API.")
+    parser.add_argument("--db", default=DB_PATH, help="SQLite database file")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--readers", type=int, default=DEFAULT_READERS, help="read-only connections/threads")
+    args = parser.parse_args(argv)
+
+    server = FlightServer(args.db, readers=args.readers)
+    try:
+        asyncio.run(server.serve_forever(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
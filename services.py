@@ -1,52 +1,72 @@
+import os
 import sqlite3
 
+from api import FlightAPI
+from archive import archive_path, attached, history_destination_counts, history_flights_per_pilot
+from connection import DB_PATH, connect
+from instrumentation import InstrumentedConnection
+from itinerary import describe
+from listing import DEFAULT_PAGE_SIZE
+from render import (CITY_COUNT_COLUMNS, CONFLICT_COLUMNS, FLIGHT_COLUMNS, FLIGHT_DETAIL_COLUMNS, PILOT_COUNT_COLUMNS,
+                    SCHEDULE_COLUMNS, Column, export_flights, format_for, open_output, render)
+from roster import DEFAULT_MIN_REST_MINUTES
+from schema import migrate
+from timezones import format_utc
+
 class FlightService:
-    def __init__(self):
-        """Initializes the database connection and ensures tables are created."""
-        self.conn = sqlite3.connect("FlightManagement.db")
-        self.cursor = self.conn.cursor()
-        self._create_tables()
+    def __init__(self, db_path=DB_PATH, profile="interactive", instrumentation=None):
+        """Initializes the database connection and brings the schema up to date (see schema.migrate).
 
-    def _create_tables(self):
-        """Creates Pilot, Airport, and Flight tables if they do not already exist."""
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS Pilot (
-                PilotID INTEGER PRIMARY KEY AUTOINCREMENT,
-                FirstName TEXT NOT NULL,
-                LastName TEXT NOT NULL,
-                Email TEXT,
-                PhoneNumber TEXT
-            );
-        """)
+        With an instrumentation.Instrumentation every statement and FlightAPI call is measured (option 18).
+        """
+        self.db_path = db_path
+        self.instrumentation = instrumentation
+        if instrumentation is None:
+            self.conn = connect(db_path, profile)
+        else:
+            self.conn = instrumentation.attach(connect(db_path, profile, factory=InstrumentedConnection))
+        migrate(self.conn)
+        self.api = FlightAPI(self.conn)
+        if instrumentation is not None:
+            instrumentation.wrap(self.api)
 
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS Airport (
-                AirportCode TEXT PRIMARY KEY,
-                AirportName TEXT NOT NULL,
-                City TEXT NOT NULL,
-                Country TEXT NOT NULL
-            );
-        """)
+    def _browse_flights(self, title, status, columns, page_size=DEFAULT_PAGE_SIZE):
+        """Shows a flight listing one page at a time; returns False if there are no flights."""
+        rows = self.api.flight_page(status, page_size=page_size)
+        if not rows:
+            return False
+        page = 1
+        while True:
+            render(rows, columns, title=f"{title} (page {page})")
+            if page == 1 and len(rows) < page_size:
+                return True
+            choice = input("[n]ext page, [p]revious page, or Enter to finish: ").strip().lower()
+            if choice == "n":
+                next_rows = self.api.flight_page(status, after=rows[-1].key, page_size=page_size)
+                if next_rows:
+                    rows = next_rows
+                    page += 1
+                else:
+                    print("\nThis is the last page.")
+            elif choice == "p" and page > 1:
+                rows = self.api.flight_page(status, before=rows[0].key, page_size=page_size)
+                page -= 1
+            elif choice not in ("n", "p"):
+                return True
 
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS Flight (
-                FlightID INTEGER PRIMARY KEY AUTOINCREMENT,
-                FlightNumber TEXT NOT NULL,
-                PilotID INTEGER,
-                DepartureAirport TEXT NOT NULL,
-                ArrivalAirport TEXT NOT NULL,
-                DepartureDate DATE NOT NULL,
-                DepartureTime TIME NOT NULL,
-                ArrivalDate DATE NOT NULL,
-                ArrivalTime TIME NOT NULL,
-                FlightStatus TEXT NOT NULL CHECK (FlightStatus IN 
-                    ('Scheduled', 'Departed', 'Delayed', 'Cancelled', 'Completed')),
-                FOREIGN KEY (PilotID) REFERENCES Pilot(PilotID),
-                FOREIGN KEY (DepartureAirport) REFERENCES Airport(AirportCode),
-                FOREIGN KEY (ArrivalAirport) REFERENCES Airport(AirportCode)
-            );
-        """)
-        self.conn.commit()
+    def _export_flights(self, status=None):
+        """Offers to stream the whole listing to a CSV, TSV or JSON Lines file."""
+        path = input("\nExport these flights to a file (.csv, .tsv or .jsonl; press Enter to skip): ").strip()
+        if not path:
+            return
+        fmt = format_for(path, "csv")
+        try:
+            with open_output(path) as out:
+                count = export_flights(self.conn, out, fmt, status)
+        except (OSError, sqlite3.Error) as e:
+            print(f"\nError writing {path}: {e}")
+            return
+        print(f"\n{count} flight(s) written to {path} ({fmt}).")
 
 # Q1. For users to add a new flight 
     def add_new_flight(self):
@@ -58,27 +78,21 @@ class FlightService:
         print("Note: Flight Number (e.g., BA101) can be reused for flights on different days.")
         print("      Pilot ID is optional (press Enter to leave unassigned).")
         try:
-            flight_data = (
-                input("Flight Number (e.g., BA101): "),
-                input("Pilot ID (integer, e.g., 1; optional): ") or None,
+            flight_number = input("Flight Number (e.g., BA101): ")
+            pilot_id = input("Pilot ID (integer, e.g., 1; optional): ")
+            flight_id = self.api.add_flight(
+                flight_number,
                 input("Departure Airport Code (e.g., LHR): "),
                 input("Arrival Airport Code (e.g., JFK): "),
                 input("Departure Date (YYYY-MM-DD, e.g., 2025-10-10): "),
                 input("Departure Time (HH:MM in 24-hour format, e.g., 08:00): "),
                 input("Arrival Date (YYYY-MM-DD, e.g., 2025-10-10): "),
                 input("Arrival Time (HH:MM in 24-hour format, e.g., 11:30): "),
-                input("Flight Status (Scheduled, Departed, Delayed, Cancelled, Completed): ")
+                input("Flight Status (Scheduled, Departed, Delayed, Cancelled, Completed): "),
+                pilot_id=int(pilot_id) if pilot_id else None,
             )
-            self.cursor.execute("""
-                INSERT INTO Flight (
-                    FlightNumber, PilotID, DepartureAirport, ArrivalAirport,
-                    DepartureDate, DepartureTime, ArrivalDate, ArrivalTime,
-                    FlightStatus
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, flight_data)
-            self.conn.commit()
-            print("\nFlight added successfully!")
-        except Exception as e:
+            print(f"\nFlight added successfully! (Flight ID: {flight_id})")
+        except (ValueError, sqlite3.Error) as e:
             print(f"\nError adding flight: {e}")
 
 # Q2. View flights by status
@@ -89,36 +103,8 @@ class FlightService:
         print("╚═══════════════════════════════╝")
         print("Available statuses: Scheduled, Departed, Delayed, Cancelled, Completed")
         status = input("Enter flight status: ").strip().capitalize()
-        self.cursor.execute("""
-            SELECT 
-                f.FlightID,
-                f.FlightNumber,
-                IFNULL(p.FirstName || ' ' || p.LastName, 'Unassigned') AS Pilot,
-                o.City AS Departure,
-                d.City AS Arrival,
-                f.DepartureDate,
-                f.DepartureTime,
-                f.ArrivalDate,
-                f.ArrivalTime,
-                f.FlightStatus
-            FROM Flight f
-            LEFT JOIN Pilot p ON f.PilotID = p.PilotID
-            JOIN Airport o ON f.DepartureAirport = o.AirportCode
-            JOIN Airport d ON f.ArrivalAirport = d.AirportCode
-            WHERE f.FlightStatus = ?
-            ORDER BY f.DepartureDate, f.DepartureTime
-        """, (status,))
-
-        rows = self.cursor.fetchall()
-
-        if rows:
-            print(f"\nFlights with Status: {status}")
-            print("=" * 110)
-            print(f"{'FlightID':<8} | {'Flight':<10} | {'Pilot':<20} | {'From':<15} | {'To':<15} | {'Depart':<10} | {'Time':<8} | {'Arrive':<10} | {'Time':<8}")
-            print("-" * 110)
-            for row in rows:
-                print(f"{row[0]:<8} | {row[1]:<10} | {row[2]:<20} | {row[3]:<15} | {row[4]:<15} | {row[5]:<10} | {row[6]:<8} | {row[7]:<10} | {row[8]:<8}")
-            print("=" * 110)
+        if self._browse_flights(f"Flights with Status: {status}", status, FLIGHT_COLUMNS):
+            self._export_flights(status)
         else:
             print(f"\nNo flights found with status '{status}'.")
 
@@ -130,11 +116,15 @@ class FlightService:
         print("╚═══════════════════════════════╝")
         print("Note: Use Flight ID (unique integer, e.g., 1) to identify the flight.")
         print("Available statuses: Scheduled, Departed, Delayed, Cancelled, Completed")
-        flight_id = input("Enter Flight ID (integer, e.g., 1): ")
-        new_status = input("Enter new status: ")
-        self.cursor.execute("UPDATE Flight SET FlightStatus = ? WHERE FlightID = ?", (new_status, flight_id))
-        self.conn.commit()
-        print("\nFlight status updated successfully!")
+        try:
+            flight_id = int(input("Enter Flight ID (integer, e.g., 1): "))
+            new_status = input("Enter new status: ").strip().capitalize()
+            if self.api.set_status(flight_id, new_status):
+                print("\nFlight status updated successfully!")
+            else:
+                print(f"\nNo flight found with ID {flight_id}.")
+        except (ValueError, sqlite3.Error) as e:
+            print(f"\nError updating flight status: {e}")
 
 # Q4. Assign a pilot to a flight 
     def assign_pilot_to_flight(self):
@@ -143,11 +133,15 @@ class FlightService:
         print("║    Assign Pilot to Flight     ║")
         print("╚═══════════════════════════════╝")
         print("Note: Use Flight ID (unique integer, e.g., 1) to identify the flight.")
-        flight_id = input("Enter Flight ID (integer, e.g., 1): ")
-        pilot_id = input("Enter Pilot ID (integer, e.g., 2): ")
-        self.cursor.execute("UPDATE Flight SET PilotID = ? WHERE FlightID = ?", (pilot_id, flight_id))
-        self.conn.commit()
-        print("\nPilot assigned to flight successfully!")
+        try:
+            flight_id = int(input("Enter Flight ID (integer, e.g., 1): "))
+            pilot_id = int(input("Enter Pilot ID (integer, e.g., 2): "))
+            if self.api.assign_pilot(flight_id, pilot_id):
+                print("\nPilot assigned to flight successfully!")
+            else:
+                print(f"\nNo flight found with ID {flight_id}.")
+        except (ValueError, sqlite3.Error) as e:
+            print(f"\nError assigning pilot: {e}")
 
 # Q5. Remove a pilot from a flight 
     def remove_pilot_from_flight(self):
@@ -156,10 +150,14 @@ class FlightService:
         print("║   Remove Pilot from Flight    ║")
         print("╚═══════════════════════════════╝")
         print("Note: Use Flight ID (unique integer, e.g., 1) to identify the flight.")
-        flight_id = input("Enter Flight ID (integer, e.g., 1): ")
-        self.cursor.execute("UPDATE Flight SET PilotID = NULL WHERE FlightID = ?", (flight_id,))
-        self.conn.commit()
-        print("\nPilot removed from flight successfully!")
+        try:
+            flight_id = int(input("Enter Flight ID (integer, e.g., 1): "))
+            if self.api.remove_pilot(flight_id):
+                print("\nPilot removed from flight successfully!")
+            else:
+                print(f"\nNo flight found with ID {flight_id}.")
+        except (ValueError, sqlite3.Error) as e:
+            print(f"\nError removing pilot: {e}")
         
 # Q6. View a pilot schedule
     def view_pilot_schedule(self):
@@ -167,41 +165,18 @@ class FlightService:
         print("\n╔═══════════════════════════════╗")
         print("║      View Pilot Schedule      ║")
         print("╚═══════════════════════════════╝")
-        pilot_id = input("Enter Pilot ID (integer, e.g., 1): ").strip()
-
-        # Fetch pilot's name
-        self.cursor.execute("SELECT FirstName, LastName FROM Pilot WHERE PilotID = ?", (pilot_id,))
-        pilot = self.cursor.fetchone()
-        pilot_name = f"{pilot[0]} {pilot[1]}" if pilot else "Unknown Pilot"
-
-        self.cursor.execute("""
-            SELECT 
-                f.FlightID,
-                f.FlightNumber,
-                f.DepartureDate,
-                f.DepartureTime,
-                f.ArrivalDate,
-                f.ArrivalTime,
-                o.City AS Departure,
-                d.City AS Arrival,
-                f.FlightStatus
-            FROM Flight f
-            JOIN Airport o ON f.DepartureAirport = o.AirportCode
-            JOIN Airport d ON f.ArrivalAirport = d.AirportCode
-            WHERE f.PilotID = ?
-            ORDER BY f.DepartureDate, f.DepartureTime
-        """, (pilot_id,))
+        try:
+            pilot_id = int(input("Enter Pilot ID (integer, e.g., 1): "))
+        except ValueError as e:
+            print(f"\nError viewing pilot schedule: {e}")
+            return
 
-        results = self.cursor.fetchall()
+        pilot = self.api.pilot(pilot_id)
+        pilot_name = pilot.name if pilot else "Unknown Pilot"
+        results = self.api.pilot_schedule(pilot_id)
 
         if results:
-            print(f"\nFlight Schedule for Pilot: {pilot_name} (ID: {pilot_id})")
-            print("=" * 110)
-            print(f"{'FlightID':<8} | {'Flight':<10} | {'Depart':<10} | {'Time':<8} | {'Arrive':<10} | {'Time':<8} | {'From':<15} | {'To':<15} | {'Status':<10}")
-            print("-" * 110)
-            for row in results:
-                print(f"{row[0]:<8} | {row[1]:<10} | {row[2]:<10} | {row[3]:<8} | {row[4]:<10} | {row[5]:<8} | {row[6]:<15} | {row[7]:<15} | {row[8]:<10}")
-            print("=" * 110)
+            render(results, SCHEDULE_COLUMNS, title=f"Flight Schedule for Pilot: {pilot_name} (ID: {pilot_id})")
         else:
             print(f"\nNo flights assigned to pilot ID {pilot_id} ({pilot_name}).")
  
@@ -216,16 +191,13 @@ class FlightService:
             input("Airport Code (e.g., LHR): "),
             input("Airport Name (e.g., Heathrow Airport): "),
             input("City (e.g., London): "),
-            input("Country (e.g., UK): ")
+            input("Country (e.g., UK): "),
+            input("Time Zone (e.g., Europe/London): ").strip() or None
         )
         try:
-            self.cursor.execute("""
-                INSERT INTO Airport (AirportCode, AirportName, City, Country)
-                VALUES (?, ?, ?, ?)
-            """, destination_data)
-            self.conn.commit()
+            self.api.add_airport(*destination_data)
             print("\nAirport added successfully!")
-        except Exception as e:
+        except (ValueError, sqlite3.Error) as e:
             print(f"\nError adding airport: {e}")
 
 # Q8. View flight details with its pilot and destination  
@@ -234,34 +206,8 @@ class FlightService:
         print("\n╔═══════════════════════════════╗")
         print("║      View All Flights         ║")
         print("╚═══════════════════════════════╝")
-        self.cursor.execute("""
-            SELECT 
-                f.FlightID,
-                f.FlightNumber,
-                f.PilotID,
-                IFNULL(p.FirstName || ' ' || p.LastName, 'Unassigned') AS PilotName,
-                o.City AS DepartureCity,
-                d.City AS ArrivalCity,
-                f.FlightStatus
-            FROM 
-                Flight f
-            LEFT JOIN 
-                Pilot p ON f.PilotID = p.PilotID
-            JOIN 
-                Airport o ON f.DepartureAirport = o.AirportCode
-            JOIN 
-                Airport d ON f.ArrivalAirport = d.AirportCode
-        """)
-        rows = self.cursor.fetchall()
-        if rows:
-            print("\nAll Flights")
-            print("=" * 100)
-            print(f"{'FlightID':<8} | {'Flight':<10} | {'PilotID':<8} | {'Pilot':<20} | {'From':<15} | {'To':<15} | {'Status':<10}")
-            print("-" * 100)
-            for row in rows:
-                pilot_id = str(row[2]) if row[2] is not None else 'None'
-                print(f"{row[0]:<8} | {row[1]:<10} | {pilot_id:<8} | {row[3]:<20} | {row[4]:<15} | {row[5]:<15} | {row[6]:<10}")
-            print("=" * 100)
+        if self._browse_flights("All Flights", None, FLIGHT_DETAIL_COLUMNS):
+            self._export_flights()
         else:
             print("\nNo flights available.")
 
@@ -271,28 +217,10 @@ class FlightService:
         print("\n╔═══════════════════════════════╗")
         print("║   Flight Summary by City      ║")
         print("╚═══════════════════════════════╝")
-        self.cursor.execute("""
-            SELECT 
-                d.City,
-                COUNT(f.FlightID) AS TotalFlights
-            FROM 
-                Flight f
-            JOIN 
-                Airport d ON f.ArrivalAirport = d.AirportCode
-            GROUP BY 
-                d.City
-            ORDER BY 
-                TotalFlights DESC
-        """)
-        results = self.cursor.fetchall()
+        results = self.api.destination_counts()
         if results:
-            print("\nFlight Summary by Arrival City")
-            print("=" * 45)
-            print(f"{'City':<25} | {'Total Flights':<15}")
-            print("-" * 45)
-            for city, total in results:
-                print(f"{city:<25} | {str(total):<15}")
-            print("=" * 45)
+            columns = [CITY_COUNT_COLUMNS[0], Column("Total Flights", "flight_count", align=">")]
+            render(results, columns, title="Flight Summary by Arrival City")
         else:
             print("\nNo flight summary available.")
 
@@ -306,12 +234,7 @@ class FlightService:
         flight_number = input("Enter Flight Number (e.g., BA101): ")
         departure_date = input("Enter Departure Date (YYYY-MM-DD, e.g., 2025-10-10): ")
 
-        self.cursor.execute("""
-            SELECT FlightID, FlightNumber, DepartureDate, FlightStatus 
-            FROM Flight 
-            WHERE FlightNumber = ? AND DepartureDate = ?
-        """, (flight_number, departure_date))
-        flight = self.cursor.fetchone()
+        flight = self.api.find_flight(flight_number, departure_date)
 
         if not flight:
             print(f"\nNo flight found with flight number '{flight_number}' on {departure_date}.")
@@ -319,16 +242,15 @@ class FlightService:
 
         print("\nFlight Details:")
         print("-" * 40)
-        print(f"Flight ID: {flight[0]}")
-        print(f"Flight Number: {flight[1]}")
-        print(f"Departure Date: {flight[2]}")
-        print(f"Status: {flight[3]}")
+        print(f"Flight ID: {flight.flight_id}")
+        print(f"Flight Number: {flight.flight_number}")
+        print(f"Departure Date: {flight.departure_date}")
+        print(f"Status: {flight.status}")
         print("-" * 40)
         
         confirm = input("Are you sure you want to delete this flight? (yes/no): ").strip().lower()
         if confirm == "yes":
-            self.cursor.execute("DELETE FROM Flight WHERE FlightID = ?", (flight[0],))
-            self.conn.commit()
+            self.api.delete_flight(flight.flight_id)
             print("\nFlight deleted successfully!")
         else:
             print("\nDeletion cancelled.")
@@ -339,26 +261,9 @@ class FlightService:
         print("\n╔═══════════════════════════════╗")
         print("║ Flights Assigned per Pilot    ║")
         print("╚═══════════════════════════════╝")
-        self.cursor.execute("""
-            SELECT 
-                p.PilotID,
-                IFNULL(p.FirstName || ' ' || p.LastName, 'Unassigned') AS Pilot,
-                COUNT(f.FlightID) AS FlightCount
-            FROM Flight f
-            LEFT JOIN Pilot p ON f.PilotID = p.PilotID
-            GROUP BY f.PilotID
-            ORDER BY FlightCount DESC
-        """)
-        rows = self.cursor.fetchall()
+        rows = self.api.flights_per_pilot()
         if rows:
-            print("\nFlights per Pilot")
-            print("=" * 55)
-            print(f"{'PilotID':<8} | {'Pilot':<25} | {'Flights Assigned':<15}")
-            print("-" * 55)
-            for row in rows:
-                pilot_id = str(row[0]) if row[0] is not None else 'None'
-                print(f"{pilot_id:<8} | {row[1]:<25} | {row[2]:<15}")
-            print("=" * 55)
+            render(rows, PILOT_COUNT_COLUMNS, title="Flights per Pilot")
         else:
             print("\nNo pilots or flights available.")
     
@@ -368,23 +273,235 @@ class FlightService:
         print("\n╔═══════════════════════════════╗")
         print("║ Flight Count by Destination   ║")
         print("╚═══════════════════════════════╝")
-        self.cursor.execute("""
-            SELECT 
-                d.City,
-                COUNT(f.FlightID) AS FlightCount
-            FROM Flight f
-            JOIN Airport d ON f.ArrivalAirport = d.AirportCode
-            GROUP BY d.City
-            ORDER BY FlightCount DESC
-        """)
-        rows = self.cursor.fetchall()
+        rows = self.api.destination_counts()
         if rows:
-            print("\nFlight Count by Arrival City")
-            print("=" * 45)
-            print(f"{'City':<25} | {'Flight Count':<15}")
-            print("-" * 45)
-            for row in rows:
-                print(f"{row[0]:<25} | {row[1]:<15}")
-            print("=" * 45)
+            render(rows, CITY_COUNT_COLUMNS, title="Flight Count by Arrival City")
         else:
-            print("\nNo flights or destinations available.")
\ No newline at end of file
+            print("\nNo flights or destinations available.")
+
+# Q13. Change the status of many flights at once
+    def bulk_update_flight_status(self):
+        """Updates the status of every flight matching a filter in one transaction."""
+        print("\n╔═══════════════════════════════╗")
+        print("║   Bulk Update Flight Status   ║")
+        print("╚═══════════════════════════════╝")
+        print("Select flights with any of the filters below (press Enter to skip a filter).")
+        print("Allowed changes: Scheduled <-> Delayed, Scheduled/Delayed -> Departed or Cancelled,")
+        print("                 Departed -> Completed.")
+        criteria = {
+            "departure_airport": input("Departure Airport Code (e.g., LHR): ").strip().upper(),
+            "departs_from": input("Departing from (YYYY-MM-DD or YYYY-MM-DD HH:MM): ").strip(),
+            "departs_until": input("Departing until (YYYY-MM-DD or YYYY-MM-DD HH:MM): ").strip(),
+            "arrived_before": input("Arrived before (YYYY-MM-DD HH:MM): ").strip(),
+            "status": input("Current status (e.g., Departed): ").strip().capitalize(),
+            "flight_number": input("Flight Number (e.g., BA101): ").strip(),
+        }
+        criteria = {key: value for key, value in criteria.items() if value}
+        new_status = input("New status: ").strip().capitalize()
+        try:
+            count = self.api.bulk_set_status(new_status, **criteria)
+            print(f"\n{count} flight(s) updated to '{new_status}'.")
+        except (ValueError, sqlite3.Error) as e:
+            print(f"\nError updating flights: {e}")
+
+# Q14. Find pilots booked on overlapping flights
+    def view_pilot_conflicts(self):
+        """Lists every pair of overlapping flights assigned to the same pilot."""
+        print("\n╔═══════════════════════════════╗")
+        print("║   Pilot Double-Booking Report ║")
+        print("╚═══════════════════════════════╝")
+        rows = self.api.pilot_conflicts()
+        if rows:
+            render(rows, CONFLICT_COLUMNS, title="Overlapping Flights")
+            print(f"{len(rows)} overlapping flight pair(s).")
+        else:
+            print("\nNo pilot is booked on overlapping flights.")
+
+# Q15. Block times (departure to arrival, across time zones) per route or pilot
+    def view_block_times(self):
+        """Shows block-time statistics for the flights departing in a UTC date range."""
+        print("\n╔═══════════════════════════════╗")
+        print("║      Block-Time Report        ║")
+        print("╚═══════════════════════════════╝")
+        start = input("Departing from (UTC, YYYY-MM-DD or YYYY-MM-DD HH:MM): ").strip()
+        end = input("Departing until (UTC, YYYY-MM-DD or YYYY-MM-DD HH:MM): ").strip()
+        by = input("Group by [r]oute or [p]ilot (default route): ").strip().lower()
+        by = "pilot" if by.startswith("p") else "route"
+        try:
+            rows = self.api.block_times(start, end, by=by)
+        except (ValueError, sqlite3.Error) as e:
+            print(f"\nError reading block times: {e}")
+            return
+        if rows:
+            name = (lambda row: f"{row.key} {row.label}") if by == "route" else "label"
+            columns = [
+                Column(by.capitalize(), name, max_width=38),
+                Column("Flights", "flights", align=">"),
+                Column("Total", "total_minutes", align=">", format=_hours),
+                Column("Min", "min_minutes", align=">", format=_hours),
+                Column("Mean", "mean_minutes", align=">", format=_hours),
+                Column("Max", "max_minutes", align=">", format=_hours),
+            ]
+            render(rows, columns, title=f"Block Time per {by.capitalize()} (hours:minutes)")
+        else:
+            print("\nNo flights with known times depart in that range.")
+
+# Q16. All-time flight counts, including flights moved to the archive
+    def view_flight_history(self):
+        """Displays flights per destination city and per pilot over hot and archived flights."""
+        print("\n╔═══════════════════════════════╗")
+        print("║    All-Time Flight Counts     ║")
+        print("╚═══════════════════════════════╝")
+        path = archive_path(self.db_path)
+        if not os.path.exists(path):
+            print(f"\nNo archive at {path} yet; options 11 and 12 already count every flight.")
+            return
+        try:
+            with attached(self.conn, path):
+                cities = history_destination_counts(self.conn)
+                pilots = history_flights_per_pilot(self.conn)
+        except sqlite3.Error as e:
+            print(f"\nError reading the archive: {e}")
+            return
+        render(cities, CITY_COUNT_COLUMNS, title="Flights per Arrival City (all time)")
+        render(pilots, [Column("Pilot", "pilot"), CITY_COUNT_COLUMNS[1]], title="Flights per Pilot (all time)")
+
+# Q17. Find connecting flights between two airports
+    def find_itinerary(self):
+        """Shows the itineraries from one airport to another: fewest transfers first, then faster ones."""
+        print("\n╔═══════════════════════════════╗")
+        print("║       Find an Itinerary       ║")
+        print("╚═══════════════════════════════╝")
+        origin = input("From airport code (e.g., EDI): ").strip().upper()
+        destination = input("To airport code (e.g., SIN): ").strip().upper()
+        depart_after = input("Depart after (UTC, YYYY-MM-DD or YYYY-MM-DD HH:MM): ").strip()
+        arrive_by = input("Arrive by (UTC; optional, press Enter for the next 3 days): ").strip() or None
+        try:
+            options = self.api.itineraries(origin, destination, depart_after, arrive_by)
+        except (ValueError, sqlite3.Error) as e:
+            print(f"\nError searching itineraries: {e}")
+            return
+        if not options:
+            print(f"\nNo itinerary from {origin} to {destination} in that window.")
+            return
+        print(f"\n{len(options)} option(s), fewest transfers first (times in UTC)")
+        print("=" * 78)
+        for itinerary in options:
+            print(describe(itinerary))
+            print("-" * 78)
+
+# Q18. Query statistics for this session
+    def view_query_stats(self):
+        """Shows per-operation and per-statement timings and slow queries, and exports them for Prometheus."""
+        print("\n╔═══════════════════════════════╗")
+        print("║       Query Statistics        ║")
+        print("╚═══════════════════════════════╝")
+        if self.instrumentation is None:
+            print("\nQuery instrumentation is not enabled for this session.")
+            return
+        stats = self.instrumentation.snapshot()
+        if not stats["operations"] and not stats["statements"]:
+            print("\nNo queries have run yet.")
+            return
+        render(stats["operations"].items(), [
+            Column("Operation", 0, max_width=28),
+            Column("Calls", lambda item: item[1]["calls"], align=">"),
+            Column("Total ms", lambda item: item[1]["total_ms"], align=">", format="{:.1f}".format),
+            Column("p50", lambda item: item[1]["p50_ms"], align=">", format=_bound),
+            Column("p95", lambda item: item[1]["p95_ms"], align=">", format=_bound),
+            Column("Max ms", lambda item: item[1]["max_ms"], align=">", format="{:.1f}".format),
+            Column("Rows", lambda item: item[1]["rows"], align=">"),
+        ], title="Operations (slowest total first; p50/p95 are histogram bucket bounds, ms)")
+        render(list(stats["statements"].items())[:10], [
+            Column("SQL", 0, max_width=44),
+            Column("Calls", lambda item: item[1]["calls"], align=">"),
+            Column("Total ms", lambda item: item[1]["total_ms"], align=">", format="{:.1f}".format),
+            Column("Rows", lambda item: item[1]["rows"], align=">"),
+            Column("VM steps", lambda item: item[1]["vm_steps"], align=">"),
+        ], title="Statements (top 10 by total time)")
+        samples = stats["slow_samples"]
+        print(f"\n{stats['slow_queries']} statement(s) took {stats['slow_ms']:g} ms or more.")
+        for sample in samples[-3:]:
+            print(f"\n  {sample['ms']:.1f} ms, {sample['rows']} rows, in {sample['operation'] or '(no operation)'}:")
+            print(f"    {(sample['expanded_sql'] or sample['sql'])[:200]}")
+            for step in sample["plan"] or []:
+                print(f"    plan: {step}")
+        path = input("\nExport Prometheus metrics to file (press Enter to skip): ").strip()
+        if path:
+            try:
+                self.instrumentation.write_prometheus(path)
+            except OSError as e:
+                print(f"\nError writing {path}: {e}")
+                return
+            print(f"\nMetrics written to {path}.")
+
+# Q19. Assign pilots to every unassigned flight in a date range
+    def auto_roster_flights(self):
+        """Rosters the unassigned flights in a UTC window and lists the ones left without a pilot."""
+        print("\n╔═══════════════════════════════╗")
+        print("║      Auto-Roster Pilots       ║")
+        print("╚═══════════════════════════════╝")
+        print("Pilots must be at the departure airport and rested; their own flights are kept.")
+        start = input("First departure (UTC, YYYY-MM-DD or YYYY-MM-DD HH:MM): ").strip()
+        end = input("Last departure (UTC; a bare date includes that day): ").strip()
+        rest = input(f"Minimum rest between flights in minutes (press Enter for {DEFAULT_MIN_REST_MINUTES}): ").strip()
+        try:
+            result = self.api.auto_roster(start, end, int(rest) if rest else DEFAULT_MIN_REST_MINUTES)
+        except (ValueError, sqlite3.Error) as e:
+            print(f"\nError rostering flights: {e}")
+            return
+        print(f"\n{result['assigned']} flight(s) given a pilot.")
+        unstaffed = result["unstaffed"]
+        if unstaffed:
+            render(unstaffed, [
+                Column("FlightID", "flight_id"),
+                Column("Flight", "flight_number"),
+                Column("From", "departure_airport"),
+                Column("To", "arrival_airport"),
+                Column("Departs (UTC)", "departure_utc", format=format_utc),
+            ], title="Flights Left Without a Pilot")
+            print(f"{len(unstaffed)} flight(s) could not be staffed.")
+
+# Q20. Search airports and pilots
+    def search_directory(self):
+        """Type-ahead search: lists the airports and pilots matching a few letters of each word."""
+        print("\n╔═══════════════════════════════╗")
+        print("║  Search Airports and Pilots   ║")
+        print("╚═══════════════════════════════╝")
+        print("Type the start of any words of a code, name, city, country or e-mail (e.g., 'lon hea').")
+        text = input("Search: ").strip()
+        if not text:
+            print("\nNothing to search for.")
+            return
+        try:
+            airports = self.api.search_airports(text)
+            pilots = self.api.search_pilots(text)
+        except (ValueError, sqlite3.Error) as e:
+            print(f"\nError searching: {e}")
+            return
+        if not airports and not pilots:
+            print(f"\nNo airport or pilot matches '{text}'.")
+            return
+        render(airports, [
+            Column("Code", "code"),
+            Column("Airport", "name", max_width=35),
+            Column("City", "city", max_width=20),
+            Column("Country", "country", max_width=20),
+        ], title="Airports")
+        render(pilots, [
+            Column("PilotID", "pilot_id"),
+            Column("First Name", "first_name"),
+            Column("Last Name", "last_name"),
+            Column("Email", "email", max_width=35),
+        ], title="Pilots")
+
+
+def _bound(ms):
+    """Formats a histogram bucket bound in milliseconds."""
+    return "inf" if ms == float("inf") else f"{ms:g}"
+
+
+def _hours(minutes):
+    """Formats a number of minutes as H:MM."""
+    minutes = round(minutes)
+    return f"{minutes // 60}:{minutes % 60:02d}"
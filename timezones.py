@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+# Airport time zones and the UTC epoch columns on Flight.
+#
+# Flight times are entered as local wall-clock dates and times at each airport.
+# Flight.DepartureUTC and Flight.ArrivalUTC hold the same instants as integer
+# seconds since 1970-01-01 UTC, computed from Airport.TimeZone (an IANA name) by
+# utc_epoch(). SQLite has no time zone data, so connection.connect() registers
+# utc_epoch() as an SQL function on this application's connections and the
+# application fills the columns in (see schema.FLIGHT_TIME_TRIGGERS). Other
+# clients (e.g. the sqlite3 shell) can still write flights and time zones: the
+# triggers clear the UTC times they make stale and queue the flight, and the
+# application fills the queued ones in the next time it opens the database
+# (schema.migrate).
+#
+# A local time that falls in a DST gap, or twice in a DST overlap, resolves with
+# fold=0 (the offset in force before the change). A flight at an airport without
+# a time zone has NULL UTC columns and is left out of range queries until one is set.
+
+# Zones of the real airports in data.sample_data and datagen.BASE_AIRPORTS.
+AIRPORT_TIME_ZONES = {
+    'LHR': 'Europe/London',
+    'LGW': 'Europe/London',
+    'MAN': 'Europe/London',
+    'EDI': 'Europe/London',
+    'BFS': 'Europe/London',
+    'GLA': 'Europe/London',
+    'JFK': 'America/New_York',
+    'CDG': 'Europe/Paris',
+    'AMS': 'Europe/Amsterdam',
+    'DXB': 'Asia/Dubai',
+    'FRA': 'Europe/Berlin',
+    'MAD': 'Europe/Madrid',
+    'HKG': 'Asia/Hong_Kong',
+    'NRT': 'Asia/Tokyo',
+    'SIN': 'Asia/Singapore',
+}
+
+
+# ZoneInfo keeps only a few zones strongly cached; with more airport zones than
+# that in use, every utc_epoch() call would re-read a zone file.
+@lru_cache(maxsize=None)
+def _zone(name):
+    return ZoneInfo(name)
+
+
+def check_time_zone(name):
+    """Raises ValueError unless name is an IANA time zone known to this system."""
+    try:
+        _zone(name)
+    except (ValueError, ZoneInfoNotFoundError):
+        raise ValueError(f"Unknown time zone '{name}'. Use an IANA name such as Europe/London.") from None
+
+
+def utc_epoch(day, clock, zone):
+    """UTC epoch seconds of a local 'YYYY-MM-DD' date and 'HH:MM' time in zone.
+
+    Returns None if any part is missing or invalid, so a bad value leaves the UTC
+    column empty rather than failing the write. This is the utc_epoch() SQL function.
+    """
+    if not (day and clock and zone):
+        return None
+    try:
+        local = datetime.fromisoformat(f"{day}T{clock}").replace(tzinfo=_zone(zone))
+    except (ValueError, ZoneInfoNotFoundError):
+        return None
+    return int(local.timestamp())
+
+
+def local_time(epoch, zone):
+    """The ('YYYY-MM-DD', 'HH:MM') wall-clock time of a UTC epoch in zone."""
+    local = datetime.fromtimestamp(epoch, _zone(zone))
+    return local.strftime("%Y-%m-%d"), local.strftime("%H:%M")
+
+
+def parse_utc(value, end_of_day=False):
+    """Epoch seconds of a UTC instant: an int, a datetime (naive means UTC) or an ISO string.
+
+    A string may be 'YYYY-MM-DD', 'YYYY-MM-DD HH:MM' or carry an explicit offset.
+    With end_of_day a bare date means the start of the next day, the exclusive end
+    of a window that includes that date.
+    """
+    if isinstance(value, (int, float)):
+        return int(value)
+    bare_date = False
+    if isinstance(value, str):
+        text = value.strip()
+        bare_date = len(text) == 10
+        try:
+            value = datetime.fromisoformat(text)
+        except ValueError:
+            raise ValueError(f"Invalid time '{text}'; use YYYY-MM-DD or YYYY-MM-DD HH:MM (UTC).") from None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    if bare_date and end_of_day:
+        value += timedelta(days=1)
+    return int(value.timestamp())
+
+
+def format_utc(epoch):
+    """'YYYY-MM-DD HH:MM' in UTC, or '' for None."""
+    if epoch is None:
+        return ''
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime("%Y-%m-%d %H:%M")
+
+
+def register_functions(conn):
+    """Registers utc_epoch() on a connection; the statements that fill Flight's UTC times need it."""
+    conn.create_function("utc_epoch", 3, utc_epoch, deterministic=True)
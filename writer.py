@@ -0,0 +1,163 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from api import FlightAPI
+from connection import DB_PATH, connect
+
+# Group commit: one thread owns the read-write connection and applies write
+# requests from any number of threads (or asyncio tasks, via
+# asyncio.wrap_future) in batches, one transaction and one commit per batch.
+#
+# A batch is flushed when it holds max_batch requests or max_delay seconds after
+# its first request arrived, whichever comes first. With the default max_delay
+# of 0 the writer never waits: a batch is whatever queued up while the previous
+# one was committing, so batches grow with load and an idle writer adds no
+# latency. A small max_delay trades latency for larger batches when each commit
+# is an fsync (synchronous=FULL). Each request runs inside its
+# own SAVEPOINT, so a request that fails is rolled back alone and only its
+# caller sees the error. Futures are resolved after the batch has committed, so
+# a successful result means the write is durable (to the profile's sync level).
+
+DEFAULT_MAX_BATCH = 256
+DEFAULT_MAX_DELAY = 0.0  # seconds
+
+_STOP = object()
+
+
+class WriterClosedError(RuntimeError):
+    """Raised by submit() after close()."""
+
+
+class GroupCommitWriter:
+    """Serialises writes through one connection and commits them in batches.
+
+        writer = GroupCommitWriter("FlightManagement.db")
+        future = writer.submit("set_status", 12, "Delayed")   # a FlightAPI method name
+        future.result()                                       # -> 1, once committed
+        writer.submit(lambda api: api.remove_pilot(12))       # or any callable(api)
+        writer.close()
+    """
+
+    def __init__(self, db_path=DB_PATH, profile="interactive", max_batch=DEFAULT_MAX_BATCH,
+                 max_delay=DEFAULT_MAX_DELAY, dimensions=None):
+        self.db_path = db_path
+        self.profile = profile
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.dimensions = dimensions
+        self.batches = 0
+        self.requests = 0
+        self._queue = queue.Queue()
+        self._closed = False
+        self._close_lock = threading.Lock()
+        self._ready = Future()
+        self._thread = threading.Thread(target=self._run, name="group-commit-writer", daemon=True)
+        self._thread.start()
+        self._ready.result()  # re-raises a failure to open the database
+
+    def submit(self, operation, *args, **kwargs):
+        """Queues a write and returns a Future for its result.
+
+        operation is the name of a FlightAPI method or a callable taking the API as
+        its first argument; it must not commit (the writer's API has autocommit off).
+        """
+        future = Future()
+        with self._close_lock:
+            if self._closed:
+                raise WriterClosedError("The writer has been closed.")
+            self._queue.put((operation, args, kwargs, future))
+        return future
+
+    def stats(self):
+        """Requests and batches committed so far."""
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch": round(self.requests / self.batches, 2) if self.batches else None,
+        }
+
+    def close(self):
+        """Flushes every queued request, then stops the writer thread and closes its connection."""
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join()
+
+    def _run(self):
+        try:
+            conn = connect(self.db_path, self.profile)
+            api = FlightAPI(conn, autocommit=False, dimensions=self.dimensions)
+        except BaseException as e:
+            self._ready.set_exception(e)
+            return
+        self._ready.set_result(None)
+        try:
+            while True:
+                batch, stop = self._next_batch()
+                if batch:
+                    self._apply(conn, api, batch)
+                if stop:
+                    break
+        finally:
+            conn.close()
+
+    def _next_batch(self):
+        """Blocks for the first request, then gathers more until the batch is full or max_delay passes."""
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _apply(self, conn, api, batch):
+        """Runs one batch in a single transaction and resolves its futures after the commit."""
+        done = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for operation, args, kwargs, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                conn.execute("SAVEPOINT request")
+                try:
+                    if isinstance(operation, str):
+                        result = getattr(api, operation)(*args, **kwargs)
+                    else:
+                        result = operation(api, *args, **kwargs)
+                except BaseException as e:
+                    conn.execute("ROLLBACK TO request")
+                    conn.execute("RELEASE request")
+                    api.dimensions.invalidate_all()  # may hold rows the rollback undid
+                    future.set_exception(e)
+                    continue
+                conn.execute("RELEASE request")
+                done.append((future, result))
+            conn.commit()
+            api.after_commit()
+        except BaseException as e:  # BEGIN or COMMIT failed: nothing in the batch was written
+            if conn.in_transaction:
+                conn.rollback()
+            api.dimensions.invalidate_all()
+            for future, _ in done:
+                future.set_exception(e)
+            for _, _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for future, result in done:
+            future.set_result(result)
+        self.requests += len(done)
+        self.batches += 1